@@ -0,0 +1,158 @@
+"""
+Gambar upload (logo tenant, foto produk) dan varian thumbnail-nya.
+
+File asli disimpan dengan nama berdasarkan hash isinya. Varian WebP dan
+JPEG per ukuran dirender di luar proses web oleh command `image_variants`
+(jalankan berkala lewat cron), sehingga request upload tidak menunggu
+resize; selama varian belum ada, `thumbnail` memakai file asli. Varian ditulis ke
+`thumbs/<hash>_<ukuran>.<format>`; isi sebuah nama tidak pernah berubah,
+jadi boleh di-cache browser selamanya. File yang tidak dipakai lagi
+dibuang oleh `cleanup_images` (command `image_variants --cleanup`).
+"""
+import hashlib
+import io
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.deconstruct import deconstructible
+from PIL import Image, ImageOps
+
+HASH_LENGTH = 32
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+VARIANT_DIR = 'thumbs'
+# Ukuran sisi terpanjang (px) per nama varian
+VARIANT_SIZES = {'sm': 160, 'md': 480}
+# Ekstensi -> format Pillow; JPEG untuk browser yang belum mendukung WebP
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+VARIANT_QUALITY = 80
+# File yang lebih baru dari ini tidak dibersihkan (upload yang belum selesai disimpan)
+CLEANUP_GRACE_SECONDS = 60 * 60
+
+
+def validate_image_size(file):
+    if file.size > MAX_UPLOAD_SIZE:
+        raise ValidationError(f'Ukuran gambar maksimal {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.')
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+@deconstructible
+class HashedUploadTo:
+    """upload_to untuk ImageField: `<prefix>/<hash isi>.<ext>`"""
+
+    def __init__(self, prefix, field_name):
+        self.prefix = prefix
+        self.field_name = field_name
+
+    def __call__(self, instance, filename):
+        extension = Path(filename).suffix.lower()
+        digest = content_hash(getattr(instance, self.field_name).file)
+        return f'{self.prefix}/{digest}{extension}'
+
+
+def image_digest(name):
+    """Hash isi dari nama file asli, atau None jika bukan nama hash"""
+    stem = Path(name or '').stem[:HASH_LENGTH]
+    if len(stem) != HASH_LENGTH or any(char not in '0123456789abcdef' for char in stem):
+        return None
+    return stem
+
+
+def _variant_name(digest, size, extension):
+    return f'{VARIANT_DIR}/{digest}_{size}.{extension}'
+
+
+def _variant_path(media_root, digest, size, extension):
+    return Path(media_root) / _variant_name(digest, size, extension)
+
+
+def variants_ready(digest):
+    # Varian ditulis berurutan, jadi cukup cek varian terakhir
+    size = list(VARIANT_SIZES)[-1]
+    extension = list(VARIANT_FORMATS)[-1]
+    return _variant_path(settings.MEDIA_ROOT, digest, size, extension).exists()
+
+
+def thumbnail(field_file, size='sm'):
+    """
+    URL gambar untuk ditampilkan: {'webp': url, 'jpg': url} varian `size`,
+    atau {'jpg': url asli} jika varian belum selesai dirender. None jika kosong.
+    """
+    if not field_file:
+        return None
+    digest = image_digest(field_file.name)
+    if digest is None or not variants_ready(digest):
+        return {'jpg': field_file.url}
+    return {
+        extension: settings.MEDIA_URL + _variant_name(digest, size, extension)
+        for extension in VARIANT_FORMATS
+    }
+
+
+def _write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+def render_variants(source, digest, media_root):
+    """Render semua varian yang belum ada (dijalankan di proses worker command, tanpa ORM)"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        for size_name, size in VARIANT_SIZES.items():
+            thumb = image.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            for extension, image_format in VARIANT_FORMATS.items():
+                path = _variant_path(media_root, digest, size_name, extension)
+                if path.exists():
+                    continue
+                output = thumb
+                if image_format == 'JPEG' and output.mode != 'RGB':
+                    # JPEG tanpa alpha: transparansi diganti latar putih
+                    background = Image.new('RGB', output.size, 'white')
+                    rgba = output.convert('RGBA')
+                    background.paste(rgba, mask=rgba.getchannel('A'))
+                    output = background
+                elif image_format == 'WEBP' and output.mode not in ('RGB', 'RGBA'):
+                    output = output.convert('RGBA')
+                buffer = io.BytesIO()
+                output.save(buffer, image_format, quality=VARIANT_QUALITY)
+                _write_atomic(path, buffer.getvalue())
+    return digest
+
+
+def cleanup_images(used_names, directories, dry_run=False):
+    """
+    Hapus file asli di `directories` (relatif ke MEDIA_ROOT) yang tidak ada
+    di `used_names`, dan varian yang hash-nya tidak dipakai file mana pun.
+    Mengembalikan daftar path yang (akan) dihapus.
+    """
+    media_root = Path(settings.MEDIA_ROOT)
+    used_names = set(used_names)
+    used_digests = {image_digest(name) for name in used_names}
+    cutoff = time.time() - CLEANUP_GRACE_SECONDS
+
+    stale = []
+    for directory in directories:
+        for path in (media_root / directory).glob('*'):
+            if path.is_file() and path.relative_to(media_root).as_posix() not in used_names:
+                stale.append(path)
+    for path in (media_root / VARIANT_DIR).glob('*'):
+        if path.is_file() and path.name.split('_')[0] not in used_digests:
+            stale.append(path)
+
+    stale = [path for path in stale if path.stat().st_mtime < cutoff]
+    if not dry_run:
+        for path in stale:
+            path.unlink(missing_ok=True)
+    return stale
@@ -0,0 +1,12 @@
+from django.db import models
+
+class RefCacheVersion(models.Model):
+    """Nomor versi data referensi per scope (apps.core.refcache), dinaikkan dengan UPDATE atomik"""
+    scope = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+    
+    class Meta:
+        db_table = 'refcache_versions'
@@ -0,0 +1,147 @@
+"""
+Keyset (cursor) pagination.
+
+Halaman berikutnya diambil dengan `WHERE (kolom urut) > (nilai baris terakhir)`
+alih-alih OFFSET, dan tanpa COUNT(*) atas seluruh tabel, sehingga latensi
+setiap halaman tetap datar berapa pun panjang riwayat datanya.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.shortcuts import render
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class InvalidCursor(Exception):
+    """Cursor tidak bisa dibaca atau tidak cocok dengan urutan"""
+
+
+class KeysetPage:
+    """Satu halaman hasil; bisa di-iterasi langsung di template"""
+
+    def __init__(self, object_list, next_cursor=None, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+        self.next_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _parse_ordering(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def _row_value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, (datetime, date)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor(str(e))
+
+    fields = _parse_ordering(ordering)
+    if not isinstance(payload, list) or len(payload) != len(fields):
+        raise InvalidCursor('Panjang cursor tidak sesuai urutan')
+
+    try:
+        return [
+            model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(fields, payload)
+        ]
+    except ValidationError as e:
+        raise InvalidCursor(str(e))
+
+
+def _after(ordering, values):
+    """Kondisi 'setelah baris dengan nilai `values`' untuk urutan campuran asc/desc"""
+    fields = _parse_ordering(ordering)
+    condition = Q()
+    for i, (name, descending) in enumerate(fields):
+        step = {f'{name}__{"lt" if descending else "gt"}': values[i]}
+        for (prev_name, _), prev_value in zip(fields[:i], values[:i]):
+            step[prev_name] = prev_value
+        condition |= Q(**step)
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Ambil satu halaman `queryset` yang diurutkan menurut `ordering`.
+
+    `ordering` harus unik secara total, jadi selalu akhiri dengan 'id'/'-id',
+    misalnya ('-created_at', '-id') atau ('name', 'id').
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, name) for name, _ in _parse_ordering(ordering)])
+
+    return KeysetPage(rows, next_cursor=next_cursor, cursor=cursor)
+
+
+def paginate_request(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """Paginate berdasarkan parameter GET `cursor` dan `limit`"""
+    try:
+        per_page = min(max(int(request.GET.get('limit', per_page)), 1), MAX_PER_PAGE)
+    except ValueError:
+        pass
+
+    try:
+        page = paginate_keyset(queryset, ordering, request.GET.get('cursor'), per_page)
+    except InvalidCursor:
+        page = paginate_keyset(queryset, ordering, None, per_page)
+
+    if page.has_next:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        params.pop('fragment', None)
+        page.next_url = f'{request.path}?{params.urlencode()}'
+    return page
+
+
+def render_keyset(request, template_name, rows_template, context, page):
+    """
+    Render halaman penuh, atau hanya baris tabel jika `?fragment=1`
+    (dipakai tombol "Muat lebih banyak"). URL halaman berikutnya
+    dikirim lewat header X-Next-Page.
+    """
+    context = {**context, 'page': page}
+    if request.GET.get('fragment'):
+        response = render(request, rows_template, context)
+        response['X-Next-Page'] = page.next_url or ''
+        return response
+    return render(request, template_name, context)
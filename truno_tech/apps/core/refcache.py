@@ -0,0 +1,97 @@
+"""
+Cache data referensi (produk, kategori, bahan) dengan nomor versi per scope.
+
+Setiap scope (mis. katalog satu tenant) punya nomor versi di tabel
+RefCacheVersion yang dinaikkan dengan `UPDATE version = version + 1` setiap
+kali datanya berubah, jadi dua perubahan bersamaan tidak bisa menghasilkan
+versi yang sama. Respons JSON disimpan di cache dengan kunci yang memuat
+versi tersebut dan dikirim dengan ETag, sehingga klien yang datanya belum
+berubah cukup dijawab 304 dengan satu query versi (primary key).
+
+Stok berubah di setiap penjualan, jadi punya scope sendiri (`stock_scope`)
+terpisah dari katalog; katalog hanya berubah saat produk/kategori diedit.
+
+Hak akses tidak di-cache: setiap request (termasuk yang dijawab 304) tetap
+mengecek akses user, jadi pencabutan akses langsung berlaku.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from .models import RefCacheVersion
+
+DATA_TTL = 60 * 60 * 24
+
+
+def catalog_scope(tenant_id):
+    """Produk dan kategori satu tenant (tanpa stok)"""
+    return f'catalog:{tenant_id}'
+
+
+def stock_scope(tenant_id):
+    """Stok produk satu tenant"""
+    return f'stock:{tenant_id}'
+
+
+def bahan_scope(user_id):
+    """Bahan milik satu client"""
+    return f'bahan:{user_id}'
+
+
+def get_versions(*scopes):
+    """dict scope -> versi saat ini (0 untuk scope yang belum pernah berubah), satu query"""
+    versions = dict(
+        RefCacheVersion.objects.filter(scope__in=scopes).values_list('scope', 'version')
+    )
+    return {scope: versions.get(scope, 0) for scope in scopes}
+
+
+def _bump_now(scopes):
+    for scope in scopes:
+        if not RefCacheVersion.objects.filter(scope=scope).update(version=F('version') + 1):
+            # Versi awal berbasis waktu agar tidak bertabrakan dengan data lama di cache
+            RefCacheVersion.objects.get_or_create(scope=scope, defaults={'version': time.time_ns()})
+
+
+def bump(*scopes):
+    """Naikkan versi `scopes` setelah transaksi yang sedang berjalan di-commit"""
+    scopes = set(scopes)
+    if scopes:
+        transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def cached_json(request, scope, build):
+    """
+    JsonResponse untuk data `scope` yang dibangun oleh `build()`.
+
+    `scope` boleh berupa tuple beberapa scope jika data bergantung pada
+    semuanya. Hasil dibedakan per URL (path dan query string), disimpan per
+    versi scope, dan dijawab 304 jika If-None-Match cocok. `build` hanya
+    dipanggil saat cache kosong.
+    """
+    scopes = scope if isinstance(scope, tuple) else (scope,)
+    versions = get_versions(*scopes)
+    key = ':'.join(f'{name}={versions[name]}' for name in scopes)
+    variant = request.get_full_path()
+    digest = hashlib.sha1(f'{key}:{variant}'.encode()).hexdigest()[:24]
+    etag = f'"{digest}"'
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        data_key = f'refcache:data:{digest}'
+        payload = cache.get(data_key)
+        if payload is None:
+            payload = json.dumps(build(), cls=DjangoJSONEncoder)
+            cache.set(data_key, payload, DATA_TTL)
+        response = HttpResponse(payload, content_type='application/json')
+
+    response['ETag'] = etag
+    # Browser selalu revalidasi, tapi boleh memakai ulang salinannya jika 304
+    response['Cache-Control'] = 'private, no-cache'
+    return response
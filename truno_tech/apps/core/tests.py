@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.accounts.models import UserProfile
+from apps.products.models import Product, ProductCategory
+from apps.tenants.models import Tenant
+from .pagination import InvalidCursor, paginate_keyset
+from .refcache import bump, get_versions
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.owner = owner = User.objects.create_user('owner', password='rahasia-123')
+        UserProfile.objects.create(user=owner, role='client', max_tenants=5)
+        tenant = Tenant.objects.create(owner=owner, name='Toko', address='Jl. A', phone='0811')
+        category = ProductCategory.objects.create(tenant=tenant, name='Umum', created_by=owner)
+        # Nama kembar: urutan hanya unik karena id ikut di akhir
+        for i in range(23):
+            Product.objects.create(
+                tenant=tenant, category=category, sku=f'S{i}', name=f'Produk {i % 4}',
+                qty=i, price=1000, created_by=owner,
+            )
+
+    def walk(self, ordering, per_page):
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = paginate_keyset(Product.objects.all(), ordering, cursor, per_page)
+            ids.extend(product.pk for product in page)
+            pages += 1
+            if not page.has_next:
+                return ids, pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for ordering in (('name', 'id'), ('-qty', '-id'), ('name', '-id')):
+            with self.subTest(ordering=ordering):
+                ids, pages = self.walk(ordering, per_page=5)
+                expected = list(Product.objects.order_by(*ordering).values_list('pk', flat=True))
+                self.assertEqual(ids, expected)
+                self.assertEqual(pages, 5)
+
+    def test_last_full_page_has_no_next(self):
+        page = paginate_keyset(Product.objects.all(), ('name', 'id'), per_page=23)
+        self.assertEqual(len(page), 23)
+        self.assertFalse(page.has_next)
+
+    def test_invalid_cursor_rejected(self):
+        for cursor in ('bukan-cursor', 'WzFd'):  # 'WzFd' = [1]: panjang tidak sesuai
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginate_keyset(Product.objects.all(), ('name', 'id'), cursor)
+
+    def test_fragment_request_returns_rows_and_next_page(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get('/products/', {'limit': 10, 'fragment': 1})
+
+        self.assertEqual(response.status_code, 200)
+        next_url = response['X-Next-Page']
+        self.assertIn('cursor=', next_url)
+        self.assertNotIn('fragment', next_url)
+        self.assertNotContains(response, '<html')
+
+
+class RefCacheVersionTest(TestCase):
+    def test_every_bump_increments_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump('catalog:1')
+        first = get_versions('catalog:1')['catalog:1']
+
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                bump('catalog:1', 'stock:1')
+
+        self.assertEqual(get_versions('catalog:1', 'stock:9'), {'catalog:1': first + 3, 'stock:9': 0})
+
+    def test_bump_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bump('stock:1')
+        self.assertEqual(get_versions('stock:1'), {'stock:1': 0})
+        self.assertEqual(len(callbacks), 1)
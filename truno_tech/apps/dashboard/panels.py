@@ -0,0 +1,191 @@
+"""
+Panel dashboard yang dimuat terpisah.
+
+Halaman dashboard utama dan analisis tenant hanya merender kerangka; setiap
+panel diambil browser dari endpoint-nya sendiri secara paralel. Fungsi di
+sini sinkron (query + render fragment) dan dipanggil view async lewat
+`sync_to_async`. Di bawah ASGI setiap request panel berjalan di thread-nya
+sendiri, jadi panel yang lambat (mis. analisis pelanggan) tidak menahan
+panel lain maupun halaman.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum, F
+from django.db.models.functions import TruncMonth
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from apps.tenants.models import TenantStats
+from apps.products.models import LowStockItem
+from apps.orders.models import DailyTenantSales, Order
+from apps.orders.leaderboards import DEFAULT_WINDOW, WINDOWS, top_products as leaderboard
+from apps.hpp.models import HPP
+
+# Pilihan rentang (bulan) analisis margin
+MARGIN_MONTH_CHOICES = (6, 12, 24, 36)
+DEFAULT_MARGIN_MONTHS = 6
+
+
+def recent_months(today, count):
+    """Tanggal awal `count` bulan terakhir (termasuk bulan ini), terbaru dulu"""
+    months = []
+    month = today.replace(day=1)
+    for _ in range(count):
+        months.append(month)
+        month = (month - timedelta(days=1)).replace(day=1)
+    return months
+
+
+def selected_window(request):
+    """Jendela peringkat produk dari ?window=, atau default"""
+    window = request.GET.get('window')
+    return window if window in WINDOWS else DEFAULT_WINDOW
+
+
+def selected_margin_months(request):
+    """Rentang analisis margin (bulan) dari ?months=, atau default"""
+    try:
+        months = int(request.GET.get('months', DEFAULT_MARGIN_MONTHS))
+    except ValueError:
+        return DEFAULT_MARGIN_MONTHS
+    return months if months in MARGIN_MONTH_CHOICES else DEFAULT_MARGIN_MONTHS
+
+
+# --- Dashboard utama: builder(request, tenants, user_role) -> context ---
+
+def stats_panel(request, tenants, user_role):
+    # Dari penghitung per tenant: satu baris per tenant, berapa pun riwayatnya
+    counters = TenantStats.objects.filter(tenant__in=tenants).aggregate(
+        tenants=Count('pk'),
+        products=Sum('product_count'),
+        orders=Sum('order_count'),
+        revenue=Sum('revenue'),
+    )
+    return {'stats': {
+        'total_tenants': counters['tenants'],
+        'total_products': counters['products'] or 0,
+        'total_orders': counters['orders'] or 0,
+        'total_revenue': counters['revenue'] or 0,
+    }}
+
+
+def recent_orders_panel(request, tenants, user_role):
+    return {'recent_orders': (
+        Order.objects
+        .filter(tenant__in=tenants)
+        .select_related('tenant')
+        .order_by('-created_at')[:5]
+    )}
+
+
+def low_stock_panel(request, tenants, user_role):
+    # Daftar dijaga oleh apps.products.stock.sync_low_stock
+    return {'low_stock_products': [
+        item.product for item in
+        LowStockItem.objects
+        .filter(tenant__in=tenants)
+        .select_related('product__tenant', 'product__category')
+        .order_by('product__qty')[:5]
+    ]}
+
+
+def home_top_products_panel(request, tenants, user_role):
+    # Khusus client, dari peringkat 30 hari per tenant yang sudah dihitung
+    if user_role != 'client':
+        return None
+    return {'top_products': leaderboard(tenants.values_list('pk', flat=True), '30d', limit=5)}
+
+
+# --- Analisis tenant: builder(request, tenant) -> context ---
+
+def daily_revenue_panel(request, tenant):
+    # Dari rekap harian: satu baris per hari, memakai indeks (tenant, date)
+    end_date = timezone.localdate()
+    return {'daily_revenue': (
+        DailyTenantSales.objects
+        .filter(tenant=tenant, date__gte=end_date - timedelta(days=30), date__lte=end_date)
+        .order_by('date')
+        .values('revenue', 'order_count', day=F('date'))
+    )}
+
+
+def tenant_top_products_panel(request, tenant):
+    return {'top_products': leaderboard([tenant.pk], selected_window(request))}
+
+
+def customers_panel(request, tenant):
+    # 30 hari terakhir per nama/telepon, termasuk pelanggan tanpa nomor telepon
+    # (statistik seumur hidup per nomor ada di tabel customers)
+    start = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=30), time.min))
+    return {'customer_analysis': (
+        Order.objects
+        .filter(tenant=tenant, created_at__gte=start)
+        .exclude(customer_name__isnull=True, customer_name__exact='')
+        .values('customer_name', 'customer_phone')
+        .annotate(order_count=Count('id'), total_spent=Sum('total_amount'))
+        .order_by('-total_spent')[:10]
+    )}
+
+
+def margin_panel(request, tenant):
+    # Pendapatan dari rekap harian (satu GROUP BY per bulan) dan HPP per periode,
+    # masing-masing satu query berapa pun panjang rentangnya
+    months = recent_months(timezone.localdate(), selected_margin_months(request))
+
+    monthly_revenue = dict(
+        DailyTenantSales.objects
+        .filter(tenant=tenant, date__gte=months[-1])
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(revenue=Sum('revenue'))
+        .values_list('month', 'revenue')
+    )
+    hpp_totals = dict(
+        HPP.objects
+        .filter(tenant=tenant, periode__gte=months[-1].strftime('%Y-%m'))
+        .values_list('periode', 'amount_total')
+    )
+
+    margin_data = []
+    for month in months:
+        periode = month.strftime('%Y-%m')
+        period_revenue = monthly_revenue.get(month) or 0
+        hpp = hpp_totals.get(periode)
+        # Bulan tanpa HPP tetap ditampilkan, tanpa margin
+        margin = period_revenue - hpp if hpp is not None else None
+        margin_percentage = None
+        if margin is not None:
+            margin_percentage = (margin / period_revenue * 100) if period_revenue > 0 else 0
+
+        margin_data.append({
+            'periode': periode,
+            'revenue': period_revenue,
+            'hpp': hpp,
+            'margin': margin,
+            'margin_percentage': margin_percentage,
+        })
+    return {'margin_data': margin_data}
+
+
+# nama panel (di URL) -> (template fragment, builder)
+HOME_PANELS = {
+    'stats': ('dashboard/_panel_stats.html', stats_panel),
+    'recent-orders': ('dashboard/_panel_recent_orders.html', recent_orders_panel),
+    'low-stock': ('dashboard/_panel_low_stock.html', low_stock_panel),
+    'top-products': ('dashboard/_panel_top_products.html', home_top_products_panel),
+}
+ANALYTICS_PANELS = {
+    'daily-revenue': ('dashboard/_panel_daily_revenue.html', daily_revenue_panel),
+    'top-products': ('dashboard/_panel_tenant_top_products.html', tenant_top_products_panel),
+    'customers': ('dashboard/_panel_customers.html', customers_panel),
+    'margin': ('dashboard/_panel_margin.html', margin_panel),
+}
+
+
+def render_panel(panels, name, request, *args):
+    """HTML fragment panel `name`, atau None jika panel tidak berlaku untuk user ini"""
+    template, build = panels[name]
+    context = build(request, *args)
+    if context is None:
+        return None
+    return render_to_string(template, context, request=request)
@@ -1,3 +1,53 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.models import UserProfile
+from apps.orders.models import Order
+from apps.orders.services import create_order
+from apps.products.models import Product, ProductCategory
+from apps.tenants.models import Tenant
+
+
+class AnalyticsPanelTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='rahasia-123')
+        UserProfile.objects.create(user=self.owner, role='client', max_tenants=5)
+        self.tenant = Tenant.objects.create(owner=self.owner, name='Toko', address='Jl. A', phone='0811')
+        category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+        self.product = Product.objects.create(
+            tenant=self.tenant, category=category, sku='S1', name='Kopi',
+            qty=100, price=5000, created_by=self.owner,
+        )
+        self.client.force_login(self.owner)
+
+    def order(self, name, phone='', qty=1, days_ago=0):
+        order = Order(tenant=self.tenant, created_by=self.owner, customer_name=name, customer_phone=phone)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() - timedelta(days=days_ago)):
+            return create_order(order, [str(self.product.pk)], [str(qty)])
+
+    def panel(self, name):
+        return self.client.get(f'/dashboard/analytics/{self.tenant.pk}/panels/{name}/')
+
+    def test_customers_panel_covers_last_30_days_including_walk_ins(self):
+        self.order('Pembeli Langsung', qty=3)
+        self.order('Budi', phone='08121111', qty=1)
+        self.order('Lama', phone='08132222', qty=9, days_ago=45)
+
+        response = self.panel('customers')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Pembeli Langsung')
+        self.assertContains(response, 'Rp 15000')
+        self.assertContains(response, 'Budi')
+        self.assertNotContains(response, 'Lama')
+
+    def test_other_owner_forbidden(self):
+        other = User.objects.create_user('lain', password='rahasia-123')
+        UserProfile.objects.create(user=other, role='client', max_tenants=5)
+        self.client.force_login(other)
 
-# Create your tests here.
+        self.assertIn(self.panel('customers').status_code, (403, 404))
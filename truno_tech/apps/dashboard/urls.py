@@ -7,4 +7,6 @@ urlpatterns = [
     path('', views.dashboard_home_view, name='home'),
     path('analytics/', views.tenant_analytics_view, name='analytics'),
     path('analytics/<int:tenant_id>/', views.tenant_analytics_view, name='tenant_analytics'),
+    path('panels/<slug:panel>/', views.dashboard_panel_view, name='panel'),
+    path('analytics/<int:tenant_id>/panels/<slug:panel>/', views.analytics_panel_view, name='analytics_panel'),
 ]
\ No newline at end of file
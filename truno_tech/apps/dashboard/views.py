@@ -1,15 +1,15 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, F
-from django.db.models.functions import TruncDate
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import timedelta
 
-from apps.tenants.models import Tenant, TenantAccess
-from apps.products.models import Product
-from apps.orders.models import Order, OrderItem
-from apps.hpp.models import HPP
+from apps.tenants.models import Tenant
+from apps.orders.leaderboards import WINDOWS, window_range
+from . import panels
+from .panels import MARGIN_MONTH_CHOICES, selected_margin_months, selected_window
 
 
 def get_accessible_tenants(user):
@@ -47,56 +47,12 @@ def dashboard_home_view(request):
     if not tenants.exists():
         return render(request, 'dashboard/no_access.html')
 
-    # Rentang tanggal (30 hari terakhir)
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=30)
-
-    # Statistik dasar
-    stats = {
-        'total_tenants': tenants.count(),
-        'total_products': Product.objects.filter(tenant__in=tenants).count(),
-        'total_orders': Order.objects.filter(tenant__in=tenants).count(),
-        'total_revenue': Order.objects.filter(tenant__in=tenants).aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0,
-    }
-
-    # Order terbaru
-    recent_orders = (
-        Order.objects
-        .filter(tenant__in=tenants)
-        .select_related('tenant')
-        .order_by('-created_at')[:5]
-    )
-
-    # Produk stok menipis
-    low_stock_products = (
-        Product.objects
-        .filter(tenant__in=tenants, qty__lte=5, is_active=True)
-        .select_related('tenant', 'category')
-        .order_by('qty')[:5]
-    )
-
-    # Top products (khusus client)
-    top_products = None
-    if user_role == 'client':
-        top_products = (
-            OrderItem.objects
-            .filter(order__tenant__in=tenants, order__created_at__gte=start_date)
-            .values('product__name', 'product__tenant__name')
-            .annotate(
-                total_qty=Sum('qty'),
-                total_revenue=Sum(F('qty') * F('unit_price'))
-            )
-            .order_by('-total_revenue')[:5]
-        )
-
+    # Isi panel dimuat terpisah (lihat dashboard_panel_view)
+    period_start, period_end = window_range('30d', timezone.localdate())
     context = {
         'user_role': user_role,
-        'stats': stats,
-        'recent_orders': recent_orders,
-        'low_stock_products': low_stock_products,
-        'top_products': top_products,
+        'period_start': period_start,
+        'period_end': period_end,
     }
     return render(request, 'dashboard/dashboard.html', context)
 
@@ -121,86 +77,59 @@ def tenant_analytics_view(request, tenant_id=None):
             messages.error(request, 'Tidak ada tenant yang tersedia.')
             return redirect('dashboard:home')
 
-    # Rentang tanggal (30 hari terakhir)
-    end_date = timezone.now().date()
+    # Isi panel dimuat terpisah (lihat analytics_panel_view)
+    end_date = timezone.localdate()
     start_date = end_date - timedelta(days=30)
-
-    # Data order & revenue
-    orders = Order.objects.filter(tenant=tenant, created_at__date__gte=start_date)
-
-    # Daily revenue — ganti .extra() ke TruncDate (lebih aman & portable)
-    daily_revenue = (
-        orders
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(
-            revenue=Sum('total_amount'),
-            order_count=Count('id')
-        )
-        .order_by('day')
-    )
-
-    # Top products untuk tenant ini
-    top_products = (
-        OrderItem.objects
-        .filter(order__tenant=tenant, order__created_at__date__gte=start_date)
-        .values('product__name')
-        .annotate(
-            total_qty=Sum('qty'),
-            total_revenue=Sum(F('qty') * F('unit_price'))
-        )
-        .order_by('-total_revenue')[:10]
-    )
-
-    # Analisis pelanggan
-    customer_analysis = (
-        orders
-        .exclude(customer_name__isnull=True, customer_name__exact='')
-        .values('customer_name', 'customer_phone')
-        .annotate(
-            order_count=Count('id'),
-            total_spent=Sum('total_amount')
-        )
-        .order_by('-total_spent')[:10]
-    )
-
-    # Data HPP
-    hpp_records = HPP.objects.filter(tenant=tenant).order_by('-periode')[:6]
-
-    # Hitung margin jika ada data HPP
-    margin_data = []
-    for hpp in hpp_records:
-        period_start = datetime.strptime(hpp.periode, '%Y-%m').date()
-        period_end = (period_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-
-        period_revenue = (
-            Order.objects
-            .filter(
-                tenant=tenant,
-                created_at__date__gte=period_start,
-                created_at__date__lte=period_end
-            )
-            .aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        )
-
-        margin = period_revenue - hpp.amount_total
-        margin_percentage = (margin / period_revenue * 100) if period_revenue > 0 else 0
-
-        margin_data.append({
-            'periode': hpp.periode,
-            'revenue': period_revenue,
-            'hpp': hpp.amount_total,
-            'margin': margin,
-            'margin_percentage': margin_percentage,
-        })
-
     context = {
         'tenant': tenant,
         'tenants': tenants,
-        'daily_revenue': daily_revenue,
-        'top_products': top_products,
-        'customer_analysis': customer_analysis,
-        'margin_data': margin_data,
+        'margin_months': selected_margin_months(request),
+        'margin_month_choices': MARGIN_MONTH_CHOICES,
+        'top_window': selected_window(request),
+        'top_windows': WINDOWS,
         'date_range': f"{start_date} - {end_date}",
     }
     return render(request, 'dashboard/tenant_analytics.html', context)
+
+
+def _home_panel(request, name):
+    user = request.user
+    if not user.is_authenticated or not hasattr(user, 'userprofile'):
+        return None
+    return panels.render_panel(
+        panels.HOME_PANELS, name, request, get_accessible_tenants(user), user.userprofile.role
+    )
+
+
+def _analytics_panel(request, tenant_id, name):
+    user = request.user
+    if not user.is_authenticated or not hasattr(user, 'userprofile') or user.userprofile.role != 'client':
+        return None
+    tenant = Tenant.objects.filter(owner=user, id=tenant_id).first()
+    if not tenant:
+        return None
+    return panels.render_panel(panels.ANALYTICS_PANELS, name, request, tenant)
+
+
+# View panel async: login_required Django 4.2 belum mendukung view async, jadi
+# pengecekan user dilakukan di bagian sinkron. Query dan render berjalan lewat
+# sync_to_async, sehingga di bawah ASGI panel-panel satu halaman dilayani bersamaan.
+
+async def dashboard_panel_view(request, panel):
+    """Fragment HTML satu panel dashboard utama"""
+    if panel not in panels.HOME_PANELS:
+        raise Http404
+    html = await sync_to_async(_home_panel)(request, panel)
+    if html is None:
+        return HttpResponseForbidden()
+    return HttpResponse(html)
+
+
+async def analytics_panel_view(request, tenant_id, panel):
+    """Fragment HTML satu panel analisis tenant"""
+    if panel not in panels.ANALYTICS_PANELS:
+        raise Http404
+    html = await sync_to_async(_analytics_panel)(request, tenant_id, panel)
+    if html is None:
+        return HttpResponseForbidden()
+    return HttpResponse(html)
@@ -1,13 +1,64 @@
+from django import forms
 from django.contrib import admin
-from .models import Bahan, HPP, HPPDetail
+from django.db import transaction
+from django.utils import timezone
+from .models import Bahan, BahanPrice, HPP, HPPDetail, ProductRecipe
+from .pricing import delete_revision, month_of, period_end, recompute_hpp, revise_price
+
+class BahanAdminForm(forms.ModelForm):
+    class Meta:
+        model = Bahan
+        fields = '__all__'
+
+    def clean_harga_satuan(self):
+        harga_satuan = self.cleaned_data['harga_satuan']
+        if harga_satuan < 0:
+            raise forms.ValidationError('Harga satuan tidak boleh negatif.')
+        return harga_satuan
 
 @admin.register(Bahan)
 class BahanAdmin(admin.ModelAdmin):
+    form = BahanAdminForm
     list_display = ['nama_bahan', 'harga_satuan_display', 'satuan', 'is_active', 'created_by', 'created_at']
     list_filter = ['is_active', 'created_at', 'created_by']
     search_fields = ['nama_bahan']
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_readonly_fields(self, request, obj=None):
+        # Harga bahan yang sudah ada diubah lewat Bahan prices (revisi), agar HPP ikut dihitung ulang
+        if obj is not None:
+            return self.readonly_fields + ['harga_satuan']
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if not change:
+                revise_price(obj, obj.harga_satuan, timezone.localdate(), request.user)
+
+@admin.register(BahanPrice)
+class BahanPriceAdmin(admin.ModelAdmin):
+    list_display = ['bahan', 'harga_satuan_display', 'effective_from', 'created_by', 'created_at']
+    list_filter = ['effective_from', 'bahan__created_by']
+    search_fields = ['bahan__nama_bahan']
+    list_select_related = ['bahan', 'created_by']
+    raw_id_fields = ['bahan']
+    readonly_fields = ['created_by', 'created_at']
+
+    def save_model(self, request, obj, form, change):
+        if change and 'effective_from' in form.changed_data:
+            # Tanggal dipindah: periode lama kembali ke revisi sebelumnya
+            delete_revision(BahanPrice.objects.get(pk=obj.pk))
+        revise_price(obj.bahan, obj.harga_satuan, obj.effective_from, request.user)
+        obj.pk = BahanPrice.objects.get(bahan=obj.bahan, effective_from=obj.effective_from).pk
+
+    def delete_model(self, request, obj):
+        delete_revision(obj)
+
+    def delete_queryset(self, request, queryset):
+        for revision in queryset.select_related('bahan'):
+            delete_revision(revision)
+
 class HPPDetailInline(admin.TabularInline):
     model = HPPDetail
     extra = 0
@@ -15,14 +66,53 @@ class HPPDetailInline(admin.TabularInline):
 
 @admin.register(HPP)
 class HPPAdmin(admin.ModelAdmin):
-    list_display = ['tenant', 'periode', 'amount_total_display', 'created_by', 'created_at']
-    list_filter = ['tenant', 'periode', 'created_at']
+    list_display = ['tenant', 'periode', 'amount_total_display', 'is_closed', 'created_by', 'created_at']
+    list_filter = ['tenant', 'periode', 'is_closed', 'created_at']
     search_fields = ['tenant__name', 'periode']
-    readonly_fields = ['amount_total', 'created_at', 'updated_at']
+    readonly_fields = ['amount_total', 'closed_at', 'created_at', 'updated_at']
     inlines = [HPPDetailInline]
+    actions = ['recompute_prices']
+
+    @admin.action(description='Hitung ulang dari riwayat harga bahan (periode terbuka)')
+    def recompute_prices(self, request, queryset):
+        changed = 0
+        for hpp in queryset.filter(is_closed=False):
+            try:
+                end = month_of(period_end(hpp.periode))
+            except ValueError:
+                continue
+            for bahan_id in set(hpp.hpp_details.values_list('bahan_id', flat=True)):
+                changed += recompute_hpp(bahan_id, hpp.periode, end)['details']
+        self.message_user(request, f'{changed} detail HPP diperbarui.')
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_total()
 
 @admin.register(HPPDetail)
 class HPPDetailAdmin(admin.ModelAdmin):
     list_display = ['hpp', 'bahan', 'qty', 'harga_satuan_display', 'subtotal_display']
     list_filter = ['hpp__tenant', 'bahan']
-    search_fields = ['bahan__nama_bahan', 'hpp__periode']
\ No newline at end of file
+    search_fields = ['bahan__nama_bahan', 'hpp__periode']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        obj.hpp.refresh_total()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        obj.hpp.refresh_total()
+
+    def delete_queryset(self, request, queryset):
+        hpp_ids = set(queryset.values_list('hpp_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for hpp in HPP.objects.filter(pk__in=hpp_ids):
+            hpp.refresh_total()
+
+@admin.register(ProductRecipe)
+class ProductRecipeAdmin(admin.ModelAdmin):
+    list_display = ['product', 'bahan', 'qty']
+    list_filter = ['product__tenant']
+    search_fields = ['product__name', 'product__sku', 'bahan__nama_bahan']
+    list_select_related = ['product', 'bahan']
+    raw_id_fields = ['product', 'bahan']
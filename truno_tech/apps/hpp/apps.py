@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class HppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.hpp'
\ No newline at end of file
+    name = 'apps.hpp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
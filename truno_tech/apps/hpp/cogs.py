@@ -0,0 +1,155 @@
+"""
+Harga pokok penjualan (COGS) dan margin per order / per produk dari resep.
+
+Biaya satu unit produk adalah matriks resep (produk x bahan) dikali vektor
+harga bahan yang berlaku pada periode laporan (`pricing.prices_for_period`);
+biaya item order adalah qty x biaya unit produknya, lalu dijumlahkan per
+order dan per produk. Semuanya dihitung dengan pandas / NumPy dari beberapa
+query (item order, resep beserta harga bahan, riwayat harga), tanpa loop
+per baris di Python.
+"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.db.models import Sum
+from django.utils import timezone
+from apps.orders.models import OrderItem
+from .models import ProductRecipe
+from .pricing import prices_for_period
+
+ITEM_COLUMNS = ['order_id', 'product_id', 'qty', 'revenue']
+
+
+def period_range(periode):
+    """(awal, akhir) aware datetime untuk periode 'YYYY-MM'; ValueError jika format salah"""
+    start = datetime.strptime(periode, '%Y-%m')
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def period_items(tenant, periode):
+    """OrderItem semua order `tenant` pada periode 'YYYY-MM'"""
+    start, end = period_range(periode)
+    return OrderItem.objects.filter(
+        order__tenant=tenant,
+        order__created_at__gte=start,
+        order__created_at__lt=end,
+    )
+
+
+def recipe_matrix(product_ids, periode=None):
+    """
+    (matriks resep produk x bahan, Series harga per bahan) untuk `product_ids`
+    (list atau subquery). Harga yang berlaku pada `periode` 'YYYY-MM', atau
+    harga saat ini untuk bahan tanpa revisi sampai periode itu / jika
+    `periode` None. Produk tanpa resep tidak muncul di matriks.
+    """
+    rows = (
+        ProductRecipe.objects
+        .filter(product_id__in=product_ids)
+        .values_list('product_id', 'bahan_id', 'qty', 'bahan__harga_satuan')
+    )
+    recipe = pd.DataFrame.from_records(list(rows), columns=['product_id', 'bahan_id', 'qty', 'price'])
+    if recipe.empty:
+        return pd.DataFrame(dtype=float), pd.Series(dtype=float)
+
+    recipe['qty'] = recipe['qty'].astype(float)
+    matrix = recipe.pivot_table(
+        index='product_id', columns='bahan_id', values='qty', aggfunc='sum', fill_value=0.0
+    )
+    prices = recipe.drop_duplicates('bahan_id').set_index('bahan_id')['price']
+    if periode is not None:
+        prices = prices.astype(float)
+        prices.update(pd.Series(prices_for_period(matrix.columns.tolist(), periode), dtype=float))
+    return matrix, prices.reindex(matrix.columns).astype(float)
+
+
+def unit_costs(product_ids, periode=None):
+    """Series product_id -> biaya bahan per 1 unit (rupiah, float) pada `periode`"""
+    matrix, prices = recipe_matrix(product_ids, periode)
+    if matrix.empty:
+        return pd.Series(dtype=float)
+    return matrix.dot(prices)
+
+
+def bahan_consumption(tenants, periode):
+    """
+    Pemakaian bahan per tenant pada periode 'YYYY-MM' dari penjualan aktual.
+
+    Jumlah terjual per (tenant, produk) dijumlahkan di SQL, lalu dikalikan
+    matriks resep: (tenant x produk) . (produk x bahan) = (tenant x bahan).
+    Mengembalikan (DataFrame pemakaian, Series jumlah unit terjual per tenant);
+    produk tanpa resep tidak menyumbang pemakaian.
+    """
+    start, end = period_range(periode)
+    items = OrderItem.objects.filter(
+        order__tenant__in=tenants, order__created_at__gte=start, order__created_at__lt=end
+    )
+    rows = (
+        items
+        .values_list('order__tenant_id', 'product_id')
+        .annotate(sold=Sum('qty'))
+        .order_by()
+    )
+    sold = pd.DataFrame.from_records(list(rows), columns=['tenant_id', 'product_id', 'sold'])
+    if sold.empty:
+        return pd.DataFrame(dtype=float), pd.Series(dtype='int64')
+
+    volume = sold.pivot_table(index='tenant_id', columns='product_id', values='sold', aggfunc='sum', fill_value=0)
+    units = volume.sum(axis=1)
+    matrix, _ = recipe_matrix(items.values('product_id'))
+    if matrix.empty:
+        return pd.DataFrame(dtype=float), units
+
+    volume = volume.reindex(columns=matrix.index, fill_value=0).astype(float)
+    return volume.dot(matrix), units
+
+
+def _summarize(frame):
+    frame['cogs'] = frame['cogs'].round().astype('int64')
+    frame['margin'] = frame['revenue'] - frame['cogs']
+    frame['margin_pct'] = (frame['margin'] / frame['revenue'].where(frame['revenue'] != 0) * 100).round(1)
+    return frame
+
+
+def cogs_report(items, periode=None):
+    """
+    COGS dan margin untuk queryset OrderItem `items`, dalam satu pass, dengan
+    harga bahan yang berlaku pada `periode` (None: harga saat ini).
+
+    Mengembalikan dict berisi DataFrame:
+    - 'orders': per order_id -> revenue, cogs, margin, margin_pct, complete
+    - 'products': per product_id -> qty, revenue, unit_cost, cogs, margin, margin_pct, complete
+    `complete` False berarti (sebagian) produk belum punya resep, sehingga
+    COGS-nya belum lengkap (dihitung 0 untuk produk tersebut).
+    """
+    rows = items.values_list('order_id', 'product_id', 'qty', 'subtotal')
+    frame = pd.DataFrame.from_records(list(rows), columns=ITEM_COLUMNS)
+    if frame.empty:
+        empty = pd.DataFrame(columns=['revenue', 'cogs', 'margin', 'margin_pct', 'complete'])
+        return {'orders': empty, 'products': empty.assign(qty=[], unit_cost=[])}
+
+    costs = unit_costs(items.values('product_id'), periode)
+    frame['unit_cost'] = frame['product_id'].map(costs)
+    frame['complete'] = frame['unit_cost'].notna()
+    frame['cogs'] = frame['qty'] * frame['unit_cost'].fillna(0.0)
+
+    by_order = frame.groupby('order_id').agg(
+        revenue=('revenue', 'sum'),
+        cogs=('cogs', 'sum'),
+        complete=('complete', 'all'),
+    )
+    by_product = frame.groupby('product_id').agg(
+        qty=('qty', 'sum'),
+        revenue=('revenue', 'sum'),
+        unit_cost=('unit_cost', 'first'),
+        cogs=('cogs', 'sum'),
+        complete=('complete', 'all'),
+    )
+    return {'orders': _summarize(by_order), 'products': _summarize(by_product)}
+
+
+def records(frame):
+    """Baris DataFrame (termasuk index) sebagai list dict untuk template; NaN menjadi None"""
+    frame = frame.reset_index().astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
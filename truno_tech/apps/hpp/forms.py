@@ -1,12 +1,20 @@
 from django import forms
 from django.forms import inlineformset_factory
+from django.utils import timezone
 from .models import Bahan, HPP, HPPDetail
 
 class BahanForm(forms.ModelForm):
     harga_satuan = forms.IntegerField(
+        min_value=0,
         label='Harga Satuan (Rp)',
         widget=forms.NumberInput(attrs={'class': 'form-control'})
     )
+    berlaku_mulai = forms.DateField(
+        label='Harga Berlaku Mulai',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        help_text='Isi tanggal lampau untuk merevisi harga periode sebelumnya; HPP periode terkait dihitung ulang.'
+    )
     
     class Meta:
         model = Bahan
@@ -22,6 +30,12 @@ class BahanForm(forms.ModelForm):
             'satuan': 'Satuan',
             'keterangan': 'Keterangan',
         }
+    
+    def clean_berlaku_mulai(self):
+        berlaku_mulai = self.cleaned_data.get('berlaku_mulai') or timezone.localdate()
+        if berlaku_mulai > timezone.localdate():
+            raise forms.ValidationError('Tanggal berlaku tidak boleh di masa depan.')
+        return berlaku_mulai
 
 class HPPForm(forms.ModelForm):
     periode = forms.CharField(
@@ -42,7 +56,7 @@ class HPPForm(forms.ModelForm):
 
 class HPPDetailForm(forms.ModelForm):
     bahan = forms.ModelChoiceField(
-        queryset=Bahan.objects.filter(is_active=True),
+        queryset=Bahan.objects.none(),
         widget=forms.Select(attrs={'class': 'form-control bahan-select'}),
         label='Bahan'
     )
@@ -58,8 +72,12 @@ class HPPDetailForm(forms.ModelForm):
         fields = ['bahan', 'qty']
     
     def __init__(self, *args, **kwargs):
+        # Hanya bahan milik client yang sedang login
+        user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
-        self.fields['bahan'].queryset = Bahan.objects.filter(is_active=True)
+        self.fields['bahan'].queryset = (
+            Bahan.objects.filter(created_by=user, is_active=True) if user else Bahan.objects.none()
+        )
 
 # Create formset for HPP details
 HPPDetailFormSet = inlineformset_factory(
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.hpp.services import HPPCreationError, generate_hpp
+from apps.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Buat HPP bulanan semua tenant dari penjualan dan resep produk. Jalankan '
+        'setelah akhir bulan (mis. lewat cron tanggal 1); HPP yang sudah ada dilewati.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periode', help='Periode YYYY-MM (default: bulan lalu)')
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument(
+            '--replace', action='store_true',
+            help='Buat ulang HPP yang sudah ada jika periodenya belum ditutup'
+        )
+
+    def handle(self, *args, **options):
+        periode = options['periode'] or (timezone.localdate().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        try:
+            result = generate_hpp(tenants, periode, replace=options['replace'])
+        except HPPCreationError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'HPP {periode}: {result["created"]} dibuat, {result["replaced"]} dibuat ulang, '
+            f'{result["existing"]} sudah ada, {result["closed"]} periode ditutup, '
+            f'{result["empty"]} tanpa penjualan/resep.'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hpp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bahan',
+            index=models.Index(fields=['created_by', 'nama_bahan', 'id'], name='bahan_owner_name_idx'),
+        ),
+    ]
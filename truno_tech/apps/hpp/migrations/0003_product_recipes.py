@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_images'),
+        ('hpp', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qty', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('bahan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_lines', to='hpp.bahan')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_lines', to='products.product')),
+            ],
+            options={
+                'db_table': 'product_recipes',
+                'ordering': ['id'],
+                'unique_together': {('product', 'bahan')},
+            },
+        ),
+    ]
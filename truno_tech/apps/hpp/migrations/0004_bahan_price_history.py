@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def initial_prices(apps, schema_editor):
+    # Harga saat ini diketahui berlaku sejak bahan terakhir diubah; detail HPP
+    # periode sebelumnya tetap memakai harga yang tersimpan
+    Bahan = apps.get_model('hpp', 'Bahan')
+    BahanPrice = apps.get_model('hpp', 'BahanPrice')
+    BahanPrice.objects.bulk_create(
+        (BahanPrice(
+            bahan_id=pk,
+            harga_satuan=harga_satuan,
+            effective_from=django.utils.timezone.localdate(updated_at),
+            created_by_id=created_by_id,
+        ) for pk, harga_satuan, updated_at, created_by_id in Bahan.objects.values_list(
+            'pk', 'harga_satuan', 'updated_at', 'created_by_id'
+        ).iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hpp', '0003_product_recipes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hpp',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hpp',
+            name='is_closed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='BahanPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('harga_satuan', models.BigIntegerField()),
+                ('effective_from', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bahan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='hpp.bahan')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'bahan_prices',
+                'ordering': ['bahan', '-effective_from'],
+                'unique_together': {('bahan', 'effective_from')},
+            },
+        ),
+        migrations.RunPython(initial_prices, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,17 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
 from django.contrib.auth.models import User
 from apps.tenants.models import Tenant
+from apps.products.models import Product
+
+QTY_STEP = Decimal('0.01')
+
+
+def detail_subtotal(qty, harga_satuan):
+    """qty * harga_satuan dalam rupiah, dihitung dengan Decimal dan dibulatkan ke rupiah terdekat"""
+    subtotal = Decimal(qty).quantize(QTY_STEP, rounding=ROUND_HALF_UP) * harga_satuan
+    return int(subtotal.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
 
 class Bahan(models.Model):
     """Master data bahan untuk perhitungan HPP"""
@@ -25,6 +36,30 @@ class Bahan(models.Model):
         db_table = 'bahan'
         ordering = ['nama_bahan']
         verbose_name_plural = 'Bahan'
+        indexes = [
+            models.Index(fields=['created_by', 'nama_bahan', 'id'], name='bahan_owner_name_idx'),
+        ]
+
+class BahanPrice(models.Model):
+    """Riwayat harga bahan; berlaku mulai `effective_from` sampai revisi berikutnya"""
+    bahan = models.ForeignKey(Bahan, on_delete=models.CASCADE, related_name='prices')
+    harga_satuan = models.BigIntegerField()  # Price per unit in rupiah
+    effective_from = models.DateField()
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.bahan.nama_bahan} - {self.harga_satuan_display} ({self.effective_from})"
+    
+    @property
+    def harga_satuan_display(self):
+        """Display price in rupiah format"""
+        return f"Rp {self.harga_satuan:,}"
+    
+    class Meta:
+        db_table = 'bahan_prices'
+        unique_together = ['bahan', 'effective_from']
+        ordering = ['bahan', '-effective_from']
 
 class HPP(models.Model):
     """Main HPP record per tenant per period"""
@@ -32,6 +67,8 @@ class HPP(models.Model):
     periode = models.CharField(max_length=7, help_text="Format: YYYY-MM")  # e.g., "2024-01"
     amount_total = models.BigIntegerField()  # Total HPP amount
     catatan = models.TextField(blank=True)
+    is_closed = models.BooleanField(default=False)  # Periode ditutup: tidak dihitung ulang saat harga bahan direvisi
+    closed_at = models.DateTimeField(null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -51,6 +88,11 @@ class HPP(models.Model):
         )['total'] or 0
         return total
     
+    def refresh_total(self):
+        """Simpan ulang amount_total dari detail (satu aggregate dan satu UPDATE)"""
+        self.amount_total = self.calculate_total()
+        HPP.objects.filter(pk=self.pk).update(amount_total=self.amount_total)
+    
     def save(self, *args, **kwargs):
         if not self.amount_total:
             # Calculate total after saving details
@@ -92,13 +134,24 @@ class HPPDetail(models.Model):
             self.harga_satuan = self.bahan.harga_satuan
         
         # Calculate subtotal
-        self.subtotal = int(float(self.qty) * self.harga_satuan)
+        self.subtotal = detail_subtotal(self.qty, self.harga_satuan)
         
+        # Total HPP tidak dihitung ulang per detail; pemanggil memanggil hpp.refresh_total() sekali
         super().save(*args, **kwargs)
-        
-        # Update HPP total
-        self.hpp.amount_total = self.hpp.calculate_total()
-        self.hpp.save(update_fields=['amount_total'])
     
     class Meta:
-        db_table = 'hpp_details'
\ No newline at end of file
+        db_table = 'hpp_details'
+
+class ProductRecipe(models.Model):
+    """Resep produk: jumlah bahan yang dipakai untuk membuat 1 unit produk"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recipe_lines')
+    bahan = models.ForeignKey(Bahan, on_delete=models.CASCADE, related_name='recipe_lines')
+    qty = models.DecimalField(max_digits=12, decimal_places=4)  # Per 1 unit produk, dalam satuan bahan
+    
+    def __str__(self):
+        return f"{self.product.name}: {self.qty} {self.bahan.satuan} {self.bahan.nama_bahan}"
+    
+    class Meta:
+        db_table = 'product_recipes'
+        unique_together = ['product', 'bahan']
+        ordering = ['id']
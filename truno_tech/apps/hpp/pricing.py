@@ -0,0 +1,185 @@
+"""
+Riwayat harga bahan dan perhitungan ulang HPP per periode.
+
+Harga bahan untuk periode 'YYYY-MM' adalah revisi `BahanPrice` terakhir
+yang berlaku sebelum periode itu berakhir. Revisi yang berlaku mulai
+tanggal D hanya memengaruhi periode dari bulan D sampai sebelum bulan
+revisi berikutnya, jadi hanya detail HPP pada rentang itu yang dihitung
+ulang (bulk update), bukan seluruh riwayat. HPP yang periodenya sudah
+ditutup (`is_closed`) tidak pernah diubah.
+"""
+from bisect import bisect_left
+from datetime import date, datetime
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.core.refcache import bump, bahan_scope
+from .models import BahanPrice, HPP, HPPDetail, detail_subtotal
+
+BULK_BATCH_SIZE = 500
+
+
+class PriceRevisionError(Exception):
+    """Revisi harga bahan tidak dapat disimpan"""
+
+
+def month_of(day):
+    """Periode 'YYYY-MM' dari sebuah tanggal"""
+    return day.strftime('%Y-%m')
+
+
+def period_end(periode):
+    """Tanggal pertama bulan setelah periode 'YYYY-MM'; ValueError jika format salah"""
+    start = datetime.strptime(periode, '%Y-%m').date()
+    if start.month == 12:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 1, 1)
+
+
+def _price_at(revisions, end):
+    """Harga dari `revisions` [(effective_from, harga), ...] terurut yang berlaku sebelum `end`"""
+    index = bisect_left(revisions, (end,)) - 1
+    return revisions[index][1] if index >= 0 else None
+
+
+def prices_for_period(bahan_ids, periode):
+    """dict bahan_id -> harga yang berlaku pada `periode` (bahan tanpa revisi tidak ada)"""
+    revisions = (
+        BahanPrice.objects
+        .filter(bahan_id__in=bahan_ids, effective_from__lt=period_end(periode))
+        .order_by('bahan_id', '-effective_from')
+        .values_list('bahan_id', 'harga_satuan')
+    )
+    prices = {}
+    for bahan_id, harga in revisions:
+        prices.setdefault(bahan_id, harga)
+    return prices
+
+
+def refresh_hpp_totals(hpp_ids):
+    """Hitung ulang amount_total beberapa HPP dengan satu UPDATE"""
+    totals = (
+        HPPDetail.objects
+        .filter(hpp=OuterRef('pk'))
+        .values('hpp')
+        .annotate(total=Sum('subtotal'))
+        .values('total')
+    )
+    return HPP.objects.filter(pk__in=hpp_ids).update(
+        amount_total=Coalesce(Subquery(totals), 0),
+        updated_at=timezone.now(),
+    )
+
+
+def recompute_hpp(bahan_id, start, end=None):
+    """
+    Samakan harga detail HPP bahan `bahan_id` dengan riwayat harganya untuk
+    periode `start` <= periode < `end` (None: tanpa batas atas).
+
+    Periode yang belum punya revisi harga dibiarkan. Mengembalikan dict
+    jumlah detail dan HPP yang berubah, serta HPP terkunci yang dilewati.
+    """
+    revisions = list(
+        BahanPrice.objects
+        .filter(bahan_id=bahan_id)
+        .order_by('effective_from')
+        .values_list('effective_from', 'harga_satuan')
+    )
+    details = HPPDetail.objects.filter(bahan_id=bahan_id, hpp__periode__gte=start)
+    if end:
+        details = details.filter(hpp__periode__lt=end)
+
+    changed = []
+    ends = {}
+    open_details = (
+        details
+        .filter(hpp__is_closed=False)
+        .annotate(periode=F('hpp__periode'))
+        .only('id', 'hpp_id', 'qty', 'harga_satuan', 'subtotal')
+    )
+    for detail in open_details:
+        if detail.periode not in ends:
+            try:
+                ends[detail.periode] = period_end(detail.periode)
+            except ValueError:
+                ends[detail.periode] = None
+        if ends[detail.periode] is None:
+            continue
+        harga = _price_at(revisions, ends[detail.periode])
+        if harga is None or harga == detail.harga_satuan:
+            continue
+        detail.harga_satuan = harga
+        detail.subtotal = detail_subtotal(detail.qty, harga)
+        changed.append(detail)
+
+    hpp_ids = {detail.hpp_id for detail in changed}
+    with transaction.atomic():
+        HPPDetail.objects.bulk_update(changed, ['harga_satuan', 'subtotal'], batch_size=BULK_BATCH_SIZE)
+        refresh_hpp_totals(hpp_ids)
+
+    return {
+        'details': len(changed),
+        'hpps': len(hpp_ids),
+        'locked': details.filter(hpp__is_closed=True).values('hpp_id').distinct().count(),
+    }
+
+
+def _affected_range(bahan_id, effective_from):
+    """(periode awal, periode akhir eksklusif atau None) yang dipengaruhi revisi pada `effective_from`"""
+    next_revision = (
+        BahanPrice.objects
+        .filter(bahan_id=bahan_id, effective_from__gt=effective_from)
+        .order_by('effective_from')
+        .values_list('effective_from', flat=True)
+        .first()
+    )
+    return month_of(effective_from), month_of(next_revision) if next_revision else None
+
+
+def _sync_current_price(bahan):
+    """Samakan Bahan.harga_satuan dengan harga yang berlaku hari ini"""
+    current = (
+        BahanPrice.objects
+        .filter(bahan=bahan, effective_from__lte=timezone.localdate())
+        .order_by('-effective_from')
+        .values_list('harga_satuan', flat=True)
+        .first()
+    )
+    if current is not None and current != bahan.harga_satuan:
+        bahan.harga_satuan = current
+        type(bahan).objects.filter(pk=bahan.pk).update(harga_satuan=current, updated_at=timezone.now())
+        bump(bahan_scope(bahan.created_by_id))
+
+
+def revise_price(bahan, harga_satuan, effective_from, user=None):
+    """
+    Catat harga `bahan` yang berlaku mulai `effective_from` (menimpa revisi
+    pada tanggal yang sama) dan hitung ulang HPP periode yang terpengaruh.
+    Tanggal di masa depan ditolak karena harga saat ini langsung diperbarui.
+    """
+    if harga_satuan is None or harga_satuan < 0:
+        raise PriceRevisionError('Harga satuan tidak boleh negatif')
+    if effective_from > timezone.localdate():
+        raise PriceRevisionError('Tanggal berlaku tidak boleh di masa depan')
+
+    with transaction.atomic():
+        BahanPrice.objects.update_or_create(
+            bahan=bahan,
+            effective_from=effective_from,
+            defaults={'harga_satuan': harga_satuan, 'created_by': user},
+        )
+        _sync_current_price(bahan)
+        result = recompute_hpp(bahan.pk, *_affected_range(bahan.pk, effective_from))
+    return result
+
+
+def delete_revision(revision):
+    """Hapus revisi harga; periode yang dipengaruhinya kembali ke revisi sebelumnya"""
+    with transaction.atomic():
+        start, end = _affected_range(revision.bahan_id, revision.effective_from)
+        revision.delete()
+        _sync_current_price(revision.bahan)
+        result = recompute_hpp(revision.bahan_id, start, end)
+    return result
@@ -0,0 +1,224 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Bahan, HPP, HPPDetail, ProductRecipe, QTY_STEP, detail_subtotal
+from .cogs import bahan_consumption
+from .pricing import prices_for_period
+
+BULK_BATCH_SIZE = 500
+
+RECIPE_QTY_STEP = Decimal('0.0001')
+# Batas atas (eksklusif) ProductRecipe.qty menurut max_digits/decimal_places field-nya
+_recipe_qty_field = ProductRecipe._meta.get_field('qty')
+RECIPE_QTY_MAX = Decimal(10) ** (_recipe_qty_field.max_digits - _recipe_qty_field.decimal_places)
+
+
+class HPPCreationError(Exception):
+    """HPP tidak dapat dibuat dari bahan yang dikirim"""
+
+
+class RecipeError(Exception):
+    """Resep produk tidak valid"""
+
+
+def _build_details(hpp, lines, bahan_map, prices):
+    """
+    Buat HPPDetail (belum disimpan) untuk `lines` [(bahan_id, qty), ...]
+    dan isi total HPP di memori. Harga diambil dari `prices` (harga yang
+    berlaku pada periode HPP), atau harga bahan saat ini. Subtotal dihitung
+    dengan Decimal.
+    """
+    details = []
+    total_amount = 0
+
+    for bahan_id, qty_raw in lines:
+        try:
+            bahan = bahan_map.get(int(bahan_id))
+        except (TypeError, ValueError) as e:
+            raise HPPCreationError(f'Error pada bahan: {str(e)}')
+        if bahan is None:
+            raise HPPCreationError(
+                f'Error pada bahan: {Bahan._meta.object_name} matching query does not exist.'
+            )
+        try:
+            qty = Decimal(str(qty_raw).strip())
+        except InvalidOperation:
+            raise HPPCreationError(f'Error pada bahan: jumlah {bahan.nama_bahan} tidak valid')
+        if not qty.is_finite() or qty <= 0:
+            raise HPPCreationError(f'Error pada bahan: jumlah {bahan.nama_bahan} harus lebih dari 0')
+
+        harga_satuan = prices.get(bahan.id, bahan.harga_satuan)
+        detail = HPPDetail(
+            hpp=hpp,
+            bahan=bahan,
+            qty=qty.quantize(QTY_STEP),
+            harga_satuan=harga_satuan,
+            subtotal=detail_subtotal(qty, harga_satuan),
+        )
+        details.append(detail)
+        total_amount += detail.subtotal
+
+    if total_amount == 0:
+        raise HPPCreationError('HPP harus memiliki minimal satu bahan')
+
+    hpp.amount_total = total_amount
+    return details
+
+
+def create_hpp(hpp, bahan_ids, quantities):
+    """
+    Simpan HPP beserta detail bahannya secara batch.
+
+    `hpp` adalah instance HPP yang belum disimpan dengan tenant dan created_by
+    sudah terisi; hanya bahan aktif milik created_by yang bisa dipakai. Jumlah
+    query tetap berapa pun banyaknya bahan: satu query bahan, satu query
+    riwayat harga, satu insert HPP (dengan total) dan satu bulk insert detail.
+    """
+    lines = [
+        (bahan_id, qty_str)
+        for bahan_id, qty_str in zip(bahan_ids, quantities)
+        if bahan_id and qty_str
+    ]
+
+    try:
+        bahan_map = Bahan.objects.filter(created_by=hpp.created_by, is_active=True).in_bulk(
+            {bahan_id for bahan_id, _ in lines}
+        )
+    except ValueError as e:
+        raise HPPCreationError(f'Error pada bahan: {str(e)}')
+
+    try:
+        prices = prices_for_period(list(bahan_map), hpp.periode)
+    except ValueError:
+        raise HPPCreationError('Format periode harus YYYY-MM')
+    details = _build_details(hpp, lines, bahan_map, prices)
+
+    try:
+        with transaction.atomic():
+            hpp.save()
+            HPPDetail.objects.bulk_create(details)
+    except IntegrityError:
+        raise HPPCreationError(f'HPP periode {hpp.periode} untuk tenant ini sudah ada')
+    return hpp
+
+
+def generate_hpp(tenants, periode, replace=False):
+    """
+    Buat HPP `periode` untuk setiap tenant di `tenants` dari penjualan aktual
+    dan resep produk: pemakaian bahan = jumlah terjual x resep, dengan harga
+    bahan yang berlaku pada periode itu.
+
+    Seperti `create_hpp`, hanya bahan aktif milik owner tenant yang dipakai;
+    pemakaian bahan lain (mis. sudah dinonaktifkan) tidak dihitung.
+    HPP yang sudah ada dilewati, kecuali `replace` dan periodenya belum
+    ditutup. Semua tenant ditulis dengan satu bulk insert HPP dan satu bulk
+    insert detail. Mengembalikan dict jumlah HPP per hasil.
+    """
+    tenants = list(tenants)
+    try:
+        consumption, units = bahan_consumption(tenants, periode)
+        prices = prices_for_period(consumption.columns.tolist(), periode)
+    except ValueError:
+        raise HPPCreationError('Format periode harus YYYY-MM')
+    bahan_map = Bahan.objects.filter(is_active=True).in_bulk(consumption.columns.tolist())
+    existing = {hpp.tenant_id: hpp for hpp in HPP.objects.filter(tenant__in=tenants, periode=periode)}
+
+    result = {'created': 0, 'replaced': 0, 'closed': 0, 'existing': 0, 'empty': 0}
+    new_hpps, replaced_hpps, details = [], [], []
+    for tenant in tenants:
+        hpp = existing.get(tenant.pk)
+        if hpp is not None and hpp.is_closed:
+            result['closed'] += 1
+            continue
+        if hpp is not None and not replace:
+            result['existing'] += 1
+            continue
+
+        lines = []
+        if tenant.pk in consumption.index:
+            for bahan_id, qty in consumption.loc[tenant.pk].items():
+                bahan = bahan_map.get(bahan_id)
+                if bahan is None or bahan.created_by_id != tenant.owner_id:
+                    continue
+                qty = Decimal(str(round(qty, 4))).quantize(QTY_STEP, rounding=ROUND_HALF_UP)
+                if qty > 0:
+                    lines.append((bahan_id, qty))
+
+        if hpp is None:
+            hpp = HPP(tenant=tenant, periode=periode, created_by_id=tenant.owner_id)
+        try:
+            tenant_details = _build_details(hpp, lines, bahan_map, prices)
+        except HPPCreationError:
+            result['empty'] += 1
+            continue
+
+        hpp.catatan = f'Dibuat otomatis dari {int(units[tenant.pk])} unit terjual periode {periode}.'
+        if hpp.pk:
+            hpp.updated_at = timezone.now()
+            replaced_hpps.append(hpp)
+        else:
+            new_hpps.append(hpp)
+        details.extend(tenant_details)
+
+    try:
+        with transaction.atomic():
+            HPP.objects.bulk_create(new_hpps, batch_size=BULK_BATCH_SIZE)
+            HPPDetail.objects.filter(hpp__in=replaced_hpps).delete()
+            HPP.objects.bulk_update(replaced_hpps, ['amount_total', 'catatan', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+            HPPDetail.objects.bulk_create(details, batch_size=BULK_BATCH_SIZE)
+    except IntegrityError:
+        raise HPPCreationError(f'HPP periode {periode} dibuat bersamaan oleh proses lain, coba lagi')
+
+    result['created'] = len(new_hpps)
+    result['replaced'] = len(replaced_hpps)
+    return result
+
+
+def save_recipe(product, user, bahan_ids, quantities):
+    """
+    Ganti resep `product` dengan `bahan_ids` / `quantities` (jumlah per 1 unit
+    produk). Hanya bahan aktif milik `user`; bahan yang sama dijumlahkan.
+    Resep kosong menghapus resep produk.
+    """
+    lines = [
+        (bahan_id, qty_str)
+        for bahan_id, qty_str in zip(bahan_ids, quantities)
+        if bahan_id and qty_str
+    ]
+
+    try:
+        bahan_map = Bahan.objects.filter(created_by=user, is_active=True).in_bulk(
+            {bahan_id for bahan_id, _ in lines}
+        )
+    except ValueError as e:
+        raise RecipeError(f'Error pada bahan: {str(e)}')
+
+    merged = {}
+    for bahan_id, qty_raw in lines:
+        bahan = bahan_map.get(int(bahan_id))
+        if bahan is None:
+            raise RecipeError(f'Error pada bahan: {Bahan._meta.object_name} matching query does not exist.')
+        try:
+            qty = Decimal(str(qty_raw).strip())
+        except InvalidOperation:
+            raise RecipeError(f'Jumlah {bahan.nama_bahan} tidak valid')
+        if not qty.is_finite() or qty <= 0:
+            raise RecipeError(f'Jumlah {bahan.nama_bahan} harus lebih dari 0')
+        total = merged.get(bahan.id, 0) + qty
+        if total < RECIPE_QTY_MAX:
+            # Dicek dulu: quantize angka sebesar 1e30 melempar InvalidOperation
+            total = total.quantize(RECIPE_QTY_STEP)
+        if total >= RECIPE_QTY_MAX:
+            raise RecipeError(f'Jumlah {bahan.nama_bahan} harus kurang dari {RECIPE_QTY_MAX}')
+        if total <= 0:
+            raise RecipeError(f'Jumlah {bahan.nama_bahan} harus minimal {RECIPE_QTY_STEP}')
+        merged[bahan.id] = total
+
+    with transaction.atomic():
+        ProductRecipe.objects.filter(product=product).delete()
+        ProductRecipe.objects.bulk_create([
+            ProductRecipe(product=product, bahan_id=bahan_id, qty=qty)
+            for bahan_id, qty in merged.items()
+        ])
+    return len(merged)
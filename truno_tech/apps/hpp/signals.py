@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.refcache import bump, bahan_scope
+from .models import Bahan
+
+
+@receiver([post_save, post_delete], sender=Bahan)
+def bump_bahan_version(sender, instance, **kwargs):
+    """Data bahan client berubah: cache endpoint AJAX tidak berlaku lagi"""
+    bump(bahan_scope(instance.created_by_id))
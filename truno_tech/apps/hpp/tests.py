@@ -1,3 +1,242 @@
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.models import UserProfile
+from apps.orders.models import Order
+from apps.orders.services import create_order
+from apps.products.models import Product, ProductCategory
+from apps.tenants.models import Tenant
+from .cogs import unit_costs
+from .models import Bahan, BahanPrice, HPP, HPPDetail, ProductRecipe
+from .pricing import PriceRevisionError, delete_revision, revise_price
+from .services import HPPCreationError, RecipeError, generate_hpp, save_recipe
+
+PERIODS = ['2024-01', '2024-02', '2024-03', '2024-04', '2024-05', '2024-06']
+
+
+class HPPFixtureMixin:
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='rahasia-123')
+        UserProfile.objects.create(user=self.owner, role='client', max_tenants=5)
+        self.tenant = Tenant.objects.create(owner=self.owner, name='Toko', address='Jl. A', phone='0811')
+        self.bahan = Bahan.objects.create(nama_bahan='Gula', satuan='kg', harga_satuan=100, created_by=self.owner)
+
+
+class RecipeTest(HPPFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+        self.product = Product.objects.create(
+            tenant=self.tenant, category=category, sku='A', name='Teh Manis',
+            qty=10, price=5000, created_by=self.owner,
+        )
+        self.tepung = Bahan.objects.create(nama_bahan='Tepung', satuan='kg', harga_satuan=50, created_by=self.owner)
+
+    def recipe(self):
+        return dict(ProductRecipe.objects.filter(product=self.product).values_list('bahan__nama_bahan', 'qty'))
+
+    def test_same_bahan_is_merged_and_recipe_replaced(self):
+        save_recipe(self.product, self.owner, [str(self.tepung.pk)], ['1'])
+
+        count = save_recipe(
+            self.product, self.owner,
+            [str(self.bahan.pk), str(self.bahan.pk), ''], ['0.25', '0.50006', '3'],
+        )
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self.recipe(), {'Gula': Decimal('0.7501')})
+
+    def test_other_users_bahan_rejected(self):
+        other = User.objects.create_user('lain', password='rahasia-123')
+        foreign = Bahan.objects.create(nama_bahan='Kopi', satuan='kg', harga_satuan=10, created_by=other)
+
+        with self.assertRaises(RecipeError):
+            save_recipe(self.product, self.owner, [str(foreign.pk)], ['1'])
+
+    def test_out_of_range_qty_rejected(self):
+        for qty in ['1e30', '100000000', '0.00001', '-1', 'NaN', 'abc']:
+            with self.subTest(qty=qty), self.assertRaises(RecipeError):
+                save_recipe(self.product, self.owner, [str(self.bahan.pk)], [qty])
+
+        # Jumlah gabungan juga dibatasi
+        with self.assertRaises(RecipeError):
+            save_recipe(self.product, self.owner, [str(self.bahan.pk)] * 2, ['60000000', '60000000'])
+        self.assertEqual(self.recipe(), {})
+
+    def test_view_reports_invalid_qty(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.post(f'/hpp/recipes/{self.product.pk}/', {
+            'bahan_id[]': [str(self.bahan.pk)], 'qty[]': ['1e30'],
+        })
+
+        self.assertContains(response, 'Jumlah Gula harus kurang dari')
+        self.assertFalse(ProductRecipe.objects.exists())
+
+
+class PriceRevisionTest(HPPFixtureMixin, TestCase):
+    """Revisi harga hanya menghitung ulang periode dari bulan berlakunya sampai revisi berikutnya"""
+
+    def setUp(self):
+        super().setUp()
+        for periode in PERIODS:
+            hpp = HPP.objects.create(
+                tenant=self.tenant, periode=periode, amount_total=200, created_by=self.owner,
+                is_closed=periode == '2024-06',
+            )
+            HPPDetail.objects.create(hpp=hpp, bahan=self.bahan, qty=Decimal('2'), harga_satuan=100)
+
+    def prices(self):
+        return dict(HPPDetail.objects.values_list('hpp__periode', 'harga_satuan'))
+
+    def totals(self):
+        return dict(HPP.objects.values_list('periode', 'amount_total'))
+
+    def test_revision_recomputes_until_next_revision(self):
+        revise_price(self.bahan, 200, date(2024, 5, 1), self.owner)
+        result = revise_price(self.bahan, 150, date(2024, 3, 10), self.owner)
+
+        # 2024-03 dan 2024-04 saja: 2024-05 dst. mengikuti revisi 1 Mei
+        self.assertEqual(result['details'], 2)
+        self.assertEqual(result['locked'], 0)
+        self.assertEqual(self.prices(), {
+            '2024-01': 100, '2024-02': 100, '2024-03': 150,
+            '2024-04': 150, '2024-05': 200, '2024-06': 100,
+        })
+        self.assertEqual(self.totals()['2024-04'], 300)
+        self.bahan.refresh_from_db()
+        self.assertEqual(self.bahan.harga_satuan, 200)
+
+    def test_closed_period_is_locked(self):
+        result = revise_price(self.bahan, 150, date(2024, 3, 10), self.owner)
+
+        self.assertEqual(result, {'details': 3, 'hpps': 3, 'locked': 1})
+        self.assertEqual(self.prices()['2024-06'], 100)
+        self.assertEqual(self.totals()['2024-06'], 200)
+
+    def test_delete_revision_restores_previous_price(self):
+        revise_price(self.bahan, 150, date(2024, 3, 10), self.owner)
+        revise_price(self.bahan, 200, date(2024, 5, 1), self.owner)
+
+        delete_revision(BahanPrice.objects.get(bahan=self.bahan, effective_from=date(2024, 5, 1)))
+
+        self.assertEqual(self.prices()['2024-05'], 150)
+        self.assertEqual(self.prices()['2024-02'], 100)
+        self.bahan.refresh_from_db()
+        self.assertEqual(self.bahan.harga_satuan, 150)
+
+    def test_negative_price_rejected(self):
+        with self.assertRaises(PriceRevisionError):
+            revise_price(self.bahan, -1, date(2024, 3, 1), self.owner)
+        self.assertFalse(BahanPrice.objects.exists())
+
+    def test_create_view_records_first_price(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.post('/hpp/bahan/create/', {
+            'nama_bahan': 'Garam', 'harga_satuan': '-5', 'satuan': 'kg', 'berlaku_mulai': '2024-02-01',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Bahan.objects.filter(nama_bahan='Garam').exists())
+
+        self.client.post('/hpp/bahan/create/', {
+            'nama_bahan': 'Garam', 'harga_satuan': '70', 'satuan': 'kg', 'berlaku_mulai': '2024-02-01',
+        })
+        garam = Bahan.objects.get(nama_bahan='Garam')
+        self.assertEqual(list(garam.prices.values_list('effective_from', 'harga_satuan')), [(date(2024, 2, 1), 70)])
+
+    def test_admin_cannot_edit_price_directly(self):
+        admin_user = User.objects.create_superuser('admin', password='rahasia-123')
+        self.client.force_login(admin_user)
+
+        response = self.client.get(f'/admin/hpp/bahan/{self.bahan.pk}/change/')
+
+        self.assertNotContains(response, 'name="harga_satuan"')
+
+        self.client.post('/admin/hpp/bahan/add/', {
+            'nama_bahan': 'Garam', 'harga_satuan': '70', 'satuan': 'kg', 'keterangan': '',
+            'is_active': 'on', 'created_by': self.owner.pk,
+        })
+        garam = Bahan.objects.get(nama_bahan='Garam')
+        self.assertEqual(list(garam.prices.values_list('harga_satuan', flat=True)), [70])
+
+    def test_unit_costs_use_period_price(self):
+        category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+        product = Product.objects.create(
+            tenant=self.tenant, category=category, sku='A', name='Teh', qty=1, price=1000, created_by=self.owner,
+        )
+        garam = Bahan.objects.create(nama_bahan='Garam', satuan='kg', harga_satuan=10, created_by=self.owner)
+        ProductRecipe.objects.create(product=product, bahan=self.bahan, qty=Decimal('2'))
+        ProductRecipe.objects.create(product=product, bahan=garam, qty=Decimal('1'))
+        revise_price(self.bahan, 150, date(2024, 3, 1), self.owner)
+        revise_price(self.bahan, 200, date(2024, 5, 1), self.owner)
+
+        # Garam tanpa revisi memakai harga saat ini
+        self.assertEqual(unit_costs([product.pk], '2024-04')[product.pk], 2 * 150 + 10)
+        self.assertEqual(unit_costs([product.pk])[product.pk], 2 * 200 + 10)
+
+
+class GenerateHPPTest(HPPFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+        self.product = Product.objects.create(
+            tenant=self.tenant, category=category, sku='A', name='Teh', qty=100, price=1000, created_by=self.owner,
+        )
+        other = User.objects.create_user('lain', password='rahasia-123')
+        self.other_tenant = Tenant.objects.create(owner=other, name='Toko Lain', address='Jl. C', phone='0812')
+        foreign = Bahan.objects.create(nama_bahan='Kopi', satuan='kg', harga_satuan=10, created_by=other)
+        ProductRecipe.objects.create(product=self.product, bahan=self.bahan, qty=Decimal('0.5'))
+        ProductRecipe.objects.create(product=self.product, bahan=foreign, qty=Decimal('1'))
+        revise_price(self.bahan, 120, date(2024, 1, 1), self.owner)
+        revise_price(self.bahan, 300, date(2024, 4, 1), self.owner)
+        self.sell(3, datetime(2024, 3, 10, 12))
+        self.sell(1, datetime(2024, 4, 2, 12))
+
+    def sell(self, qty, at):
+        order = Order(tenant=self.tenant, created_by=self.owner, customer_name='Budi', customer_address='Jl. B')
+        with mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(at)):
+            create_order(order, [str(self.product.pk)], [str(qty)])
+
+    def details(self):
+        return list(HPPDetail.objects.values_list('hpp__periode', 'bahan__nama_bahan', 'qty', 'harga_satuan'))
+
+    def test_usage_from_sales_with_period_price(self):
+        result = generate_hpp([self.tenant, self.other_tenant], '2024-03')
+
+        self.assertEqual((result['created'], result['empty']), (1, 1))
+        # Bahan milik owner lain tidak dihitung
+        self.assertEqual(self.details(), [('2024-03', 'Gula', Decimal('1.50'), 120)])
+        self.assertEqual(HPP.objects.get().amount_total, 180)
+
+    def test_existing_replaced_only_when_open(self):
+        generate_hpp([self.tenant], '2024-03')
+        self.sell(1, datetime(2024, 3, 20, 12))
+
+        self.assertEqual(generate_hpp([self.tenant], '2024-03')['existing'], 1)
+        self.assertEqual(generate_hpp([self.tenant], '2024-03', replace=True)['replaced'], 1)
+        self.assertEqual(self.details(), [('2024-03', 'Gula', Decimal('2.00'), 120)])
+
+        HPP.objects.update(is_closed=True)
+        self.sell(1, datetime(2024, 3, 21, 12))
+        self.assertEqual(generate_hpp([self.tenant], '2024-03', replace=True)['closed'], 1)
+        self.assertEqual(self.details(), [('2024-03', 'Gula', Decimal('2.00'), 120)])
+
+    def test_invalid_period_rejected(self):
+        with self.assertRaises(HPPCreationError):
+            generate_hpp([self.tenant], '2024-13')
+
+    def test_view_only_generates_own_tenants(self):
+        self.client.force_login(self.owner)
+
+        self.client.post('/hpp/generate/', {'tenant': 'abc', 'periode': '2024-03'})
+        self.client.post('/hpp/generate/', {'tenant': str(self.other_tenant.pk), 'periode': '2024-03'})
+        self.assertFalse(HPP.objects.exists())
 
-# Create your tests here.
+        self.client.post('/hpp/generate/', {'periode': '2024-04'})
+        self.assertEqual(self.details(), [('2024-04', 'Gula', Decimal('0.50'), 300)])
@@ -13,7 +13,14 @@ urlpatterns = [
     # HPP URLs
     path('', views.hpp_list_view, name='list'),
     path('create/', views.hpp_create_view, name='create'),
+    path('generate/', views.hpp_generate_view, name='generate'),
     path('<int:hpp_id>/', views.hpp_detail_view, name='detail'),
+    path('<int:hpp_id>/close/', views.hpp_close_view, name='close'),
+    
+    # Resep & margin URLs
+    path('recipes/', views.recipe_list_view, name='recipe_list'),
+    path('recipes/<int:product_id>/', views.recipe_edit_view, name='recipe_edit'),
+    path('margins/', views.margin_report_view, name='margin_report'),
     
     # AJAX URLs
     path('api/bahan/', views.get_bahan_data, name='get_bahan_data'),
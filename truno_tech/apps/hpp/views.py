@@ -1,11 +1,24 @@
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import Count
 from django.http import JsonResponse
+from django.utils import timezone
+from apps.core.pagination import paginate_request, render_keyset
+from apps.core.refcache import cached_json, bahan_scope
 from apps.tenants.models import Tenant
-from .models import Bahan, HPP, HPPDetail
-from .forms import BahanForm, HPPForm, HPPDetailFormSet
+from apps.orders.models import Order
+from apps.products.models import Product
+from .models import Bahan, HPP, ProductRecipe
+from .forms import BahanForm, HPPForm
+from .services import create_hpp, generate_hpp, save_recipe, HPPCreationError, RecipeError
+from .pricing import revise_price, PriceRevisionError
+from .cogs import cogs_report, period_items, records, unit_costs
+
+MARGIN_ORDER_ROWS = 50
 
 def check_client_permission(user):
     """Helper function to check if user is client (only clients can manage HPP)"""
@@ -20,9 +33,11 @@ def bahan_list_view(request):
     
     bahan_list = Bahan.objects.filter(created_by=request.user, is_active=True)
     
-    return render(request, 'hpp/bahan_list.html', {
-        'bahan_list': bahan_list
-    })
+    page = paginate_request(request, bahan_list, ('nama_bahan', 'id'))
+    
+    return render_keyset(request, 'hpp/bahan_list.html', 'hpp/_bahan_rows.html', {
+        'bahan_list': page
+    }, page)
 
 @login_required
 def bahan_create_view(request):
@@ -35,9 +50,17 @@ def bahan_create_view(request):
         if form.is_valid():
             bahan = form.save(commit=False)
             bahan.created_by = request.user
-            bahan.save()
-            messages.success(request, f'Bahan {bahan.nama_bahan} berhasil dibuat.')
-            return redirect('hpp:bahan_list')
+            try:
+                # Bahan dan revisi harga pertamanya disimpan bersama
+                with transaction.atomic():
+                    bahan.save()
+                    revise_price(bahan, bahan.harga_satuan, form.cleaned_data['berlaku_mulai'], request.user)
+            except PriceRevisionError as e:
+                bahan.pk = None
+                form.add_error(None, str(e))
+            else:
+                messages.success(request, f'Bahan {bahan.nama_bahan} berhasil dibuat.')
+                return redirect('hpp:bahan_list')
     else:
         form = BahanForm()
     
@@ -53,12 +76,32 @@ def bahan_edit_view(request, bahan_id):
         return redirect('dashboard:home')
     
     bahan = get_object_or_404(Bahan, id=bahan_id, created_by=request.user)
+    current_price = bahan.harga_satuan
     
     if request.method == 'POST':
         form = BahanForm(request.POST, instance=bahan)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Bahan {bahan.nama_bahan} berhasil diupdate.')
+            # Harga tidak diubah langsung: dicatat sebagai revisi dan HPP periode terkait dihitung ulang
+            bahan = form.save(commit=False)
+            bahan.harga_satuan = current_price
+            bahan.save()
+            message = f'Bahan {bahan.nama_bahan} berhasil diupdate.'
+            if 'harga_satuan' in form.changed_data or request.POST.get('berlaku_mulai'):
+                try:
+                    result = revise_price(
+                        bahan,
+                        form.cleaned_data['harga_satuan'],
+                        form.cleaned_data['berlaku_mulai'],
+                        request.user
+                    )
+                except PriceRevisionError as e:
+                    messages.error(request, f'Error: {str(e)}')
+                    return redirect('hpp:bahan_edit', bahan_id=bahan.id)
+                if result['hpps']:
+                    message += f' {result["hpps"]} HPP dihitung ulang.'
+                if result['locked']:
+                    message += f' {result["locked"]} HPP periode tertutup tidak diubah.'
+            messages.success(request, message)
             return redirect('hpp:bahan_list')
     else:
         form = BahanForm(instance=bahan)
@@ -66,6 +109,7 @@ def bahan_edit_view(request, bahan_id):
     return render(request, 'hpp/bahan_form.html', {
         'form': form,
         'bahan': bahan,
+        'prices': bahan.prices.all()[:12],
         'title': f'Edit Bahan - {bahan.nama_bahan}'
     })
 
@@ -98,11 +142,14 @@ def hpp_list_view(request):
     if tenant_filter:
         hpp_records = hpp_records.filter(tenant_id=tenant_filter)
     
-    return render(request, 'hpp/hpp_list.html', {
-        'hpp_records': hpp_records,
+    page = paginate_request(request, hpp_records, ('-periode', '-id'))
+    
+    return render_keyset(request, 'hpp/hpp_list.html', 'hpp/_hpp_rows.html', {
+        'hpp_records': page,
         'tenants': tenants,
-        'selected_tenant': int(tenant_filter) if tenant_filter else None
-    })
+        'selected_tenant': int(tenant_filter) if tenant_filter else None,
+        'default_periode': (timezone.localdate().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    }, page)
 
 @login_required
 def hpp_create_view(request):
@@ -128,44 +175,17 @@ def hpp_create_view(request):
         
         if form.is_valid():
             try:
-                with transaction.atomic():
-                    hpp = form.save(commit=False)
-                    hpp.tenant = tenant
-                    hpp.created_by = request.user
-                    hpp.amount_total = 0
-                    hpp.save()
-                    
-                    # Process HPP details from POST data
-                    bahan_ids = request.POST.getlist('bahan_id[]')
-                    quantities = request.POST.getlist('qty[]')
-                    
-                    total_amount = 0
-                    
-                    for bahan_id, qty_str in zip(bahan_ids, quantities):
-                        if bahan_id and qty_str:
-                            try:
-                                bahan = Bahan.objects.get(id=bahan_id)
-                                qty = float(qty_str)
-                                
-                                hpp_detail = HPPDetail(
-                                    hpp=hpp,
-                                    bahan=bahan,
-                                    qty=qty
-                                )
-                                hpp_detail.save()  # This will calculate subtotal automatically
-                                total_amount += hpp_detail.subtotal
-                            except (Bahan.DoesNotExist, ValueError) as e:
-                                raise Exception(f'Error pada bahan: {str(e)}')
-                    
-                    if total_amount == 0:
-                        raise Exception('HPP harus memiliki minimal satu bahan')
-                    
-                    # Update total amount
-                    hpp.amount_total = total_amount
-                    hpp.save()
-                    
-                    messages.success(request, f'HPP {hpp.periode} untuk {hpp.tenant.name} berhasil dibuat.')
-                    return redirect('hpp:detail', hpp_id=hpp.id)
+                hpp = form.save(commit=False)
+                hpp.tenant = tenant
+                hpp.created_by = request.user
+                create_hpp(
+                    hpp,
+                    request.POST.getlist('bahan_id[]'),
+                    request.POST.getlist('qty[]')
+                )
+                
+                messages.success(request, f'HPP {hpp.periode} untuk {hpp.tenant.name} berhasil dibuat.')
+                return redirect('hpp:detail', hpp_id=hpp.id)
                     
             except Exception as e:
                 messages.error(request, f'Error: {str(e)}')
@@ -178,6 +198,44 @@ def hpp_create_view(request):
         'title': 'Buat HPP Baru'
     })
 
+@login_required
+def hpp_generate_view(request):
+    if not check_client_permission(request.user):
+        messages.error(request, 'Anda tidak memiliki akses untuk mengelola HPP.')
+        return redirect('dashboard:home')
+    
+    if request.method != 'POST':
+        return redirect('hpp:list')
+    
+    tenants = Tenant.objects.filter(owner=request.user)
+    tenant_id = request.POST.get('tenant')
+    if tenant_id:
+        if not tenant_id.isdigit():
+            messages.error(request, 'Pilih tenant yang valid.')
+            return redirect('hpp:list')
+        tenants = tenants.filter(id=tenant_id)
+    periode = request.POST.get('periode', '')
+    
+    try:
+        result = generate_hpp(tenants, periode, replace=bool(request.POST.get('replace')))
+    except HPPCreationError as e:
+        messages.error(request, f'Error: {str(e)}')
+        return redirect('hpp:list')
+    
+    if result['created'] or result['replaced']:
+        messages.success(request, f'HPP {periode}: {result["created"]} dibuat, {result["replaced"]} dibuat ulang dari penjualan.')
+    skipped = []
+    if result['existing']:
+        skipped.append(f'{result["existing"]} sudah ada')
+    if result['closed']:
+        skipped.append(f'{result["closed"]} periode ditutup')
+    if result['empty']:
+        skipped.append(f'{result["empty"]} tanpa penjualan atau resep')
+    if skipped:
+        messages.warning(request, f'Dilewati: {", ".join(skipped)}.')
+    
+    return redirect('hpp:list')
+
 @login_required
 def hpp_detail_view(request, hpp_id):
     if not check_client_permission(request.user):
@@ -192,15 +250,146 @@ def hpp_detail_view(request, hpp_id):
         'hpp_details': hpp_details
     })
 
+@login_required
+def hpp_close_view(request, hpp_id):
+    if not check_client_permission(request.user):
+        messages.error(request, 'Anda tidak memiliki akses untuk mengelola HPP.')
+        return redirect('dashboard:home')
+    
+    hpp = get_object_or_404(HPP, id=hpp_id, tenant__owner=request.user)
+    
+    if request.method == 'POST' and not hpp.is_closed:
+        hpp.is_closed = True
+        hpp.closed_at = timezone.now()
+        hpp.save(update_fields=['is_closed', 'closed_at', 'updated_at'])
+        messages.success(request, f'Periode {hpp.periode} ditutup. Revisi harga bahan tidak lagi mengubah HPP ini.')
+    
+    return redirect('hpp:detail', hpp_id=hpp.id)
+
+# RESEP & MARGIN VIEWS
+@login_required
+def recipe_list_view(request):
+    if not check_client_permission(request.user):
+        messages.error(request, 'Anda tidak memiliki akses untuk mengelola HPP.')
+        return redirect('dashboard:home')
+    
+    tenants = Tenant.objects.filter(owner=request.user)
+    products = (
+        Product.objects
+        .filter(tenant__owner=request.user)
+        .select_related('tenant')
+        .annotate(recipe_count=Count('recipe_lines'))
+    )
+    
+    tenant_filter = request.GET.get('tenant')
+    if tenant_filter:
+        products = products.filter(tenant_id=tenant_filter)
+    
+    page = paginate_request(request, products, ('name', 'id'))
+    costs = unit_costs([product.id for product in page])
+    for product in page:
+        product.unit_cost = costs.get(product.id)
+    
+    return render_keyset(request, 'hpp/recipe_list.html', 'hpp/_recipe_rows.html', {
+        'products': page,
+        'tenants': tenants,
+        'selected_tenant': int(tenant_filter) if tenant_filter else None
+    }, page)
+
+@login_required
+def recipe_edit_view(request, product_id):
+    if not check_client_permission(request.user):
+        messages.error(request, 'Anda tidak memiliki akses untuk mengelola HPP.')
+        return redirect('dashboard:home')
+    
+    product = get_object_or_404(Product, id=product_id, tenant__owner=request.user)
+    
+    if request.method == 'POST':
+        try:
+            count = save_recipe(
+                product,
+                request.user,
+                request.POST.getlist('bahan_id[]'),
+                request.POST.getlist('qty[]')
+            )
+            messages.success(request, f'Resep {product.name} disimpan ({count} bahan).')
+            return redirect('hpp:recipe_list')
+        except RecipeError as e:
+            messages.error(request, f'Error: {str(e)}')
+    
+    return render(request, 'hpp/recipe_form.html', {
+        'product': product,
+        'recipe_lines': ProductRecipe.objects.filter(product=product).select_related('bahan'),
+        'bahan_list': Bahan.objects.filter(created_by=request.user, is_active=True),
+        'title': f'Resep - {product.name}'
+    })
+
+@login_required
+def margin_report_view(request):
+    if not check_client_permission(request.user):
+        messages.error(request, 'Anda tidak memiliki akses untuk mengelola HPP.')
+        return redirect('dashboard:home')
+    
+    tenants = Tenant.objects.filter(owner=request.user)
+    periode = request.GET.get('periode') or timezone.localdate().strftime('%Y-%m')
+    tenant_id = request.GET.get('tenant')
+    tenant = tenants.filter(id=tenant_id).first() if tenant_id and tenant_id.isdigit() else tenants.first()
+    
+    context = {
+        'tenants': tenants,
+        'selected_tenant': tenant.id if tenant else None,
+        'periode': periode,
+    }
+    if tenant:
+        try:
+            report = cogs_report(period_items(tenant, periode), periode)
+        except ValueError:
+            messages.error(request, 'Format periode harus YYYY-MM.')
+            return render(request, 'hpp/margin_report.html', context)
+        
+        products = report['products'].sort_values('margin')
+        orders = report['orders'].sort_values('margin').head(MARGIN_ORDER_ROWS)
+        names = Product.objects.in_bulk(products.index.tolist())
+        dates = dict(Order.objects.filter(id__in=orders.index.tolist()).values_list('id', 'created_at'))
+        
+        product_rows = records(products)
+        for row in product_rows:
+            row['product'] = names.get(row['product_id'])
+        order_rows = records(orders)
+        for row in order_rows:
+            row['created_at'] = dates.get(row['order_id'])
+        
+        context.update({
+            'summary': {
+                'revenue': int(products['revenue'].sum()),
+                'cogs': int(products['cogs'].sum()),
+                'margin': int(products['margin'].sum()),
+                'incomplete': int((~products['complete'].astype(bool)).sum()),
+            },
+            'product_rows': product_rows,
+            'order_rows': order_rows,
+            'order_count': len(report['orders']),
+        })
+    
+    return render(request, 'hpp/margin_report.html', context)
+
 @login_required
 def get_bahan_data(request):
     """AJAX endpoint to get bahan data"""
     if check_client_permission(request.user):
-        bahan_list = Bahan.objects.filter(
-            created_by=request.user,
-            is_active=True
-        ).values('id', 'nama_bahan', 'harga_satuan', 'satuan')
+        def build():
+            bahan_list = Bahan.objects.filter(
+                created_by=request.user,
+                is_active=True
+            ).values('id', 'nama_bahan', 'harga_satuan', 'satuan')
+            
+            # Paginated only when the client asks for it (?limit= / ?cursor=)
+            if 'limit' in request.GET or 'cursor' in request.GET:
+                page = paginate_request(request, bahan_list, ('nama_bahan', 'id'))
+                return {'bahan': page.object_list, 'next_cursor': page.next_cursor}
+            
+            return {'bahan': list(bahan_list)}
         
-        return JsonResponse({'bahan': list(bahan_list)})
+        return cached_json(request, bahan_scope(request.user.pk), build)
     
     return JsonResponse({'bahan': []})
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Customer, DailyProductSales, DailyTenantSales, Order, OrderItem, TopProduct
+from .services import sync_edited_orders
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -8,18 +9,91 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'tenant', 'customer_name', 'customer_phone', 'total_amount_display', 'total_qty', 'created_by', 'created_at']
+    list_display = ['id', 'tenant', 'customer_name', 'customer_phone', 'total_amount_display', 'total_qty', 'item_count', 'created_by', 'created_at']
     list_filter = ['tenant', 'created_at', 'created_by']
     search_fields = ['customer_name', 'customer_phone', 'tenant__name']
-    readonly_fields = ['total_amount', 'created_at', 'updated_at']
+    # Dihitung dari item dan nomor telepon, lihat sync_edited_orders
+    readonly_fields = ['customer', 'total_amount', 'total_qty', 'item_count', 'created_at', 'updated_at']
     inlines = [OrderItemInline]
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('tenant', 'created_by')
+        return super().get_queryset(request).select_related('tenant', 'tenant__owner', 'created_by')
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Order tidak dipindah tenant: rekap tenant lamanya tidak ikut dihitung ulang
+        if obj is not None:
+            return self.readonly_fields + ['tenant']
+        return self.readonly_fields
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        sync_edited_orders([form.instance])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        sync_edited_orders([obj], deleted=True)
+    
+    def delete_queryset(self, request, queryset):
+        orders = list(queryset.only('pk', 'tenant_id', 'created_at'))
+        super().delete_queryset(request, queryset)
+        sync_edited_orders(orders, deleted=True)
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['order', 'product', 'qty', 'unit_price_display', 'subtotal_display']
     list_filter = ['order__tenant', 'product__category']
     search_fields = ['product__name', 'order__customer_name']
-    readonly_fields = ['subtotal']
\ No newline at end of file
+    readonly_fields = ['subtotal']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Total order lama tidak ikut diperbarui jika item dipindah order
+        if obj is not None:
+            return self.readonly_fields + ['order']
+        return self.readonly_fields
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        sync_edited_orders([obj.order])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        sync_edited_orders([obj.order])
+    
+    def delete_queryset(self, request, queryset):
+        orders = list(Order.objects.filter(pk__in=queryset.values('order_id')).only('pk', 'tenant_id', 'created_at'))
+        super().delete_queryset(request, queryset)
+        sync_edited_orders(orders)
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ['name', 'phone', 'tenant', 'order_count', 'total_spent_display', 'last_order_at']
+    list_filter = ['tenant']
+    search_fields = ['name', 'phone_normalized']
+    readonly_fields = ['phone_normalized', 'order_count', 'total_spent', 'first_order_at', 'last_order_at', 'created_at', 'updated_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tenant', 'tenant__owner')
+
+@admin.register(DailyTenantSales)
+class DailyTenantSalesAdmin(admin.ModelAdmin):
+    list_display = ['tenant', 'date', 'revenue_display', 'order_count', 'item_qty', 'updated_at']
+    list_filter = ['tenant', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = ['tenant', 'date', 'revenue', 'order_count', 'item_qty', 'updated_at']
+    list_select_related = ['tenant']
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ['product', 'tenant', 'date', 'qty', 'revenue']
+    list_filter = ['tenant', 'date']
+    date_hierarchy = 'date'
+    search_fields = ['product__name', 'product__sku']
+    readonly_fields = ['product', 'tenant', 'date', 'qty', 'revenue']
+    list_select_related = ['product', 'tenant']
+
+@admin.register(TopProduct)
+class TopProductAdmin(admin.ModelAdmin):
+    list_display = ['tenant', 'window', 'rank', 'product', 'qty', 'revenue', 'computed_at']
+    list_filter = ['window', 'tenant']
+    readonly_fields = ['tenant', 'window', 'rank', 'product', 'qty', 'revenue', 'computed_at']
+    list_select_related = ['product', 'tenant']
@@ -0,0 +1,200 @@
+"""
+Pelanggan (Customer) per tenant dan statistik seumur hidupnya.
+
+Statistik (jumlah order, total belanja, order pertama/terakhir) diperbarui
+secara inkremental setiap kali order dibuat, sehingga analisis pelanggan
+cukup membaca tabel `customers` yang terindeks.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Case, When, Value, F, IntegerField, BigIntegerField, DateTimeField
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+from .models import Customer, Order
+
+NON_DIGIT_RE = re.compile(r'\D')
+AUTOCOMPLETE_LIMIT = 10
+REBUILD_BATCH_SIZE = 2000
+
+
+def normalize_phone(phone):
+    """
+    Normalisasi nomor telepon Indonesia ke format 0xxxxxxxxxx.
+    '+62 812-3456', '62812 3456', '8123456' -> '08123456'. Mengembalikan '' jika kosong.
+    """
+    digits = NON_DIGIT_RE.sub('', phone or '')
+    if digits.startswith('62'):
+        digits = '0' + digits[2:]
+    elif digits.startswith('8'):
+        digits = '0' + digits
+    return digits[:20]
+
+
+def phone_prefix_range(prefix):
+    """
+    Filter rentang (gte/lt) untuk prefix nomor ter-normalisasi, agar pencarian
+    memakai indeks unik (tenant, phone_normalized). ':' adalah karakter
+    ASCII setelah '9'.
+    """
+    return {'phone_normalized__gte': prefix, 'phone_normalized__lt': prefix + ':'}
+
+
+def attach_customers(tenant, orders):
+    """
+    Hubungkan `orders` (sudah disimpan) ke Customer berdasarkan nomor telepon,
+    membuat Customer baru bila perlu, dan tambahkan statistiknya; order
+    pertama/terakhir diambil dari created_at order. Jumlah query tetap: satu
+    bulk insert (yang sudah ada diabaikan, aman untuk transaksi bersamaan),
+    satu select, satu update statistik dan satu update order.customer.
+    Harus dipanggil di dalam transaksi yang sama dengan penyimpanan order.
+    """
+    groups = {}
+    for order in orders:
+        phone = normalize_phone(order.customer_phone)
+        if not phone:
+            continue
+        group = groups.setdefault(phone, {
+            'orders': [], 'count': 0, 'spent': 0, 'first': order.created_at, 'last': order.created_at,
+        })
+        group['orders'].append(order)
+        group['count'] += 1
+        group['spent'] += order.total_amount
+        group['first'] = min(group['first'], order.created_at)
+        group['last'] = max(group['last'], order.created_at)
+        # Untuk customer baru dipakai nama/alamat terakhir yang diisi
+        group['phone'] = order.customer_phone
+        group['name'] = order.customer_name or group.get('name', '')
+        group['address'] = order.customer_address or group.get('address', '')
+
+    if not groups:
+        return
+
+    # Pastikan customernya ada dulu (statistik nol), lalu tambahkan
+    Customer.objects.bulk_create(
+        [
+            Customer(
+                tenant=tenant,
+                phone_normalized=phone,
+                phone=group['phone'],
+                name=group['name'],
+                address=group['address'],
+            )
+            for phone, group in groups.items()
+        ],
+        ignore_conflicts=True,
+    )
+    customers = {
+        customer.phone_normalized: customer
+        for customer in Customer.objects.filter(tenant=tenant, phone_normalized__in=list(groups))
+    }
+
+    updates = {customers[phone].pk: group for phone, group in groups.items()}
+    Customer.objects.filter(pk__in=list(updates)).update(
+        order_count=F('order_count') + _per_customer(updates, 'count', IntegerField()),
+        total_spent=F('total_spent') + _per_customer(updates, 'spent', BigIntegerField()),
+        first_order_at=Least(
+            Coalesce(F('first_order_at'), _per_customer(updates, 'first', DateTimeField())),
+            _per_customer(updates, 'first', DateTimeField()),
+        ),
+        last_order_at=Greatest(
+            Coalesce(F('last_order_at'), _per_customer(updates, 'last', DateTimeField())),
+            _per_customer(updates, 'last', DateTimeField()),
+        ),
+        updated_at=timezone.now(),
+    )
+
+    linked = []
+    for phone, group in groups.items():
+        for order in group['orders']:
+            order.customer = customers[phone]
+            linked.append(order)
+    Order.objects.bulk_update(linked, ['customer'])
+
+
+def _per_customer(updates, key, output_field):
+    return Case(
+        *[When(pk=pk, then=Value(group[key])) for pk, group in updates.items()],
+        output_field=output_field,
+    )
+
+
+def autocomplete_customers(tenant, prefix, limit=AUTOCOMPLETE_LIMIT):
+    """Customer dengan nomor telepon berawalan `prefix` (sudah dinormalisasi)"""
+    prefix = normalize_phone(prefix)
+    if len(prefix) < 3:
+        return Customer.objects.none()
+    return (
+        Customer.objects
+        .filter(tenant=tenant, **phone_prefix_range(prefix))
+        .order_by('phone_normalized')[:limit]
+    )
+
+
+def rebuild_customers(tenant, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Bangun ulang Customer `tenant` dan statistiknya dari riwayat order, dan
+    hubungkan ulang setiap order ke customer-nya. Mengembalikan jumlah pelanggan.
+    """
+    stats = {}
+    orders = (
+        Order.objects
+        .filter(tenant=tenant)
+        .exclude(customer_phone__isnull=True)
+        .exclude(customer_phone='')
+        .order_by('created_at', 'id')
+        .values_list('id', 'customer_name', 'customer_phone', 'customer_address', 'total_amount', 'created_at')
+    )
+    for order_id, name, phone, address, total_amount, created_at in orders.iterator(chunk_size=batch_size):
+        key = normalize_phone(phone)
+        if not key:
+            continue
+        entry = stats.setdefault(key, {
+            'ids': [], 'count': 0, 'spent': 0, 'first': created_at,
+            'phone': phone, 'name': '', 'address': '',
+        })
+        entry['ids'].append(order_id)
+        entry['count'] += 1
+        entry['spent'] += total_amount
+        entry['last'] = created_at
+        entry['phone'] = phone
+        entry['name'] = name or entry['name']
+        entry['address'] = address or entry['address']
+
+    with transaction.atomic():
+        # Customer yang tidak lagi punya order tetap ada, dengan statistik nol
+        Customer.objects.filter(tenant=tenant).update(
+            order_count=0, total_spent=0, first_order_at=None, last_order_at=None
+        )
+        existing = {c.phone_normalized: c for c in Customer.objects.filter(tenant=tenant)}
+        customers = []
+        for key, entry in stats.items():
+            customer = existing.get(key) or Customer(tenant=tenant, phone_normalized=key)
+            customer.phone = entry['phone']
+            customer.name = entry['name']
+            customer.address = entry['address']
+            customer.order_count = entry['count']
+            customer.total_spent = entry['spent']
+            customer.first_order_at = entry['first']
+            customer.last_order_at = entry['last']
+            customers.append(customer)
+
+        Customer.objects.bulk_create([c for c in customers if c.pk is None], batch_size=batch_size)
+        Customer.objects.bulk_update(
+            [c for c in customers if c.pk is not None and c.phone_normalized in existing],
+            ['phone', 'name', 'address', 'order_count', 'total_spent', 'first_order_at', 'last_order_at'],
+            batch_size=batch_size
+        )
+
+        customer_ids = dict(
+            Customer.objects.filter(tenant=tenant).values_list('phone_normalized', 'id')
+        )
+        Order.objects.filter(tenant=tenant).update(customer=None)
+        for key, entry in stats.items():
+            ids = entry['ids']
+            for start in range(0, len(ids), batch_size):
+                Order.objects.filter(pk__in=ids[start:start + batch_size]).update(
+                    customer_id=customer_ids[key]
+                )
+
+    return len(stats)
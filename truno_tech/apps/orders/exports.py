@@ -0,0 +1,110 @@
+"""
+Export riwayat order (satu baris per item order) ke CSV / XLSX.
+
+Data dibaca dengan `values_list().iterator(chunk_size=...)`, jadi memori
+tetap kecil berapa pun jumlah barisnya.
+
+XLSX ditulis langsung dengan XlsxWriter (engine yang juga dipakai pandas
+`to_excel`): pandas menyusun seluruh DataFrame di memori dan menulis per
+kolom, sehingga tidak bisa dipakai untuk export yang memorinya konstan.
+"""
+import csv
+import tempfile
+
+from django.utils import timezone
+from .models import OrderItem
+
+CHUNK_SIZE = 2000
+XLSX_MAX_ROWS = 1048576  # Batas baris per sheet Excel (termasuk header)
+
+# Awalan sel yang dijalankan Excel/LibreOffice sebagai formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORT_HEADER = [
+    'Order ID', 'Tanggal', 'Tenant', 'Nama Pelanggan', 'No. Telepon', 'Alamat',
+    'SKU', 'Produk', 'Kategori', 'Jumlah', 'Harga Satuan', 'Subtotal', 'Total Order',
+]
+
+EXPORT_FIELDS = [
+    'order_id', 'order__created_at', 'order__tenant__name', 'order__customer_name',
+    'order__customer_phone', 'order__customer_address', 'product__sku', 'product__name',
+    'product__category__name', 'qty', 'unit_price', 'subtotal', 'order__total_amount',
+]
+
+
+def export_items(orders):
+    """Queryset item order untuk export, diurutkan menurut waktu order"""
+    return (
+        OrderItem.objects
+        .filter(order__in=orders)
+        .order_by('order__created_at', 'order_id', 'id')
+        .values_list(*EXPORT_FIELDS)
+    )
+
+
+def escape_cell(value):
+    """Teks isian pengguna yang diawali karakter formula diberi awalan ' agar tetap dibaca sebagai teks"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_rows(orders):
+    """Generator baris export (tanpa header)"""
+    for row in export_items(orders).iterator(chunk_size=CHUNK_SIZE):
+        row = [escape_cell(value) for value in row]
+        row[1] = timezone.localtime(row[1]).strftime('%Y-%m-%d %H:%M:%S')
+        yield row
+
+
+class _Echo:
+    """Pseudo-buffer: csv.writer langsung mengembalikan baris yang ditulis"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(orders):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # BOM agar Excel membaca UTF-8 dengan benar
+    yield writer.writerow(EXPORT_HEADER)
+    for row in export_rows(orders):
+        yield writer.writerow(row)
+
+
+def write_xlsx(orders):
+    """
+    Tulis export XLSX ke file sementara dan kembalikan file handle-nya.
+
+    XlsxWriter dipakai dalam mode `constant_memory` (baris ditulis berurutan
+    dan langsung di-flush ke disk). Teks tidak pernah diubah menjadi formula. Jika melebihi batas baris Excel,
+    data dilanjutkan ke sheet berikutnya.
+    """
+    import xlsxwriter
+
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_formulas': False})
+    header_format = workbook.add_format({'bold': True})
+    number_format = workbook.add_format({'num_format': '#,##0'})
+
+    worksheet = None
+    row_index = XLSX_MAX_ROWS
+    sheet_count = 0
+
+    for row in export_rows(orders):
+        if row_index >= XLSX_MAX_ROWS:
+            sheet_count += 1
+            worksheet = workbook.add_worksheet(f'Order Items {sheet_count}')
+            worksheet.write_row(0, 0, EXPORT_HEADER, header_format)
+            worksheet.set_column(9, 12, 14, number_format)
+            row_index = 1
+        worksheet.write_row(row_index, 0, row)
+        row_index += 1
+
+    if worksheet is None:
+        worksheet = workbook.add_worksheet('Order Items 1')
+        worksheet.write_row(0, 0, EXPORT_HEADER, header_format)
+
+    workbook.close()
+    output.seek(0)
+    return output
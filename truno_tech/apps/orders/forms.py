@@ -9,7 +9,11 @@ class OrderForm(forms.ModelForm):
         fields = ['customer_name', 'customer_phone', 'customer_address']
         widgets = {
             'customer_name': forms.TextInput(attrs={'class': 'form-control'}),
-            'customer_phone': forms.TextInput(attrs={'class': 'form-control'}),
+            'customer_phone': forms.TextInput(attrs={
+                'class': 'form-control',
+                'list': 'customer-suggestions',
+                'autocomplete': 'off'
+            }),
             'customer_address': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
         labels = {
@@ -0,0 +1,88 @@
+"""
+Peringkat produk terlaris (TopProduct) per tenant untuk jendela 7/30/90 hari
+dan bulan berjalan.
+
+Peringkat dihitung dari rekap DailyProductSales (satu baris per produk per
+hari), dikelompokkan per product_id, lalu disimpan beberapa baris per tenant
+per jendela. Command `refresh_leaderboards` menghitung ulang semua tenant
+secara berkala (cron); panel dashboard hanya membaca beberapa baris dan
+tidak pernah menulis, jadi peringkat bisa tertinggal paling lama satu
+interval cron.
+"""
+import heapq
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import DailyProductSales, TopProduct
+
+LEADERBOARD_SIZE = 10
+DEFAULT_WINDOW = '30d'
+WINDOWS = dict(TopProduct.WINDOW_CHOICES)
+
+
+def window_range(window, today):
+    """
+    (tanggal awal, tanggal akhir) inklusif jendela `window` yang berakhir
+    `today`; '30d' mencakup hari ini dan 30 hari sebelumnya.
+    """
+    if window == 'mtd':
+        return today.replace(day=1), today
+    return today - timedelta(days=int(window[:-1])), today
+
+
+def refresh_leaderboards(tenant_ids, now=None):
+    """
+    Hitung ulang peringkat semua jendela untuk `tenant_ids`: satu query
+    GROUP BY per jendela, lalu ganti baris TopProduct tenant tersebut dalam
+    satu transaksi. Mengembalikan jumlah baris peringkat.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    tenant_ids = list(tenant_ids)
+
+    leaders = []
+    for window in WINDOWS:
+        start, end = window_range(window, today)
+        sales = (
+            DailyProductSales.objects
+            .filter(tenant_id__in=tenant_ids, date__gte=start, date__lte=end)
+            .values_list('tenant_id', 'product_id')
+            .annotate(qty=Sum('qty'), revenue=Sum('revenue'))
+            .order_by()
+        )
+        by_tenant = {}
+        for tenant_id, product_id, qty, revenue in sales:
+            by_tenant.setdefault(tenant_id, []).append((product_id, qty, revenue))
+
+        for tenant_id, products in by_tenant.items():
+            top = heapq.nsmallest(
+                LEADERBOARD_SIZE, products, key=lambda product: (-product[2], -product[1], product[0])
+            )
+            leaders.extend(
+                TopProduct(
+                    tenant_id=tenant_id, window=window, rank=rank,
+                    product_id=product_id, qty=qty, revenue=revenue, computed_at=now,
+                )
+                for rank, (product_id, qty, revenue) in enumerate(top, start=1)
+            )
+
+    with transaction.atomic():
+        TopProduct.objects.filter(tenant_id__in=tenant_ids).delete()
+        TopProduct.objects.bulk_create(leaders, batch_size=1000)
+    return len(leaders)
+
+
+def top_products(tenant_ids, window=DEFAULT_WINDOW, limit=LEADERBOARD_SIZE):
+    """
+    Produk terlaris gabungan `tenant_ids` pada `window` (TopProduct dengan
+    product dan tenant), urut pendapatan, dari perhitungan terakhir
+    `refresh_leaderboards`. Hanya membaca, satu query.
+    """
+    return list(
+        TopProduct.objects
+        .filter(tenant_id__in=list(tenant_ids), window=window)
+        .select_related('product', 'tenant')
+        .order_by('-revenue', '-qty', 'product_id')[:limit]
+    )
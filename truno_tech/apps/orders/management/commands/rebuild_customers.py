@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.tenants.models import Tenant
+from apps.orders.customers import REBUILD_BATCH_SIZE, rebuild_customers
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang data Customer dan statistiknya dari riwayat order.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['tenant']:
+            tenants = tenants.filter(id=options['tenant'])
+
+        for tenant in tenants.iterator():
+            count = rebuild_customers(tenant, options['batch_size'])
+            self.stdout.write(f'{tenant.name}: {count} pelanggan.')
+        self.stdout.write(self.style.SUCCESS('Selesai.'))
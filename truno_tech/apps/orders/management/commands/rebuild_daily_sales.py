@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.tenants.models import Tenant
+from apps.orders.rollup import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = (
+        'Bangun ulang rekap penjualan harian per tenant dan per produk dari riwayat order '
+        '(backfill, atau setelah order diubah langsung di database).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--since', help='Hanya mulai tanggal YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['tenant']:
+            tenants = tenants.filter(id=options['tenant'])
+
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('Format --since harus YYYY-MM-DD')
+
+        with transaction.atomic():
+            tenant_rows, product_rows = rebuild_daily_sales(tenants, since)
+        self.stdout.write(self.style.SUCCESS(
+            f'{tenant_rows} baris rekap harian tenant, {product_rows} baris rekap harian produk.'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Order
+from apps.orders.services import reconcile_order_totals
+
+
+class Command(BaseCommand):
+    help = 'Isi ulang / perbaiki Order.total_qty dan Order.item_count dari tabel order_items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--dry-run', action='store_true', help='Hanya laporkan, jangan ubah data')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options['tenant']:
+            orders = orders.filter(tenant_id=options['tenant'])
+
+        fixed = reconcile_order_totals(
+            orders,
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size']
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{fixed} order memiliki total yang tidak sesuai.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{fixed} order diperbaiki.'))
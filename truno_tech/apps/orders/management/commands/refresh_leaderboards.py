@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.tenants.models import Tenant
+from apps.orders.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        'Hitung ulang peringkat produk terlaris (7/30/90 hari, bulan ini) semua tenant '
+        'dari rekap harian produk. Jalankan berkala lewat cron (mis. tiap 10 menit).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        tenant_ids = Tenant.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+        if options['tenant']:
+            tenant_ids = tenant_ids.filter(pk=options['tenant'])
+        tenant_ids = list(tenant_ids)
+
+        rows = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(tenant_ids), batch_size):
+            rows += refresh_leaderboards(tenant_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'{rows} baris peringkat untuk {len(tenant_ids)} tenant.'))
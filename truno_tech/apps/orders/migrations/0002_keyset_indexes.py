@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['tenant', '-created_at', '-id'], name='orders_tenant_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    Order.objects.update(
+        total_qty=Coalesce(Subquery(items.annotate(s=Sum('qty')).values('s')), 0),
+        item_count=Coalesce(Subquery(items.annotate(c=Count('id')).values('c')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_qty',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
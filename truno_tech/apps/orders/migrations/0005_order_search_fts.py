@@ -0,0 +1,103 @@
+from django.db import migrations
+
+# Full-text index (SQLite FTS5) untuk pencarian order. rowid = orders.id.
+# Tenant disimpan sebagai token 't<id>' agar filter tenant ikut memakai indeks FTS.
+# Disinkronkan lewat trigger, sehingga bulk_create / update() ikut terindeks.
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE orders_fts USING fts5(
+        tenant, customer_name, customer_phone, customer_address, product_names,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER orders_fts_ai AFTER INSERT ON orders BEGIN
+        INSERT INTO orders_fts (rowid, tenant, customer_name, customer_phone, customer_address, product_names)
+        VALUES (
+            new.id, 't' || new.tenant_id, coalesce(new.customer_name, ''),
+            coalesce(new.customer_phone, ''), coalesce(new.customer_address, ''), ''
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER orders_fts_au AFTER UPDATE OF tenant_id, customer_name, customer_phone, customer_address ON orders BEGIN
+        UPDATE orders_fts SET
+            tenant = 't' || new.tenant_id,
+            customer_name = coalesce(new.customer_name, ''),
+            customer_phone = coalesce(new.customer_phone, ''),
+            customer_address = coalesce(new.customer_address, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER orders_fts_ad AFTER DELETE ON orders BEGIN
+        DELETE FROM orders_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER order_items_fts_ai AFTER INSERT ON order_items BEGIN
+        UPDATE orders_fts
+        SET product_names = product_names || ' ' || (SELECT name FROM products WHERE id = new.product_id)
+        WHERE rowid = new.order_id;
+    END
+    """,
+    """
+    CREATE TRIGGER order_items_fts_ad AFTER DELETE ON order_items BEGIN
+        UPDATE orders_fts
+        SET product_names = coalesce((
+            SELECT group_concat(p.name, ' ')
+            FROM order_items i JOIN products p ON p.id = i.product_id
+            WHERE i.order_id = old.order_id
+        ), '')
+        WHERE rowid = old.order_id;
+    END
+    """,
+    """
+    INSERT INTO orders_fts (rowid, tenant, customer_name, customer_phone, customer_address, product_names)
+    SELECT
+        o.id, 't' || o.tenant_id, coalesce(o.customer_name, ''), coalesce(o.customer_phone, ''),
+        coalesce(o.customer_address, ''),
+        coalesce((
+            SELECT group_concat(p.name, ' ')
+            FROM order_items i JOIN products p ON p.id = i.product_id
+            WHERE i.order_id = o.id
+        ), '')
+    FROM orders o
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS order_items_fts_ad',
+    'DROP TRIGGER IF EXISTS order_items_fts_ai',
+    'DROP TRIGGER IF EXISTS orders_fts_ad',
+    'DROP TRIGGER IF EXISTS orders_fts_au',
+    'DROP TRIGGER IF EXISTS orders_fts_ai',
+    'DROP TABLE IF EXISTS orders_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_idempotency_key'),
+        ('products', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('orders', '0005_order_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_normalized', models.CharField(max_length=20)),
+                ('phone', models.CharField(max_length=15)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('address', models.TextField(blank=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_spent', models.BigIntegerField(default=0)),
+                ('first_order_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customers', to='tenants.tenant')),
+            ],
+            options={
+                'db_table': 'customers',
+                'ordering': ['-total_spent'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='orders.customer'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['tenant', '-total_spent'], name='customers_tenant_spent_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='customer',
+            unique_together={('tenant', 'phone_normalized')},
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncDate
+
+
+def initial_rollup(apps, schema_editor):
+    # Isi rekap dari order yang sudah ada (sama dengan command rebuild_daily_sales)
+    Order = apps.get_model('orders', 'Order')
+    DailyTenantSales = apps.get_model('orders', 'DailyTenantSales')
+    rows = (
+        Order.objects
+        .annotate(day=TruncDate('created_at'))
+        .values('tenant_id', 'day')
+        .annotate(revenue=models.Sum('total_amount'), order_count=models.Count('id'), item_qty=models.Sum('total_qty'))
+        .order_by()
+    )
+    DailyTenantSales.objects.bulk_create(
+        (DailyTenantSales(
+            tenant_id=row['tenant_id'],
+            date=row['day'],
+            revenue=row['revenue'] or 0,
+            order_count=row['order_count'],
+            item_qty=row['item_qty'] or 0,
+        ) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_images'),
+        ('orders', '0006_customer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTenantSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_qty', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='tenants.tenant')),
+            ],
+            options={
+                'db_table': 'daily_tenant_sales',
+                'ordering': ['-date'],
+                'unique_together': {('tenant', 'date')},
+            },
+        ),
+        migrations.RunPython(initial_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncDate
+
+
+def initial_product_rollup(apps, schema_editor):
+    # Isi rekap produk dari order yang sudah ada (sama dengan command rebuild_daily_sales);
+    # peringkat dihitung saat pertama dibaca atau oleh refresh_leaderboards
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailyProductSales = apps.get_model('orders', 'DailyProductSales')
+    rows = (
+        OrderItem.objects
+        .annotate(day=TruncDate('order__created_at'))
+        .values('product_id', 'order__tenant_id', 'day')
+        .annotate(qty=models.Sum('qty'), revenue=models.Sum('subtotal'))
+        .order_by()
+    )
+    DailyProductSales.objects.bulk_create(
+        (DailyProductSales(
+            product_id=row['product_id'],
+            tenant_id=row['order__tenant_id'],
+            date=row['day'],
+            qty=row['qty'] or 0,
+            revenue=row['revenue'] or 0,
+        ) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_images'),
+        ('tenants', '0003_tenant_stats'),
+        ('orders', '0007_daily_tenant_sales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('7d', '7 Hari Terakhir'), ('30d', '30 Hari Terakhir'), ('90d', '90 Hari Terakhir'), ('mtd', 'Bulan Ini')], max_length=3)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('qty', models.IntegerField()),
+                ('revenue', models.BigIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='top_products', to='tenants.tenant')),
+            ],
+            options={
+                'db_table': 'top_products',
+                'ordering': ['tenant', 'window', 'rank'],
+                'unique_together': {('tenant', 'window', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('qty', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_product_sales', to='tenants.tenant')),
+            ],
+            options={
+                'db_table': 'daily_product_sales',
+                'indexes': [models.Index(fields=['tenant', 'date'], name='daily_prod_sales_tenant_idx')],
+                'unique_together': {('product', 'date')},
+            },
+        ),
+        migrations.RunPython(initial_product_rollup, migrations.RunPython.noop),
+    ]
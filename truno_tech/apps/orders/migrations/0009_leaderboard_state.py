@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+from django.utils import timezone
+
+LEADERBOARD_SIZE = 10
+WINDOWS = ['7d', '30d', '90d', 'mtd']
+
+
+def initial_leaderboards(apps, schema_editor):
+    # Dashboard tidak lagi menghitung peringkat saat dibaca: hitung sekali untuk
+    # semua tenant (sama dengan command refresh_leaderboards)
+    Tenant = apps.get_model('tenants', 'Tenant')
+    DailyProductSales = apps.get_model('orders', 'DailyProductSales')
+    TopProduct = apps.get_model('orders', 'TopProduct')
+    LeaderboardState = apps.get_model('orders', 'LeaderboardState')
+    now = timezone.now()
+    today = timezone.localdate(now)
+
+    leaders = []
+    for window in WINDOWS:
+        if window == 'mtd':
+            start = today.replace(day=1)
+        else:
+            start = today - timedelta(days=int(window[:-1]))
+        sales = (
+            DailyProductSales.objects
+            .filter(date__gte=start, date__lte=today)
+            .values_list('tenant_id', 'product_id')
+            .annotate(qty=models.Sum('qty'), revenue=models.Sum('revenue'))
+            .order_by()
+        )
+        by_tenant = {}
+        for tenant_id, product_id, qty, revenue in sales:
+            by_tenant.setdefault(tenant_id, []).append((product_id, qty, revenue))
+        for tenant_id, products in by_tenant.items():
+            products.sort(key=lambda product: (-product[2], -product[1], product[0]))
+            leaders.extend(
+                TopProduct(
+                    tenant_id=tenant_id, window=window, rank=rank,
+                    product_id=product_id, qty=qty, revenue=revenue, computed_at=now,
+                )
+                for rank, (product_id, qty, revenue) in enumerate(products[:LEADERBOARD_SIZE], start=1)
+            )
+
+    TopProduct.objects.all().delete()
+    TopProduct.objects.bulk_create(leaders, batch_size=1000)
+    LeaderboardState.objects.bulk_create(
+        (LeaderboardState(tenant_id=tenant_id, computed_at=now)
+         for tenant_id in Tenant.objects.values_list('pk', flat=True).iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_tenant_stats'),
+        ('orders', '0008_product_sales_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardState',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_state', serialize=False, to='tenants.tenant')),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'leaderboard_states',
+            },
+        ),
+        migrations.RunPython(initial_leaderboards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Nama produk ikut tersimpan di orders_fts.product_names; saat produk diganti
+# namanya, susun ulang product_names semua order yang memuat produk itu.
+CREATE_SQL = """
+    CREATE TRIGGER products_fts_au AFTER UPDATE OF name ON products
+    WHEN new.name IS NOT old.name BEGIN
+        UPDATE orders_fts
+        SET product_names = coalesce((
+            SELECT group_concat(p.name, ' ')
+            FROM order_items i JOIN products p ON p.id = i.product_id
+            WHERE i.order_id = orders_fts.rowid
+        ), '')
+        WHERE rowid IN (SELECT order_id FROM order_items WHERE product_id = new.id);
+    END
+"""
+
+DROP_SQL = 'DROP TRIGGER IF EXISTS products_fts_au'
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_leaderboard_state'),
+        ('products', '0007_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
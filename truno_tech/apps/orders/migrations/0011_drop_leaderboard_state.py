@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_search_product_rename'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='LeaderboardState',
+        ),
+    ]
@@ -4,13 +4,49 @@ from django.core.exceptions import ValidationError
 from apps.tenants.models import Tenant
 from apps.products.models import Product
 
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+class Customer(models.Model):
+    """Pelanggan per tenant, dideduplikasi berdasarkan nomor telepon yang dinormalisasi"""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='customers')
+    phone_normalized = models.CharField(max_length=20)  # Digits only, leading 0 (e.g. 0812...)
+    phone = models.CharField(max_length=15)  # Phone as last entered
+    name = models.CharField(max_length=200, blank=True)
+    address = models.TextField(blank=True)
+    order_count = models.IntegerField(default=0)
+    total_spent = models.BigIntegerField(default=0)  # Lifetime spend in rupiah
+    first_order_at = models.DateTimeField(null=True, blank=True)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name or '-'} ({self.phone})"
+    
+    @property
+    def total_spent_display(self):
+        """Display lifetime spend in rupiah format"""
+        return f"Rp {self.total_spent:,}"
+    
+    class Meta:
+        db_table = 'customers'
+        unique_together = ['tenant', 'phone_normalized']
+        ordering = ['-total_spent']
+        indexes = [
+            models.Index(fields=['tenant', '-total_spent'], name='customers_tenant_spent_idx'),
+        ]
+
 class Order(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='orders')
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     customer_name = models.CharField(max_length=200, blank=True, null=True)
     customer_phone = models.CharField(max_length=15, blank=True, null=True)
     customer_address = models.TextField(blank=True, null=True)
     total_amount = models.BigIntegerField()  # Total amount in cents/rupiah
+    total_qty = models.IntegerField(default=0)  # Sum of order item qty, maintained on write
+    item_count = models.IntegerField(default=0)  # Number of order item lines, maintained on write
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    idempotency_key = models.CharField(max_length=IDEMPOTENCY_KEY_MAX_LENGTH, blank=True, null=True, editable=False)  # Client-generated key (offline POS sync)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -22,11 +58,6 @@ class Order(models.Model):
         """Display total amount in rupiah format"""
         return f"Rp {self.total_amount:,}"
     
-    @property
-    def total_qty(self):
-        """Total quantity of all items"""
-        return self.order_items.aggregate(models.Sum('qty'))['qty__sum'] or 0
-    
     def calculate_total(self):
         """Calculate total amount from order items"""
         total = self.order_items.aggregate(
@@ -36,12 +67,19 @@ class Order(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.total_amount:
-            self.total_amount = self.calculate_total()
+            # Order baru belum punya item; totalnya diisi setelah item disimpan
+            self.total_amount = self.calculate_total() if self.pk else 0
         super().save(*args, **kwargs)
     
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', '-created_at', '-id'], name='orders_tenant_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'idempotency_key'], name='orders_tenant_idempotency_key_uniq'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
@@ -70,23 +108,102 @@ class OrderItem(models.Model):
                 raise ValidationError(f'Stok {self.product.name} tidak mencukupi. Stok tersedia: {self.product.qty}')
     
     def save(self, *args, **kwargs):
-        self.full_clean()
-        
         # Set unit price from product's current price
         if not self.unit_price:
             self.unit_price = self.product.price
         
-        # Calculate subtotal
+        # Calculate subtotal (before full_clean: it is required and not editable in forms)
         self.subtotal = self.qty * self.unit_price
         
+        self.full_clean()
+        
         # Check if this is a new order item (reduce stock)
         is_new = self.pk is None
+        old_qty = 0 if is_new else OrderItem.objects.filter(pk=self.pk).values_list('qty', flat=True).first() or 0
         
         super().save(*args, **kwargs)
         
+        # Keep denormalized order totals in sync
+        Order.objects.filter(pk=self.order_id).update(
+            total_qty=models.F('total_qty') + self.qty - old_qty,
+            item_count=models.F('item_count') + (1 if is_new else 0)
+        )
+        
         # Reduce product stock for new items
         if is_new:
             self.product.reduce_stock(self.qty)
     
+    def delete(self, *args, **kwargs):
+        Order.objects.filter(pk=self.order_id).update(
+            total_qty=models.F('total_qty') - self.qty,
+            item_count=models.F('item_count') - 1
+        )
+        return super().delete(*args, **kwargs)
+    
+    class Meta:
+        db_table = 'order_items'
+
+class DailyTenantSales(models.Model):
+    """Rekap penjualan harian per tenant (tanggal lokal), diperbarui saat order dibuat"""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()  # Local date (TIME_ZONE) of the orders
+    revenue = models.BigIntegerField(default=0)  # Sum of order total_amount
+    order_count = models.IntegerField(default=0)
+    item_qty = models.IntegerField(default=0)  # Sum of order total_qty
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.tenant.name} - {self.date}"
+    
+    @property
+    def revenue_display(self):
+        """Display revenue in rupiah format"""
+        return f"Rp {self.revenue:,}"
+    
+    class Meta:
+        db_table = 'daily_tenant_sales'
+        unique_together = ['tenant', 'date']
+        ordering = ['-date']
+
+class DailyProductSales(models.Model):
+    """Rekap penjualan harian per produk (tanggal lokal), diperbarui saat order dibuat"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='daily_product_sales')
+    date = models.DateField()  # Local date (TIME_ZONE) of the orders
+    qty = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)  # Sum of order item subtotal
+    
+    def __str__(self):
+        return f"{self.product.name} - {self.date}"
+    
+    class Meta:
+        db_table = 'daily_product_sales'
+        unique_together = ['product', 'date']
+        indexes = [
+            models.Index(fields=['tenant', 'date'], name='daily_prod_sales_tenant_idx'),
+        ]
+
+class TopProduct(models.Model):
+    """Peringkat produk terlaris per tenant per jendela waktu, dihitung dari DailyProductSales"""
+    WINDOW_CHOICES = [
+        ('7d', '7 Hari Terakhir'),
+        ('30d', '30 Hari Terakhir'),
+        ('90d', '90 Hari Terakhir'),
+        ('mtd', 'Bulan Ini'),
+    ]
+    
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='top_products')
+    window = models.CharField(max_length=3, choices=WINDOW_CHOICES)
+    rank = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    qty = models.IntegerField()
+    revenue = models.BigIntegerField()
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.tenant.name} {self.window} #{self.rank}"
+    
     class Meta:
-        db_table = 'order_items'
\ No newline at end of file
+        db_table = 'top_products'
+        unique_together = ['tenant', 'window', 'rank']
+        ordering = ['tenant', 'window', 'rank']
@@ -0,0 +1,193 @@
+"""
+Struk / invoice PDF untuk order (reportlab).
+
+PDF disimpan di disk dengan nama `<order_id>-<hash isi>.pdf`, di mana hash
+dihitung dari data yang dicetak. Download ulang cukup membaca file (atau
+dijawab 304 lewat ETag); versi lama otomatis dibuang saat isi order berubah,
+setelah masa tenggang agar request lain yang sedang membacanya tidak gagal.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+RECEIPT_WIDTH_MM = 80
+MAX_NAME_CHARS = 30
+# Versi lama struk baru dihapus setelah sekian detik tidak diubah
+STALE_GRACE_SECONDS = 60
+
+
+def receipt_data(order, items):
+    """Data yang dicetak pada struk; `items` adalah OrderItem dengan product ter-load"""
+    return {
+        'order_id': order.id,
+        'tenant': {
+            'id': order.tenant_id,
+            'name': order.tenant.name,
+            'address': order.tenant.address,
+            'phone': order.tenant.phone,
+        },
+        'created_at': timezone.localtime(order.created_at).strftime('%d/%m/%Y %H:%M'),
+        'customer_name': order.customer_name or '',
+        'customer_phone': order.customer_phone or '',
+        'items': [
+            {
+                'name': item.product.name,
+                'sku': item.product.sku,
+                'qty': item.qty,
+                'unit_price': item.unit_price,
+                'subtotal': item.subtotal,
+            }
+            for item in items
+        ],
+        'total_amount': order.total_amount,
+    }
+
+
+def content_hash(data):
+    raw = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def receipt_path(data, digest=None):
+    digest = digest or content_hash(data)
+    return Path(settings.RECEIPT_CACHE_DIR) / str(data['tenant']['id']) / f"{data['order_id']}-{digest}.pdf"
+
+
+def _rupiah(amount):
+    return f"Rp {amount:,}".replace(',', '.')
+
+
+def render_receipt_pdf(data):
+    """Render struk ke bytes PDF. Fungsi murni, aman dijalankan di proses lain."""
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    width = RECEIPT_WIDTH_MM * mm
+    line = 4.2 * mm
+    margin = 4 * mm
+    header_lines = 6 + (1 if data['customer_name'] or data['customer_phone'] else 0)
+    height = (header_lines + 2 * len(data['items']) + 5) * line + 2 * margin
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(width, height), invariant=True)
+    pdf.setTitle(f"Order #{data['order_id']}")
+
+    y = height - margin - line
+    pdf.setFont('Helvetica-Bold', 10)
+    pdf.drawCentredString(width / 2, y, data['tenant']['name'][:MAX_NAME_CHARS + 6])
+    pdf.setFont('Helvetica', 7)
+    y -= line
+    pdf.drawCentredString(width / 2, y, data['tenant']['address'][:60])
+    y -= line
+    pdf.drawCentredString(width / 2, y, data['tenant']['phone'])
+
+    y -= line * 1.5
+    pdf.drawString(margin, y, f"Order #{data['order_id']}")
+    pdf.drawRightString(width - margin, y, data['created_at'])
+    if data['customer_name'] or data['customer_phone']:
+        y -= line
+        pdf.drawString(margin, y, f"{data['customer_name']} {data['customer_phone']}".strip())
+
+    y -= line * 0.5
+    pdf.line(margin, y, width - margin, y)
+
+    for item in data['items']:
+        y -= line
+        pdf.drawString(margin, y, item['name'][:MAX_NAME_CHARS])
+        y -= line
+        pdf.drawString(margin + 2 * mm, y, f"{item['qty']} x {_rupiah(item['unit_price'])}")
+        pdf.drawRightString(width - margin, y, _rupiah(item['subtotal']))
+
+    y -= line * 0.5
+    pdf.line(margin, y, width - margin, y)
+    y -= line * 1.2
+    pdf.setFont('Helvetica-Bold', 9)
+    pdf.drawString(margin, y, 'TOTAL')
+    pdf.drawRightString(width - margin, y, _rupiah(data['total_amount']))
+
+    y -= line * 1.5
+    pdf.setFont('Helvetica', 7)
+    pdf.drawCentredString(width / 2, y, 'Terima kasih')
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nama sementara unik per penulis (proses maupun thread)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'{path.stem}.', suffix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(content)
+    os.replace(tmp, path)
+
+    # Buang versi lama struk order yang sama, kecuali yang baru saja ditulis
+    cutoff = time.time() - STALE_GRACE_SECONDS
+    for stale in path.parent.glob(f"{path.name.split('-')[0]}-*.pdf"):
+        try:
+            if stale != path and stale.stat().st_mtime < cutoff:
+                stale.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _render_to_cache(args):
+    data, path = args
+    _write_atomic(Path(path), render_receipt_pdf(data))
+    return path
+
+
+def get_receipt(order):
+    """
+    (file PDF terbuka, hash) struk order; dirender hanya jika belum ada di
+    cache. File dibuka di sini, jadi tetap terbaca walaupun sesudahnya
+    dihapus oleh render versi lain.
+    """
+    items = order.order_items.select_related('product').order_by('id')
+    data = receipt_data(order, items)
+    digest = content_hash(data)
+    path = receipt_path(data, digest)
+    try:
+        return open(path, 'rb'), digest
+    except FileNotFoundError:
+        pass
+    content = render_receipt_pdf(data)
+    _write_atomic(path, content)
+    return io.BytesIO(content), digest
+
+
+def build_receipts_zip(orders, output, workers=None, chunk_size=500):
+    """
+    Render semua struk `orders` (yang belum ada di cache) memakai process pool,
+    lalu kemas ke satu file zip `output`. Mengembalikan (jumlah struk, jumlah dirender).
+    """
+    orders = orders.select_related('tenant').prefetch_related('order_items__product').order_by('created_at', 'id')
+
+    paths = []
+    pending = []
+    for order in orders.iterator(chunk_size=chunk_size):
+        data = receipt_data(order, sorted(order.order_items.all(), key=lambda item: item.id))
+        path = receipt_path(data)
+        paths.append(path)
+        if not path.exists():
+            pending.append((data, str(path)))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render_to_cache, pending, chunksize=50))
+
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, arcname=f"order-{path.name.split('-')[0]}.pdf")
+
+    return len(paths), len(pending)
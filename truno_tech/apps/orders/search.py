@@ -0,0 +1,70 @@
+"""
+Pencarian order berdasarkan nama/telepon/alamat pelanggan dan nama produk.
+
+Di SQLite memakai tabel FTS5 `orders_fts` (lihat migrasi 0005 dan 0010)
+dengan ranking bm25; di database lain jatuh ke pencarian `icontains` biasa.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from .models import Order
+
+SEARCH_COLUMNS = '{customer_name customer_phone customer_address product_names}'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TOKENS = 8
+
+
+def build_match_query(text, tenant_ids):
+    """
+    Ubah input bebas menjadi ekspresi MATCH FTS5 yang aman:
+    setiap kata menjadi prefix term, semuanya harus cocok (AND).
+    """
+    tokens = TOKEN_RE.findall(text or '')[:MAX_TOKENS]
+    if not tokens or not tenant_ids:
+        return None
+    terms = ' AND '.join(f'"{token}"*' for token in tokens)
+    tenants = ' OR '.join(f't{int(tenant_id)}' for tenant_id in tenant_ids)
+    return f'tenant:({tenants}) AND {SEARCH_COLUMNS}:({terms})'
+
+
+def _fts_available():
+    # Tabel FTS dibuat oleh migrasi hanya untuk SQLite
+    return connection.vendor == 'sqlite'
+
+
+def search_orders(tenant_ids, text, limit=20, offset=0):
+    """
+    Cari order milik `tenant_ids`. Mengembalikan (list Order terurut relevansi,
+    ada_halaman_berikutnya).
+    """
+    tenant_ids = list(tenant_ids)
+
+    if _fts_available():
+        match = build_match_query(text, tenant_ids)
+        if match is None:
+            return [], False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM orders_fts WHERE orders_fts MATCH %s ORDER BY rank LIMIT %s OFFSET %s',
+                [match, limit + 1, offset]
+            )
+            order_ids = [row[0] for row in cursor.fetchall()]
+        has_next = len(order_ids) > limit
+        order_ids = order_ids[:limit]
+        orders = Order.objects.select_related('tenant').in_bulk(order_ids)
+        return [orders[order_id] for order_id in order_ids if order_id in orders], has_next
+
+    tokens = TOKEN_RE.findall(text or '')[:MAX_TOKENS]
+    if not tokens or not tenant_ids:
+        return [], False
+    orders = Order.objects.filter(tenant_id__in=tenant_ids).select_related('tenant')
+    for token in tokens:
+        orders = orders.filter(
+            Q(customer_name__icontains=token)
+            | Q(customer_phone__icontains=token)
+            | Q(customer_address__icontains=token)
+            | Q(order_items__product__name__icontains=token)
+        )
+    orders = list(orders.distinct().order_by('-created_at', '-id')[offset:offset + limit + 1])
+    return orders[:limit], len(orders) > limit
@@ -0,0 +1,313 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from apps.products.models import Product, StockMovement
+from apps.products.stock import apply_stock_deltas
+from apps.tenants.counters import add_orders, verify_counters
+from apps.tenants.models import Tenant
+from .models import Order, OrderItem, IDEMPOTENCY_KEY_MAX_LENGTH
+from .customers import attach_customers, rebuild_customers
+from .rollup import local_date, rebuild_daily_sales, record_sales
+
+
+class OrderCreationError(Exception):
+    """Order tidak dapat dibuat dari item yang dikirim"""
+
+
+def _build_items(order, lines, products, requested):
+    """
+    Buat OrderItem (belum disimpan) untuk `lines` [(product_id, qty), ...]
+    dan isi total order di memori.
+
+    `requested` adalah stok yang sudah dipesan per produk (kumulatif, ikut
+    diperbarui), sehingga beberapa baris/order untuk produk yang sama tetap
+    dicek terhadap stok yang tersisa.
+    """
+    items = []
+    total_amount = 0
+
+    for product_id, qty_raw in lines:
+        try:
+            product = products.get(int(product_id))
+        except (TypeError, ValueError) as e:
+            raise OrderCreationError(f'Error pada item: {str(e)}')
+        if product is None:
+            raise OrderCreationError(
+                f'Error pada item: {Product._meta.object_name} matching query does not exist.'
+            )
+        # bool adalah subclass int dan float dipotong oleh int(): keduanya ditolak
+        if isinstance(qty_raw, bool) or (isinstance(qty_raw, float) and not qty_raw.is_integer()):
+            raise OrderCreationError(f'Error pada item: jumlah {product.name} harus bilangan bulat')
+        try:
+            qty = int(qty_raw)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise OrderCreationError(f'Error pada item: {str(e)}')
+        if qty <= 0:
+            raise OrderCreationError(f'Error pada item: jumlah {product.name} harus lebih dari 0')
+
+        requested[product.id] = requested.get(product.id, 0) + qty
+        if product.qty < requested[product.id]:
+            raise OrderCreationError(f'Stok {product.name} tidak mencukupi')
+
+        item = OrderItem(
+            order=order,
+            product=product,
+            qty=qty,
+            unit_price=product.price,
+            subtotal=qty * product.price,
+        )
+        items.append(item)
+        total_amount += item.subtotal
+
+    if total_amount == 0:
+        raise OrderCreationError('Order harus memiliki minimal satu item')
+
+    order.total_amount = total_amount
+    order.total_qty = sum(item.qty for item in items)
+    order.item_count = len(items)
+    return items
+
+
+def _sale_movements(orders):
+    """StockMovement penjualan, satu per produk per order; `orders` adalah [(order, items), ...]"""
+    movements = []
+    for order, items in orders:
+        sold = {}
+        for item in items:
+            sold[item.product_id] = sold.get(item.product_id, 0) + item.qty
+        movements.extend(
+            StockMovement(
+                product_id=product_id,
+                delta=-qty,
+                reason='sale',
+                order=order,
+                created_by=order.created_by,
+            )
+            for product_id, qty in sold.items()
+        )
+    return movements
+
+
+def _reserve_stock(requested, products, orders):
+    """Kurangi stok semua produk sekaligus; gagal jika stok berubah sejak dibaca"""
+    failed = apply_stock_deltas(
+        {product_id: -qty for product_id, qty in requested.items()},
+        movements=_sale_movements(orders),
+    )
+    if failed:
+        raise OrderCreationError(f'Stok {products[failed[0]].name} tidak mencukupi')
+
+
+def create_order(order, product_ids, quantities):
+    """
+    Simpan order beserta item-nya secara batch.
+
+    `order` adalah instance Order yang belum disimpan dengan tenant dan
+    created_by sudah terisi. Jumlah query tetap sama berapa pun banyaknya item:
+    satu query produk, satu insert order, satu bulk insert item, satu update stok,
+    satu bulk insert mutasi stok, serta dua query rekap harian dan dua query
+    penghitung tenant.
+    """
+    lines = [
+        (product_id, qty_str)
+        for product_id, qty_str in zip(product_ids, quantities)
+        if product_id and qty_str
+    ]
+
+    try:
+        products = Product.objects.filter(tenant=order.tenant).in_bulk(
+            {product_id for product_id, _ in lines}
+        )
+    except ValueError as e:
+        raise OrderCreationError(f'Error pada item: {str(e)}')
+
+    requested = {}
+    items = _build_items(order, lines, products, requested)
+
+    with transaction.atomic():
+        order.save()
+        attach_customers(order.tenant, [order])
+        OrderItem.objects.bulk_create(items)
+        _reserve_stock(requested, products, [(order, items)])
+        record_sales([order], items)
+        add_orders([order])
+
+    return order
+
+
+def ingest_orders(tenant, user, entries):
+    """
+    Simpan satu batch order dari terminal POS (mis. antrean offline).
+
+    Setiap entry berbentuk {"idempotency_key", "customer_name", "customer_phone",
+    "customer_address", "items": [{"product_id", "qty"}, ...]}. Entry yang
+    key-nya sudah pernah masuk dilewati sebagai duplikat, sehingga batch
+    aman dikirim ulang. Semua order valid disimpan dalam satu transaksi
+    dengan bulk insert. Mengembalikan list hasil per entry, sesuai urutan.
+    """
+    from .forms import OrderForm
+
+    results = [{'idempotency_key': None, 'status': None} for _ in entries]
+    keys = {}
+    repeated = []
+    for index, entry in enumerate(entries):
+        key = entry.get('idempotency_key') if isinstance(entry, dict) else None
+        results[index]['idempotency_key'] = key
+        if not isinstance(key, str) or not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            results[index].update(status='error', error='idempotency_key tidak valid')
+        elif key in keys:
+            repeated.append((index, keys[key]))
+        else:
+            keys[key] = index
+
+    existing = dict(
+        Order.objects
+        .filter(tenant=tenant, idempotency_key__in=list(keys))
+        .values_list('idempotency_key', 'id')
+    )
+
+    product_ids = set()
+    for key, index in keys.items():
+        for line in entries[index].get('items') or []:
+            if isinstance(line, dict) and str(line.get('product_id', '')).isdigit():
+                product_ids.add(int(line['product_id']))
+    products = Product.objects.filter(tenant=tenant).in_bulk(product_ids)
+
+    requested = {}
+    pending = []
+    for key, index in keys.items():
+        entry = entries[index]
+        if key in existing:
+            results[index].update(status='duplicate', order_id=existing[key])
+            continue
+
+        form = OrderForm(entry)
+        if not form.is_valid():
+            field, errors = next(iter(form.errors.items()))
+            results[index].update(status='error', error=f'{field}: {errors[0]}')
+            continue
+
+        order = form.save(commit=False)
+        order.tenant = tenant
+        order.created_by = user
+        order.idempotency_key = key
+
+        lines = [
+            (line.get('product_id'), line.get('qty'))
+            for line in entry.get('items') or []
+            if isinstance(line, dict)
+        ]
+        trial = dict(requested)
+        try:
+            items = _build_items(order, lines, products, trial)
+        except OrderCreationError as e:
+            results[index].update(status='error', error=str(e))
+            continue
+        requested = trial
+        pending.append((index, order, items))
+
+    if pending:
+        with transaction.atomic():
+            orders = [order for _, order, _ in pending]
+            orders = Order.objects.bulk_create(orders)
+            if any(order.pk is None for order in orders):
+                # Backend tanpa RETURNING: ambil id lewat idempotency key
+                ids = dict(
+                    Order.objects
+                    .filter(tenant=tenant, idempotency_key__in=[o.idempotency_key for o in orders])
+                    .values_list('idempotency_key', 'id')
+                )
+                for order in orders:
+                    order.pk = ids[order.idempotency_key]
+            attach_customers(tenant, orders)
+            OrderItem.objects.bulk_create([item for _, _, items in pending for item in items])
+            _reserve_stock(requested, products, [(order, items) for _, order, items in pending])
+            record_sales(orders, [item for _, _, items in pending for item in items])
+            add_orders(orders)
+
+        for index, order, _ in pending:
+            results[index].update(status='created', order_id=order.pk)
+
+    # Key yang muncul lebih dari sekali dalam batch mengikuti kemunculan pertamanya
+    for index, first_index in repeated:
+        first = results[first_index]
+        if first['status'] == 'error':
+            results[index].update(status='error', error=first['error'])
+        else:
+            results[index].update(status='duplicate', order_id=first['order_id'])
+
+    return results
+
+
+def order_totals_subqueries(item_model):
+    """Subquery total_qty dan item_count aktual per order (dari tabel item)"""
+    items = item_model.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    return (
+        Coalesce(Subquery(items.annotate(s=Sum('qty')).values('s')), 0),
+        Coalesce(Subquery(items.annotate(c=Count('id')).values('c')), 0),
+    )
+
+
+def reconcile_order_totals(orders, dry_run=False, batch_size=1000):
+    """
+    Samakan Order.total_qty/item_count dengan isi order_items.
+    Mengembalikan jumlah order yang nilainya melenceng (dan diperbaiki).
+    """
+    actual_qty, actual_count = order_totals_subqueries(OrderItem)
+    drifted = (
+        orders
+        .annotate(actual_qty=actual_qty, actual_count=actual_count)
+        .filter(~Q(total_qty=F('actual_qty')) | ~Q(item_count=F('actual_count')))
+        .only('pk', 'total_qty', 'item_count')
+        .order_by()
+    )
+
+    fixed = 0
+    batch = []
+    for order in drifted.iterator(chunk_size=batch_size):
+        order.total_qty = order.actual_qty
+        order.item_count = order.actual_count
+        batch.append(order)
+        if len(batch) >= batch_size:
+            fixed += _flush_order_totals(batch, dry_run)
+            batch = []
+    fixed += _flush_order_totals(batch, dry_run)
+    return fixed
+
+
+def _flush_order_totals(batch, dry_run):
+    if batch and not dry_run:
+        Order.objects.bulk_update(batch, ['total_qty', 'item_count'])
+    return len(batch)
+
+
+def sync_edited_orders(orders, deleted=False):
+    """
+    Samakan data turunan setelah `orders` diubah atau dihapus di luar
+    create_order (mis. lewat admin): total order, rekap harian tenant mulai
+    tanggal order tertua, penghitung tenant dan statistik pelanggan.
+    Peringkat produk ikut diperbarui pada refresh_leaderboards berikutnya.
+    """
+    orders = list(orders)
+    if not orders:
+        return
+    tenants = Tenant.objects.filter(pk__in={order.tenant_id for order in orders})
+    since = min(local_date(order.created_at) for order in orders)
+
+    with transaction.atomic():
+        if not deleted:
+            amounts = (
+                OrderItem.objects
+                .filter(order=OuterRef('pk'))
+                .order_by()
+                .values('order')
+                .annotate(s=Sum('subtotal'))
+                .values('s')
+            )
+            edited = Order.objects.filter(pk__in=[order.pk for order in orders])
+            edited.update(total_amount=Coalesce(Subquery(amounts), 0))
+            reconcile_order_totals(edited)
+        rebuild_daily_sales(tenants, since)
+        verify_counters(tenants, repair=True)
+        for tenant in tenants:
+            rebuild_customers(tenant)
@@ -1,3 +1,491 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import UserProfile
+from apps.products.models import Product, ProductCategory, StockMovement
+from apps.tenants.counters import verify_counters
+from apps.tenants.models import Tenant, TenantAccess
+from .leaderboards import refresh_leaderboards, top_products, window_range
+from .models import Customer, DailyProductSales, DailyTenantSales, Order, TopProduct
+from .receipts import STALE_GRACE_SECONDS, get_receipt
+from .rollup import rebuild_daily_sales
+from .search import search_orders
+from .services import OrderCreationError, create_order, ingest_orders
+
+
+class OrderFixtureMixin:
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='rahasia-123')
+        UserProfile.objects.create(user=self.owner, role='client', max_tenants=5)
+        self.tenant = Tenant.objects.create(owner=self.owner, name='Toko', address='Jl. A', phone='0811')
+        self.category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+        self.products = [
+            Product.objects.create(
+                tenant=self.tenant, category=self.category, sku=f'S{i}', name=f'Produk {i}',
+                qty=1000, price=1000 * (i + 1), created_by=self.owner,
+            )
+            for i in range(20)
+        ]
+
+    def order(self, lines, phone='', created_at=None):
+        order = Order(
+            tenant=self.tenant, created_by=self.owner,
+            customer_name='Budi', customer_phone=phone, customer_address='Jl. B',
+        )
+        # created_at diisi auto_now_add; order lampau dibuat dengan waktu yang dimundurkan
+        with mock.patch('django.utils.timezone.now', return_value=created_at or timezone.now()):
+            return create_order(
+                order,
+                [str(product.pk) for product, _ in lines],
+                [str(qty) for _, qty in lines],
+            )
+
+
+class SalesHistoryMixin(OrderFixtureMixin):
+    """Beberapa order pada hari berbeda, dua di antaranya dari pelanggan yang sama"""
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.order([(self.products[0], 2), (self.products[1], 1)], phone='0812-1111', created_at=now)
+        self.order([(self.products[0], 1)], phone='+62 812 1111', created_at=now - timedelta(days=1))
+        self.order([(self.products[2], 5)], phone='0813 2222', created_at=now - timedelta(days=40))
+        self.order([(self.products[1], 4), (self.products[2], 1)], created_at=now - timedelta(days=3))
+
+
+class CreateOrderTest(OrderFixtureMixin, TestCase):
+    def test_query_count_does_not_grow_with_items(self):
+        # Pemanasan: baris versi cache dan rekap hari ini sudah ada
+        self.order([(self.products[0], 1)])
+
+        with CaptureQueriesContext(connection) as one_line:
+            self.order([(self.products[0], 1)])
+        with CaptureQueriesContext(connection) as many_lines:
+            self.order([(product, 2) for product in self.products])
+
+        self.assertEqual(len(many_lines), len(one_line))
+
+    def test_items_and_stock_saved(self):
+        order = self.order([(self.products[0], 2), (self.products[1], 3)])
+
+        self.assertEqual(order.total_amount, 2 * 1000 + 3 * 2000)
+        self.assertEqual(order.order_items.count(), 2)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).qty, 997)
+
+    def test_invalid_qty_rejected_without_touching_stock(self):
+        product = self.products[0]
+        for qty in (0, -3, 1.5, True, 'dua'):
+            with self.subTest(qty=qty):
+                order = Order(tenant=self.tenant, created_by=self.owner, customer_name='Budi')
+                with self.assertRaises(OrderCreationError):
+                    create_order(order, [str(product.pk)], [qty])
+
+        product.refresh_from_db()
+        self.assertEqual(product.qty, 1000)
+        self.assertFalse(Order.objects.exists())
+
+    def test_insufficient_stock_rejected(self):
+        product = self.products[0]
+        with self.assertRaises(OrderCreationError):
+            self.order([(product, 600), (product, 600)])
+
+        product.refresh_from_db()
+        self.assertEqual(product.qty, 1000)
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class IngestOrdersTest(OrderFixtureMixin, TestCase):
+    def entries(self):
+        return [
+            {
+                'idempotency_key': 'pos-1',
+                'customer_name': 'Budi',
+                'customer_phone': '0812 3456',
+                'items': [{'product_id': self.products[0].pk, 'qty': 2}],
+            },
+            {
+                'idempotency_key': 'pos-2',
+                'customer_name': 'Ani',
+                'items': [{'product_id': self.products[1].pk, 'qty': 3}],
+            },
+        ]
+
+    def test_replay_is_idempotent(self):
+        first = ingest_orders(self.tenant, self.owner, self.entries())
+        replay = ingest_orders(self.tenant, self.owner, self.entries())
+
+        self.assertEqual([r['status'] for r in first], ['created', 'created'])
+        self.assertEqual([r['status'] for r in replay], ['duplicate', 'duplicate'])
+        self.assertEqual([r['order_id'] for r in replay], [r['order_id'] for r in first])
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).qty, 998)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).qty, 997)
+        self.assertEqual(Customer.objects.get().order_count, 1)
+
+    def test_repeated_key_in_batch_created_once(self):
+        entries = self.entries()[:1] * 2
+
+        results = ingest_orders(self.tenant, self.owner, entries)
+
+        self.assertEqual([r['status'] for r in results], ['created', 'duplicate'])
+        self.assertEqual(results[0]['order_id'], results[1]['order_id'])
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).qty, 998)
+
+    def test_invalid_entry_does_not_block_others(self):
+        entries = self.entries()
+        entries[1]['items'][0]['qty'] = -1
+
+        results = ingest_orders(self.tenant, self.owner, entries)
+
+        self.assertEqual([r['status'] for r in results], ['created', 'error'])
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).qty, 1000)
+
+    def test_sync_endpoint(self):
+        self.client.force_login(self.owner)
+        body = json.dumps({'tenant_id': self.tenant.pk, 'orders': self.entries()})
+
+        first = self.client.post('/orders/api/sync/', body, content_type='application/json')
+        replay = self.client.post('/orders/api/sync/', body, content_type='application/json')
+        invalid = self.client.post('/orders/api/sync/', '{"tenant_id": "x"}', content_type='application/json')
+
+        self.assertEqual((first.json()['created'], replay.json()['duplicate']), (2, 2))
+        self.assertEqual(invalid.status_code, 400)
+
+
+
+class CustomerStatsTest(SalesHistoryMixin, TestCase):
+    fields = ('phone_normalized', 'order_count', 'total_spent', 'first_order_at', 'last_order_at')
+
+    def stats(self):
+        return list(Customer.objects.values_list(*self.fields).order_by('phone_normalized'))
+
+    def test_incremental_stats_match_rebuild(self):
+        stats = self.stats()
+
+        call_command('rebuild_customers', tenant=self.tenant.pk, stdout=io.StringIO())
+
+        self.assertEqual(stats, self.stats())
+        self.assertEqual([row[1] for row in stats], [2, 1])
+        self.assertEqual(Order.objects.filter(customer__isnull=True).count(), 1)
+
+    def test_stamps_come_from_order_timestamps(self):
+        customer = Customer.objects.get(phone_normalized='08132222')
+        order = Order.objects.get(customer=customer)
+
+        self.assertEqual((customer.first_order_at, customer.last_order_at), (order.created_at, order.created_at))
+
+
+class SalesRollupTest(SalesHistoryMixin, TestCase):
+    """Rekap harian yang dijaga inkremental sama dengan hasil hitung ulang"""
+
+    def rollups(self):
+        return (
+            list(DailyTenantSales.objects.values_list('date', 'revenue', 'order_count', 'item_qty').order_by('date')),
+            list(DailyProductSales.objects.values_list('product_id', 'date', 'qty', 'revenue').order_by('product_id', 'date')),
+        )
+
+    def assertRollupsMatchRebuild(self):
+        rollups = self.rollups()
+        rebuild_daily_sales(Tenant.objects.filter(pk=self.tenant.pk))
+        self.assertEqual(rollups, self.rollups())
+        return rollups
+
+    def test_daily_rollups_match_rebuild(self):
+        tenant_rows, _ = self.assertRollupsMatchRebuild()
+
+        self.assertEqual(len(tenant_rows), 4)
+
+    def test_admin_edits_resync_derived_data(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='rahasia-123'))
+        order = Order.objects.get(item_count=2, customer_phone='0812-1111')
+        first, second = order.order_items.order_by('pk')
+
+        response = self.client.post(f'/admin/orders/order/{order.pk}/change/', {
+            'customer_name': 'Budi', 'customer_phone': '0899 0000', 'customer_address': 'Jl. B',
+            'created_by': self.owner.pk,
+            'order_items-TOTAL_FORMS': '2', 'order_items-INITIAL_FORMS': '2',
+            'order_items-MIN_NUM_FORMS': '0', 'order_items-MAX_NUM_FORMS': '1000',
+            'order_items-0-id': first.pk, 'order_items-0-order': order.pk,
+            'order_items-0-product': first.product_id, 'order_items-0-qty': '3',
+            'order_items-0-unit_price': first.unit_price,
+            'order_items-1-id': second.pk, 'order_items-1-order': order.pk,
+            'order_items-1-product': second.product_id, 'order_items-1-qty': second.qty,
+            'order_items-1-unit_price': second.unit_price, 'order_items-1-DELETE': 'on',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.total_qty, order.item_count), (3 * first.unit_price, 3, 1))
+        self.assertRollupsMatchRebuild()
+        self.assertEqual(verify_counters(Tenant.objects.filter(pk=self.tenant.pk)), [])
+        self.assertEqual(order.customer.phone_normalized, '08990000')
+        self.assertEqual(Customer.objects.get(phone_normalized='08121111').order_count, 1)
+
+        self.client.post('/admin/orders/order/add/', {
+            'tenant': self.tenant.pk, 'customer_name': 'Ani', 'customer_phone': '0899-0000',
+            'customer_address': 'Jl. C', 'created_by': self.owner.pk,
+            'order_items-TOTAL_FORMS': '1', 'order_items-INITIAL_FORMS': '0',
+            'order_items-MIN_NUM_FORMS': '0', 'order_items-MAX_NUM_FORMS': '1000',
+            'order_items-0-product': self.products[3].pk, 'order_items-0-qty': '2',
+            'order_items-0-unit_price': self.products[3].price,
+        })
+
+        added = Order.objects.get(customer_name='Ani')
+        self.assertEqual((added.total_amount, added.total_qty, added.item_count), (2 * self.products[3].price, 2, 1))
+        self.assertEqual(added.customer.order_count, 2)
+        self.assertRollupsMatchRebuild()
+
+        self.client.post(f'/admin/orders/order/{order.pk}/delete/', {'post': 'yes'})
+
+        self.assertFalse(Order.objects.filter(pk=order.pk).exists())
+        self.assertRollupsMatchRebuild()
+        self.assertEqual(verify_counters(Tenant.objects.filter(pk=self.tenant.pk)), [])
+
+
+class LeaderboardTest(SalesHistoryMixin, TestCase):
+    def test_leaderboard_matches_rollups(self):
+        refresh_leaderboards([self.tenant.pk])
+
+        start, end = window_range('30d', timezone.localdate())
+        expected = {}
+        for product_id, qty, revenue in DailyProductSales.objects.filter(
+            date__gte=start, date__lte=end
+        ).values_list('product_id', 'qty', 'revenue'):
+            total = expected.setdefault(product_id, [0, 0])
+            total[0] += qty
+            total[1] += revenue
+
+        with self.assertNumQueries(1):
+            leaders = top_products([self.tenant.pk], '30d')
+        self.assertEqual(
+            {leader.product_id: [leader.qty, leader.revenue] for leader in leaders},
+            expected,
+        )
+        self.assertEqual([leader.rank for leader in leaders], [1, 2, 3])
+        self.assertEqual(TopProduct.objects.filter(tenant=self.tenant, window='90d').count(), 3)
+
+    def test_window_start(self):
+        today = timezone.localdate()
+
+        self.assertEqual(window_range('30d', today), (today - timedelta(days=30), today))
+        self.assertEqual(window_range('mtd', today), (today.replace(day=1), today))
+
+    def test_refresh_clears_tenant_without_sales(self):
+        refresh_leaderboards([self.tenant.pk])
+        Order.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+
+        refresh_leaderboards([self.tenant.pk])
+
+        self.assertEqual(top_products([self.tenant.pk]), [])
+
+
+class ReceiptCacheTest(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        override = override_settings(RECEIPT_CACHE_DIR=self.cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.receipt_order = self.order([(self.products[0], 2)], phone='08121111')
+
+    def receipt(self):
+        receipt, digest = get_receipt(Order.objects.select_related('tenant').get(pk=self.receipt_order.pk))
+        with receipt:
+            return receipt.read(), digest
+
+    def cached_files(self):
+        return sorted(os.listdir(os.path.join(self.cache_dir, str(self.tenant.pk))))
+
+    def test_second_request_served_from_cache(self):
+        content, digest = self.receipt()
+        self.assertTrue(content.startswith(b'%PDF'))
+
+        with mock.patch('apps.orders.receipts.render_receipt_pdf') as render:
+            cached, cached_digest = self.receipt()
+        render.assert_not_called()
+        self.assertEqual((cached, cached_digest), (content, digest))
+        self.assertEqual(self.cached_files(), [f'{self.receipt_order.pk}-{digest}.pdf'])
+
+    def test_changed_order_rendered_again_and_stale_version_expires(self):
+        _, old_digest = self.receipt()
+        Order.objects.filter(pk=self.receipt_order.pk).update(customer_name='Budi Santoso')
+
+        _, new_digest = self.receipt()
+        self.assertNotEqual(new_digest, old_digest)
+        # Versi lama masih dalam masa tenggang
+        self.assertEqual(len(self.cached_files()), 2)
+
+        old_path = os.path.join(self.cache_dir, str(self.tenant.pk), f'{self.receipt_order.pk}-{old_digest}.pdf')
+        past = time.time() - STALE_GRACE_SECONDS - 1
+        os.utime(old_path, (past, past))
+        Order.objects.filter(pk=self.receipt_order.pk).update(customer_name='Ani')
+        self.receipt()
+        self.assertNotIn(f'{self.receipt_order.pk}-{old_digest}.pdf', self.cached_files())
+
+    def test_view_answers_304_for_matching_etag(self):
+        self.client.force_login(self.owner)
+        url = f'/orders/{self.receipt_order.pk}/receipt/'
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        b''.join(response.streaming_content)
+        response.close()
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+
+class ReferenceCacheTest(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.owner)
+        Product.objects.filter(pk=self.products[1].pk).update(qty=0)
+
+    def get(self, endpoint, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(f'/orders/api/{endpoint}/', {'tenant_id': self.tenant.pk, **params}, **headers)
+
+    def test_products_keep_stock_and_hide_sold_out(self):
+        products = {p['id']: p for p in self.get('products').json()['products']}
+
+        self.assertEqual(products[self.products[0].pk]['qty'], 1000)
+        self.assertNotIn(self.products[1].pk, products)
+        self.assertEqual(len(products), 19)
+
+    def test_etag_revalidation(self):
+        first = self.get('catalog')
+        self.assertEqual(self.get('catalog', etag=first['ETag']).status_code, 304)
+
+        # Penjualan tidak membatalkan katalog, tapi membatalkan stok dan daftar produk
+        stock = self.get('stock')
+        products = self.get('products')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order([(self.products[0], 1)])
+        self.assertEqual(self.get('catalog', etag=first['ETag']).status_code, 304)
+        self.assertEqual(self.get('stock', etag=stock['ETag']).json()['stock'][str(self.products[0].pk)], 999)
+        self.assertEqual(self.get('products', etag=products['ETag']).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].name = 'Kopi'
+            self.products[0].save()
+        response = self.get('catalog', etag=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Kopi', [p['name'] for p in response.json()['products']])
+
+    def test_revoked_access_applies_immediately(self):
+        crew = User.objects.create_user('crew', password='rahasia-123')
+        UserProfile.objects.create(user=crew, role='crew')
+        access = TenantAccess.objects.create(tenant=self.tenant, crew=crew, granted_by=self.owner)
+        self.client.force_login(crew)
+        etag = self.get('stock')['ETag']
+
+        access.delete()
+        self.assertEqual(self.get('stock', etag=etag).json(), {'stock': {}})
+
+        access = TenantAccess.objects.create(tenant=self.tenant, crew=crew, granted_by=self.owner)
+        self.assertEqual(self.get('stock', etag=etag).status_code, 304)
+        UserProfile.objects.filter(user=crew).update(role='superuser')
+        self.assertEqual(self.get('products').json(), {'products': []})
+
+
+class OrderSearchTest(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.match = self.order([(self.products[3], 1)], phone='0812 5555')
+        Order.objects.filter(pk=self.match.pk).update(customer_name='Siti Aminah')
+        self.order([(self.products[4], 1)])
+
+    def search(self, text):
+        return [order.pk for order in search_orders([self.tenant.pk], text)[0]]
+
+    def test_matches_customer_and_product_prefixes(self):
+        self.assertEqual(self.search('sit amin'), [self.match.pk])
+        self.assertEqual(self.search('5555'), [self.match.pk])
+        self.assertEqual(self.search('produk 3'), [self.match.pk])
+        self.assertEqual(search_orders([], 'siti'), ([], False))
+
+    def test_product_rename_reindexed(self):
+        product = self.products[3]
+        product.name = 'Kopi Susu'
+        product.save()
+
+        self.assertEqual(self.search('kopi'), [self.match.pk])
+        self.assertEqual(self.search('produk 3'), [])
+
+    def test_invalid_tenant_filter_ignored(self):
+        self.client.force_login(self.owner)
+
+        page = self.client.get('/orders/search/', {'q': 'siti', 'tenant': 'abc'})
+        api = self.client.get('/orders/api/search/', {'q': 'siti', 'tenant_id': 'abc'})
+
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual([order['id'] for order in api.json()['orders']], [self.match.pk])
+
+
+class OrderExportTest(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+        self.today = timezone.localdate()
+        self.order([(self.products[0], 2), (self.products[1], 1)])
+        self.old = self.order([(self.products[2], 1)], created_at=timezone.now() - timedelta(days=10))
+        Order.objects.filter(pk=self.old.pk).update(
+            customer_name='=HYPERLINK("http://x")', customer_phone='+62 812', customer_address='@SUM(A1)',
+        )
+
+    def csv_rows(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_csv_streams_one_row_per_item(self):
+        response = self.client.get('/orders/export/')
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        rows = self.csv_rows(response)
+        self.assertEqual(rows[0][0], 'Order ID')
+        self.assertEqual(len(rows), 1 + 3)
+
+    def test_date_filter_and_impossible_bound(self):
+        start = (self.today - timedelta(days=1)).isoformat()
+        rows = self.csv_rows(self.client.get('/orders/export/', {'start': start}))
+        self.assertEqual(len(rows), 1 + 2)
+
+        # Tanggal yang tidak ada diabaikan, bukan error 500
+        rows = self.csv_rows(self.client.get('/orders/export/', {'start': '2024-02-30', 'tenant': 'abc'}))
+        self.assertEqual(len(rows), 1 + 3)
+
+    def test_formula_cells_escaped(self):
+        rows = self.csv_rows(self.client.get('/orders/export/'))
+        old = next(row for row in rows[1:] if row[0] == str(self.old.pk))
+
+        self.assertEqual(old[3:6], ["'=HYPERLINK(\"http://x\")", "'+62 812", "'@SUM(A1)"])
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get('/orders/export/xlsx/')
+
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        rows = list(sheet.values)
+        self.assertEqual(len(rows), 1 + 3)
+        self.assertIn("'=HYPERLINK(\"http://x\")", [row[3] for row in rows])
@@ -7,7 +7,16 @@ urlpatterns = [
     path('', views.order_list_view, name='list'),
     path('create/', views.order_create_view, name='create'),
     path('<int:order_id>/', views.order_detail_view, name='detail'),
+    path('<int:order_id>/receipt/', views.order_receipt_view, name='receipt'),
+    path('search/', views.order_search_view, name='search'),
+    path('export/', views.order_export_csv_view, name='export_csv'),
+    path('export/xlsx/', views.order_export_xlsx_view, name='export_xlsx'),
     
     # AJAX URLs
     path('api/products/', views.get_products_by_tenant, name='get_products_by_tenant'),
+    path('api/catalog/', views.get_catalog_by_tenant, name='get_catalog_by_tenant'),
+    path('api/stock/', views.get_stock_by_tenant, name='get_stock_by_tenant'),
+    path('api/sync/', views.order_sync_view, name='sync'),
+    path('api/search/', views.order_search_api, name='search_api'),
+    path('api/customers/', views.customer_autocomplete_api, name='customer_autocomplete'),
 ]
\ No newline at end of file
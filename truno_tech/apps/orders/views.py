@@ -1,12 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.db import transaction
-from django.http import JsonResponse
+from django.db import transaction, IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
+import json
+from apps.core.pagination import paginate_request, render_keyset
+from apps.core.refcache import cached_json, catalog_scope, stock_scope
 from apps.tenants.models import Tenant, TenantAccess
 from apps.products.models import Product
 from .models import Order, OrderItem
 from .forms import OrderForm, OrderItemFormSet
+from .services import create_order, ingest_orders, OrderCreationError
+from .exports import stream_csv, write_xlsx
+from .search import search_orders
+from .customers import autocomplete_customers
+from .receipts import get_receipt
+
+MAX_SYNC_BATCH = 2000
+SEARCH_PER_PAGE = 20
 
 def get_accessible_tenants(user):
     """Get tenants that user can access"""
@@ -40,11 +55,13 @@ def order_list_view(request):
     if tenant_filter:
         orders = orders.filter(tenant_id=tenant_filter)
     
-    return render(request, 'orders/order_list.html', {
-        'orders': orders,
+    page = paginate_request(request, orders, ('-created_at', '-id'))
+    
+    return render_keyset(request, 'orders/order_list.html', 'orders/_order_rows.html', {
+        'orders': page,
         'tenants': tenants,
         'selected_tenant': int(tenant_filter) if tenant_filter else None
-    })
+    }, page)
 
 @login_required
 def order_create_view(request):
@@ -62,49 +79,17 @@ def order_create_view(request):
         
         if form.is_valid():
             try:
-                with transaction.atomic():
-                    order = form.save(commit=False)
-                    order.tenant = tenant
-                    order.created_by = request.user
-                    order.total_amount = 0  # Will be calculated after items are saved
-                    order.save()
-                    
-                    # Process order items from POST data
-                    items_data = []
-                    product_ids = request.POST.getlist('product_id[]')
-                    quantities = request.POST.getlist('qty[]')
-                    
-                    total_amount = 0
-                    
-                    for product_id, qty_str in zip(product_ids, quantities):
-                        if product_id and qty_str:
-                            try:
-                                product = Product.objects.get(id=product_id, tenant=tenant)
-                                qty = int(qty_str)
-                                
-                                if product.qty >= qty:
-                                    order_item = OrderItem(
-                                        order=order,
-                                        product=product,
-                                        qty=qty,
-                                        unit_price=product.price
-                                    )
-                                    order_item.save()  # This will reduce stock automatically
-                                    total_amount += order_item.subtotal
-                                else:
-                                    raise Exception(f'Stok {product.name} tidak mencukupi')
-                            except (Product.DoesNotExist, ValueError) as e:
-                                raise Exception(f'Error pada item: {str(e)}')
-                    
-                    if total_amount == 0:
-                        raise Exception('Order harus memiliki minimal satu item')
-                    
-                    # Update total amount
-                    order.total_amount = total_amount
-                    order.save()
-                    
-                    messages.success(request, f'Order #{order.id} berhasil dibuat.')
-                    return redirect('orders:detail', order_id=order.id)
+                order = form.save(commit=False)
+                order.tenant = tenant
+                order.created_by = request.user
+                create_order(
+                    order,
+                    request.POST.getlist('product_id[]'),
+                    request.POST.getlist('qty[]')
+                )
+                
+                messages.success(request, f'Order #{order.id} berhasil dibuat.')
+                return redirect('orders:detail', order_id=order.id)
                     
             except Exception as e:
                 messages.error(request, f'Error: {str(e)}')
@@ -132,19 +117,257 @@ def order_detail_view(request, order_id):
         'order_items': order_items
     })
 
+@login_required
+def order_receipt_view(request, order_id):
+    order = get_object_or_404(Order.objects.select_related('tenant'), id=order_id)
+    
+    if not check_tenant_access(request.user, order.tenant):
+        messages.error(request, 'Anda tidak memiliki akses ke order ini.')
+        return redirect('orders:list')
+    
+    try:
+        receipt, digest = get_receipt(order)
+    except ImportError:
+        messages.error(request, 'Cetak struk membutuhkan paket reportlab.')
+        return redirect('orders:detail', order_id=order.id)
+    
+    etag = f'"{digest}"'
+    if request.headers.get('If-None-Match') == etag:
+        receipt.close()
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(receipt, content_type='application/pdf', filename=f'order-{order.id}.pdf')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
+
 @login_required
 def get_products_by_tenant(request):
     """AJAX endpoint to get products by tenant"""
     tenant_id = request.GET.get('tenant_id')
-    if tenant_id:
+    if tenant_id and tenant_id.isdigit():
         tenant = get_object_or_404(Tenant, id=tenant_id)
         if check_tenant_access(request.user, tenant):
-            products = Product.objects.filter(
-                tenant=tenant,
-                is_active=True,
-                qty__gt=0
-            ).values('id', 'name', 'sku', 'price', 'qty')
+            def build():
+                products = Product.objects.filter(
+                    tenant=tenant,
+                    is_active=True,
+                    qty__gt=0
+                ).values('id', 'name', 'sku', 'price', 'qty')
+                
+                # Paginated only when the client asks for it (?limit= / ?cursor=)
+                if 'limit' in request.GET or 'cursor' in request.GET:
+                    page = paginate_request(request, products, ('name', 'id'))
+                    return {'products': page.object_list, 'next_cursor': page.next_cursor}
+                
+                return {'products': list(products)}
             
-            return JsonResponse({'products': list(products)})
+            # Memuat stok, jadi berlaku sampai katalog atau stok tenant berubah
+            return cached_json(request, (catalog_scope(tenant.id), stock_scope(tenant.id)), build)
+    
+    return JsonResponse({'products': []})
+
+@login_required
+def get_catalog_by_tenant(request):
+    """
+    AJAX endpoint: produk aktif tenant tanpa stok (id, name, sku, price).
+    Stok diambil terpisah dari api/stock/, jadi cache katalog tidak
+    kedaluwarsa di setiap penjualan.
+    """
+    tenant_id = request.GET.get('tenant_id')
+    if tenant_id and tenant_id.isdigit():
+        tenant = get_object_or_404(Tenant, id=tenant_id)
+        if check_tenant_access(request.user, tenant):
+            def build():
+                products = Product.objects.filter(
+                    tenant=tenant,
+                    is_active=True
+                ).values('id', 'name', 'sku', 'price')
+                
+                if 'limit' in request.GET or 'cursor' in request.GET:
+                    page = paginate_request(request, products, ('name', 'id'))
+                    return {'products': page.object_list, 'next_cursor': page.next_cursor}
+                
+                return {'products': list(products)}
+            
+            return cached_json(request, catalog_scope(tenant.id), build)
+    
+    return JsonResponse({'products': []})
+
+@login_required
+def get_stock_by_tenant(request):
+    """AJAX endpoint: stok produk aktif yang masih tersedia, {product_id: qty}"""
+    tenant_id = request.GET.get('tenant_id')
+    if tenant_id and tenant_id.isdigit():
+        tenant = get_object_or_404(Tenant, id=tenant_id)
+        if check_tenant_access(request.user, tenant):
+            def build():
+                return {'stock': dict(
+                    Product.objects
+                    .filter(tenant=tenant, is_active=True, qty__gt=0)
+                    .values_list('id', 'qty')
+                )}
+            
+            return cached_json(request, stock_scope(tenant.id), build)
+    
+    return JsonResponse({'stock': {}})
+
+def _parse_bound(value):
+    """Tanggal dari query string; None jika kosong, salah format, atau tidak ada (mis. 2024-02-30)"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+def _get_export_orders(request):
+    """Orders to export, scoped to accessible tenants and the ?tenant=&start=&end= filter"""
+    tenants = get_accessible_tenants(request.user)
+    orders = Order.objects.filter(tenant__in=tenants)
+    
+    tenant_filter = request.GET.get('tenant')
+    if tenant_filter and tenant_filter.isdigit():
+        orders = orders.filter(tenant_id=tenant_filter)
+    
+    start = _parse_bound(request.GET.get('start'))
+    end = _parse_bound(request.GET.get('end'))
+    if start:
+        orders = orders.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        orders = orders.filter(created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+    
+    suffix = f"{start or 'awal'}_{end or timezone.localdate()}"
+    return orders, suffix
+
+@login_required
+def order_export_csv_view(request):
+    orders, suffix = _get_export_orders(request)
+    
+    response = StreamingHttpResponse(stream_csv(orders), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="orders_{suffix}.csv"'
+    return response
+
+@login_required
+def order_export_xlsx_view(request):
+    orders, suffix = _get_export_orders(request)
+    
+    try:
+        output = write_xlsx(orders)
+    except ImportError:
+        messages.error(request, 'Export XLSX membutuhkan paket XlsxWriter.')
+        return redirect('orders:list')
+    
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'orders_{suffix}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+@login_required
+@require_POST
+def order_sync_view(request):
+    """
+    JSON endpoint for POS terminals replaying queued (offline) sales.
+    
+    Body: {"tenant_id": 1, "orders": [{"idempotency_key": "...", "items": [...], ...}]}
+    Replays are safe: orders whose key was already stored are reported as duplicates.
+    """
+    try:
+        payload = json.loads(request.body)
+        tenant_id = int(payload['tenant_id'])
+        entries = payload['orders']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Format data tidak valid.'}, status=400)
+    
+    if not isinstance(entries, list) or len(entries) > MAX_SYNC_BATCH:
+        return JsonResponse({'error': f'orders harus berupa list maksimal {MAX_SYNC_BATCH} order.'}, status=400)
+    
+    tenant = Tenant.objects.filter(id=tenant_id).first()
+    if not tenant or not check_tenant_access(request.user, tenant):
+        return JsonResponse({'error': 'Anda tidak memiliki akses ke tenant ini.'}, status=403)
+    
+    try:
+        results = ingest_orders(tenant, request.user, entries)
+    except OrderCreationError as e:
+        # Stok berubah di tengah sinkronisasi; seluruh batch dibatalkan dan aman diulang
+        return JsonResponse({'error': str(e), 'retry': True}, status=409)
+    except IntegrityError:
+        # Batch yang sama sedang dikirim bersamaan dari koneksi lain
+        return JsonResponse({'error': 'Batch sedang diproses, silakan ulangi.', 'retry': True}, status=409)
+    
+    summary = {status: 0 for status in ('created', 'duplicate', 'error')}
+    for result in results:
+        summary[result['status']] += 1
+    
+    return JsonResponse({'results': results, **summary})
+
+def _search(request, tenant_param):
+    """Run an order search scoped to the user's tenants; returns (query, page, orders, has_next)"""
+    tenants = get_accessible_tenants(request.user)
+    tenant_filter = request.GET.get(tenant_param)
+    if tenant_filter and tenant_filter.isdigit():
+        tenants = tenants.filter(id=tenant_filter)
+    
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    
+    orders, has_next = search_orders(
+        tenants.values_list('id', flat=True),
+        query,
+        limit=SEARCH_PER_PAGE,
+        offset=(page - 1) * SEARCH_PER_PAGE
+    )
+    return query, page, orders, has_next
+
+@login_required
+def order_search_view(request):
+    query, page, orders, has_next = _search(request, 'tenant')
+    tenant_filter = request.GET.get('tenant')
+    
+    return render(request, 'orders/order_search.html', {
+        'orders': orders,
+        'query': query,
+        'page_number': page,
+        'has_next': has_next,
+        'tenants': get_accessible_tenants(request.user),
+        'selected_tenant': int(tenant_filter) if tenant_filter and tenant_filter.isdigit() else None
+    })
+
+@login_required
+def order_search_api(request):
+    """AJAX endpoint: ranked order search"""
+    query, page, orders, has_next = _search(request, 'tenant_id')
+    
+    return JsonResponse({
+        'orders': [{
+            'id': order.id,
+            'tenant': order.tenant.name,
+            'customer_name': order.customer_name,
+            'customer_phone': order.customer_phone,
+            'total_amount': order.total_amount,
+            'created_at': order.created_at.isoformat(),
+        } for order in orders],
+        'page': page,
+        'has_next': has_next,
+    })
+
+@login_required
+def customer_autocomplete_api(request):
+    """AJAX endpoint: customers whose phone starts with ?phone= (order form autocomplete)"""
+    tenant_id = request.GET.get('tenant_id')
+    if tenant_id:
+        tenant = get_object_or_404(Tenant, id=tenant_id)
+        if check_tenant_access(request.user, tenant):
+            customers = autocomplete_customers(tenant, request.GET.get('phone', ''))
+            return JsonResponse({'customers': [{
+                'id': customer.id,
+                'name': customer.name,
+                'phone': customer.phone,
+                'address': customer.address,
+                'order_count': customer.order_count,
+            } for customer in customers]})
     
-    return JsonResponse({'products': []})
\ No newline at end of file
+    return JsonResponse({'customers': []})
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ProductCategory, Product
+from .models import ProductCategory, Product, StockMovement, LowStockItem, ProductBulkUpdate
 
 @admin.register(ProductCategory)
 class ProductCategoryAdmin(admin.ModelAdmin):
@@ -10,8 +10,41 @@ class ProductCategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'sku', 'category', 'tenant', 'qty', 'price', 'is_active', 'created_at']
+    list_display = ['name', 'sku', 'category', 'tenant', 'qty', 'reorder_level', 'price', 'is_active', 'created_at']
     list_filter = ['is_active', 'tenant', 'category', 'created_at']
     search_fields = ['name', 'sku', 'tenant__name']
     readonly_fields = ['created_at', 'updated_at']
-    list_editable = ['qty', 'price', 'is_active']
\ No newline at end of file
+    list_editable = ['qty', 'price', 'is_active']
+
+    def save_model(self, request, obj, form, change):
+        if not change or 'qty' not in form.changed_data:
+            return super().save_model(request, obj, form, change)
+        # Perubahan stok lewat set_stock agar tercatat di ledger
+        fields = [name for name in form.changed_data if name != 'qty']
+        if fields:
+            obj.save(update_fields=fields + ['updated_at'])
+        obj.set_stock(form.cleaned_data['qty'], reason='edit', created_by=request.user, note='admin')
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['product', 'delta', 'reason', 'order', 'created_by', 'created_at']
+    list_filter = ['reason', 'created_at']
+    search_fields = ['product__name', 'product__sku', 'note']
+    list_select_related = ['product', 'created_by']
+    raw_id_fields = ['product', 'order']
+    readonly_fields = ['created_at']
+
+@admin.register(LowStockItem)
+class LowStockItemAdmin(admin.ModelAdmin):
+    list_display = ['product', 'tenant', 'since', 'notified_at']
+    list_filter = ['tenant', 'notified_at']
+    search_fields = ['product__name', 'product__sku']
+    list_select_related = ['product', 'tenant']
+    readonly_fields = ['product', 'tenant', 'since']
+
+@admin.register(ProductBulkUpdate)
+class ProductBulkUpdateAdmin(admin.ModelAdmin):
+    list_display = ['tenant', 'category', 'price_mode', 'price_value', 'rounding', 'is_active', 'affected', 'created_by', 'created_at']
+    list_filter = ['tenant', 'price_mode', 'created_at']
+    list_select_related = ['tenant', 'category', 'created_by']
+    readonly_fields = ['created_at']
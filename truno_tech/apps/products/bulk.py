@@ -0,0 +1,121 @@
+"""
+Perubahan massal harga dan status produk.
+
+Filter (tenant, kategori, daftar SKU) dan operasi (ubah harga persentase
+atau nominal, pembulatan, aktif/nonaktif) diterjemahkan menjadi ekspresi
+SQL, sehingga ribuan produk diubah dengan satu UPDATE. Preview memakai
+ekspresi yang sama lewat annotate tanpa menyimpan apa pun.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import F, Q, Value, Count, Sum, BigIntegerField, FloatField
+from django.db.models.functions import Cast, Greatest, Round
+from django.utils import timezone
+from apps.core.refcache import bump, catalog_scope, stock_scope
+from apps.tenants.counters import add_products
+from .models import Product
+from .stock import sync_low_stock
+
+PREVIEW_LIMIT = 20
+
+
+def parse_skus(text):
+    """Daftar SKU unik dari teks (dipisah baris baru, koma, atau titik koma)"""
+    return list(dict.fromkeys(sku.strip() for sku in re.split(r'[\n,;]+', text or '') if sku.strip()))
+
+
+def bulk_products(update):
+    """Produk yang dipilih filter `update` (ProductBulkUpdate)"""
+    products = Product.objects.filter(tenant_id=update.tenant_id)
+    if update.category_id:
+        products = products.filter(category_id=update.category_id)
+    skus = parse_skus(update.skus)
+    if skus:
+        products = products.filter(sku__in=skus)
+    return products
+
+
+def price_expression(update):
+    """Ekspresi SQL harga baru, atau None jika harga tidak diubah"""
+    if not update.price_mode and not update.rounding:
+        return None
+
+    price = F('price')
+    if update.price_mode == 'percent':
+        price = price * Value(float(1 + update.price_value / 100), output_field=FloatField())
+    elif update.price_mode == 'amount':
+        price = price + Value(int(update.price_value), output_field=BigIntegerField())
+
+    if update.price_mode == 'percent' or update.rounding:
+        step = update.rounding or 1
+        price = Cast(
+            Round(price / Value(float(step), output_field=FloatField())) * Value(step),
+            BigIntegerField(),
+        )
+    return Greatest(price, Value(0), output_field=BigIntegerField())
+
+
+def _changed_products(update):
+    """(queryset produk yang akan diubah, ekspresi harga baru)"""
+    products = bulk_products(update)
+    price = price_expression(update)
+    if price is None and update.is_active is not None:
+        # Hanya status yang diubah: produk yang statusnya sudah sesuai tidak disentuh
+        products = products.exclude(is_active=update.is_active)
+    return products, price
+
+
+def preview_bulk_update(update, limit=PREVIEW_LIMIT):
+    """
+    Hasil `update` tanpa menyimpan: dict berisi jumlah produk, jumlah yang
+    harganya berubah, total harga sebelum/sesudah, dan `limit` contoh produk.
+    """
+    products, price = _changed_products(update)
+    products = products.annotate(
+        new_price=price if price is not None else F('price'),
+        new_is_active=Value(update.is_active) if update.is_active is not None else F('is_active'),
+    )
+    totals = products.aggregate(
+        count=Count('pk'),
+        price_changed=Count('pk', filter=~Q(new_price=F('price'))),
+        price_before=Sum('price'),
+        price_after=Sum('new_price'),
+    )
+    totals['samples'] = list(
+        products
+        .order_by('name', 'id')
+        .values('id', 'sku', 'name', 'price', 'new_price', 'is_active', 'new_is_active')[:limit]
+    )
+    return totals
+
+
+def apply_bulk_update(update):
+    """
+    Jalankan `update` sebagai satu UPDATE dan simpan `update` sebagai catatan
+    audit dalam transaksi yang sama. Mengembalikan jumlah produk yang diubah.
+    """
+    products, price = _changed_products(update)
+    values = {'updated_at': timezone.now()}
+    if price is not None:
+        values['price'] = price
+    if update.is_active is not None:
+        values['is_active'] = update.is_active
+
+    with transaction.atomic():
+        status_changed = 0
+        if update.is_active is not None and price is not None:
+            status_changed = products.exclude(is_active=update.is_active).count()
+        update.affected = products.update(**values)
+        if update.is_active is not None and price is None:
+            # Tanpa perubahan harga, `products` hanya berisi produk yang statusnya berubah
+            status_changed = update.affected
+        update.save()
+        if update.is_active is not None and update.affected:
+            # Produk nonaktif tidak masuk daftar stok menipis
+            sync_low_stock(bulk_products(update).values_list('pk', flat=True))
+            add_products(update.tenant_id, active=status_changed if update.is_active else -status_changed)
+            # Produk nonaktif tidak ikut di endpoint stok
+            bump(stock_scope(update.tenant_id))
+        bump(catalog_scope(update.tenant_id))
+    return update.affected
@@ -1,5 +1,6 @@
 from django import forms
-from .models import ProductCategory, Product
+from .models import ProductCategory, Product, ProductBulkUpdate
+from .bulk import parse_skus
 
 class ProductCategoryForm(forms.ModelForm):
     class Meta:
@@ -19,16 +20,20 @@ class ProductForm(forms.ModelForm):
         label='Harga (Rp)',
         widget=forms.NumberInput(attrs={'class': 'form-control'})
     )
+    # Stok saat form dibuka; perubahan stok disimpan sebagai selisih terhadap nilai ini
+    original_qty = forms.IntegerField(required=False, widget=forms.HiddenInput)
     
     class Meta:
         model = Product
-        fields = ['category', 'sku', 'name', 'description', 'qty', 'price']
+        fields = ['category', 'sku', 'name', 'description', 'qty', 'reorder_level', 'price', 'photo']
         widgets = {
             'category': forms.Select(attrs={'class': 'form-control'}),
             'sku': forms.TextInput(attrs={'class': 'form-control'}),
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'qty': forms.NumberInput(attrs={'class': 'form-control'}),
+            'reorder_level': forms.NumberInput(attrs={'class': 'form-control', 'min': 0}),
+            'photo': forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
         }
         labels = {
             'category': 'Kategori',
@@ -36,7 +41,9 @@ class ProductForm(forms.ModelForm):
             'name': 'Nama Produk',
             'description': 'Deskripsi',
             'qty': 'Stok',
+            'reorder_level': 'Stok Minimum',
             'price': 'Harga (Rp)',
+            'photo': 'Foto Produk',
         }
     
     def __init__(self, *args, **kwargs):
@@ -45,6 +52,15 @@ class ProductForm(forms.ModelForm):
         
         if tenant:
             self.fields['category'].queryset = ProductCategory.objects.filter(tenant=tenant)
+        if self.instance.pk:
+            self.fields['original_qty'].initial = self.instance.qty
+    
+    def stock_delta(self):
+        """Perubahan stok yang dimasukkan user, relatif terhadap stok saat form dibuka"""
+        original = self.cleaned_data.get('original_qty')
+        if original is None:
+            original = self.initial.get('qty', 0)
+        return self.cleaned_data['qty'] - original
 
 class StockAdjustmentForm(forms.Form):
     ADJUSTMENT_TYPES = [
@@ -68,4 +84,94 @@ class StockAdjustmentForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Catatan (opsional)'}),
         label='Catatan'
-    )
\ No newline at end of file
+    )
+
+class ProductBulkUpdateForm(forms.Form):
+    ROUNDING_CHOICES = [
+        (0, 'Tidak dibulatkan'),
+        (100, 'Rp 100'),
+        (500, 'Rp 500'),
+        (1000, 'Rp 1.000'),
+    ]
+    STATUS_CHOICES = [
+        ('', 'Tidak diubah'),
+        ('activate', 'Aktifkan'),
+        ('deactivate', 'Nonaktifkan'),
+    ]
+
+    category = forms.ModelChoiceField(
+        queryset=ProductCategory.objects.none(),
+        required=False,
+        empty_label='Semua Kategori',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Kategori'
+    )
+    skus = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Satu SKU per baris (opsional)'}),
+        label='SKU'
+    )
+    price_mode = forms.ChoiceField(
+        choices=ProductBulkUpdate.PRICE_MODE_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Ubah Harga'
+    )
+    price_value = forms.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        required=False,
+        initial=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
+        label='Nilai',
+        help_text='Negatif untuk menurunkan harga'
+    )
+    rounding = forms.TypedChoiceField(
+        choices=ROUNDING_CHOICES,
+        coerce=int,
+        initial=0,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Pembulatan'
+    )
+    status = forms.ChoiceField(
+        choices=STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Status'
+    )
+
+    def __init__(self, *args, **kwargs):
+        tenant = kwargs.pop('tenant', None)
+        super().__init__(*args, **kwargs)
+
+        if tenant:
+            self.fields['category'].queryset = ProductCategory.objects.filter(tenant=tenant)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        price_mode = cleaned_data.get('price_mode')
+        price_value = cleaned_data.get('price_value') or 0
+
+        if price_mode == 'percent' and price_value <= -100:
+            self.add_error('price_value', 'Penurunan harga harus kurang dari 100%.')
+        if price_mode == 'amount' and price_value != int(price_value):
+            self.add_error('price_value', 'Nominal harus bilangan bulat.')
+        if not price_mode and not cleaned_data.get('rounding') and not cleaned_data.get('status'):
+            raise forms.ValidationError('Pilih minimal satu perubahan (harga, pembulatan, atau status).')
+
+        cleaned_data['price_value'] = price_value
+        return cleaned_data
+
+    def build(self, tenant, user):
+        """ProductBulkUpdate (belum disimpan) dari data form"""
+        status = self.cleaned_data['status']
+        return ProductBulkUpdate(
+            tenant=tenant,
+            category=self.cleaned_data['category'],
+            skus='\n'.join(parse_skus(self.cleaned_data['skus'])),
+            price_mode=self.cleaned_data['price_mode'],
+            price_value=self.cleaned_data['price_value'] if self.cleaned_data['price_mode'] else 0,
+            rounding=self.cleaned_data['rounding'],
+            is_active={'activate': True, 'deactivate': False}.get(status),
+            created_by=user,
+        )
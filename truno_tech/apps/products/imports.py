@@ -0,0 +1,349 @@
+"""
+Import / upsert katalog produk dari CSV atau XLSX.
+
+File dibaca baris demi baris (csv.reader / openpyxl read_only) dan diproses
+per chunk: kategori yang belum ada dibuat sekaligus, produk di-upsert pada
+kunci unik (tenant, sku) dengan satu `bulk_create(update_conflicts=True)`,
+dan perubahan stok dicatat ke ledger. Baris yang tidak valid dilewati dan
+dilaporkan beserta nomor barisnya.
+"""
+import csv
+import io
+import re
+
+from django.db import transaction
+from django.utils import timezone
+from apps.core.refcache import bump, catalog_scope, stock_scope
+from apps.tenants.counters import add_products
+from .models import ProductCategory, Product, StockMovement
+from .stock import apply_stock_deltas, sync_low_stock
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Nama kolom yang dikenali (huruf kecil) -> field
+COLUMN_ALIASES = {
+    'sku': 'sku', 'kode': 'sku',
+    'name': 'name', 'nama': 'name', 'nama produk': 'name',
+    'category': 'category', 'kategori': 'category',
+    'price': 'price', 'harga': 'price', 'harga (rp)': 'price',
+    'qty': 'qty', 'stok': 'qty', 'stock': 'qty',
+    'reorder_level': 'reorder_level', 'stok minimum': 'reorder_level',
+    'description': 'description', 'deskripsi': 'description',
+    'is_active': 'is_active', 'aktif': 'is_active',
+}
+# Kolom wajib -> nama yang ditampilkan di pesan error
+REQUIRED_COLUMNS = {'sku': 'sku', 'name': 'nama', 'category': 'kategori', 'price': 'harga'}
+
+THOUSANDS_RE = re.compile(r'\d{1,3}([.,]\d{3})+')
+TRUE_VALUES = {'1', 'true', 'ya', 'y', 'yes', 'aktif'}
+FALSE_VALUES = {'0', 'false', 'tidak', 'n', 'no', 'nonaktif'}
+
+
+class ImportFileError(Exception):
+    """File import tidak bisa dibaca (format atau header salah)"""
+
+
+def read_rows(file, filename):
+    """Generator baris (list nilai) dari file CSV / XLSX, termasuk header"""
+    if filename.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportFileError('Import XLSX membutuhkan paket openpyxl.')
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except Exception as e:
+            raise ImportFileError(f'File XLSX tidak valid: {str(e)}')
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    elif filename.lower().endswith('.csv'):
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            sample = text.read(4096)
+        except UnicodeDecodeError:
+            raise ImportFileError('File CSV harus ber-encoding UTF-8.')
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        text.seek(0)
+        try:
+            yield from csv.reader(text, dialect)
+        except UnicodeDecodeError:
+            raise ImportFileError('File CSV harus ber-encoding UTF-8.')
+    else:
+        raise ImportFileError('Format file harus .csv atau .xlsx.')
+
+
+def _columns(header):
+    columns = {}
+    for index, title in enumerate(header or []):
+        field = COLUMN_ALIASES.get(str(title or '').strip().lower())
+        if field and field not in columns:
+            columns[field] = index
+    missing = [label for name, label in REQUIRED_COLUMNS.items() if name not in columns]
+    if missing:
+        raise ImportFileError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+    return columns
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _integer(value, label):
+    if isinstance(value, bool):
+        raise ValueError(f'{label} harus berupa angka')
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f'{label} harus bilangan bulat')
+        number = int(value)
+    else:
+        text = _text(value).replace('Rp', '').replace(' ', '')
+        if THOUSANDS_RE.fullmatch(text):
+            text = re.sub(r'[.,]', '', text)
+        try:
+            number = int(text)
+        except ValueError:
+            try:
+                number = float(text)
+            except ValueError:
+                raise ValueError(f'{label} harus berupa angka')
+            if not number.is_integer():
+                raise ValueError(f'{label} harus bilangan bulat')
+            number = int(number)
+    if number < 0:
+        raise ValueError(f'{label} tidak boleh negatif')
+    return number
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = _text(value).lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError('Aktif harus ya/tidak')
+
+
+def _parse_row(row, columns):
+    def cell(field):
+        index = columns.get(field)
+        return row[index] if index is not None and index < len(row) else None
+
+    data = {
+        'sku': _text(cell('sku')),
+        'name': _text(cell('name')),
+        'category': _text(cell('category')),
+    }
+    if not data['sku']:
+        raise ValueError('SKU wajib diisi')
+    if len(data['sku']) > Product._meta.get_field('sku').max_length:
+        raise ValueError('SKU terlalu panjang')
+    if not data['name']:
+        raise ValueError('Nama produk wajib diisi')
+    if len(data['name']) > Product._meta.get_field('name').max_length:
+        raise ValueError('Nama produk terlalu panjang')
+    if not data['category']:
+        raise ValueError('Kategori wajib diisi')
+    if len(data['category']) > ProductCategory._meta.get_field('name').max_length:
+        raise ValueError('Nama kategori terlalu panjang')
+
+    data['price'] = _integer(cell('price'), 'Harga')
+    if 'qty' in columns:
+        data['qty'] = _integer(cell('qty'), 'Stok') if _text(cell('qty')) else 0
+    if 'reorder_level' in columns and _text(cell('reorder_level')):
+        data['reorder_level'] = _integer(cell('reorder_level'), 'Stok minimum')
+    if 'description' in columns:
+        data['description'] = _text(cell('description'))
+    if 'is_active' in columns:
+        data['is_active'] = _boolean(cell('is_active')) if _text(cell('is_active')) else True
+    return data
+
+
+def import_products(tenant, user, rows, chunk_size=CHUNK_SIZE):
+    """
+    Upsert produk `tenant` dari `rows` (baris pertama adalah header).
+
+    Produk yang SKU-nya sudah ada diperbarui; kolom opsional (stok, stok
+    minimum, deskripsi, aktif) hanya diubah jika ada di file. Setiap chunk disimpan
+    dalam transaksinya sendiri. Mengembalikan dict berisi jumlah produk
+    dibuat/diperbarui, kategori baru, dan daftar error per baris. Jika file
+    rusak di tengah jalan (mis. encoding), baris yang sudah terbaca tetap
+    disimpan dan pesannya ada di 'file_error'.
+    """
+    rows = iter(rows)
+    columns = _columns(next(rows, None))
+    report = {'created': 0, 'updated': 0, 'categories': 0, 'errors': [], 'error_count': 0, 'file_error': None}
+    importer = _ChunkImporter(tenant, user, columns, report)
+
+    chunk = []
+    line = 1
+    try:
+        # Nomor baris mengikuti spreadsheet: header adalah baris 1
+        for line, row in enumerate(rows, start=2):
+            if not any(_text(value) for value in row):
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= chunk_size:
+                importer.save(chunk)
+                chunk = []
+    except ImportFileError as e:
+        # Chunk sebelumnya sudah tersimpan: laporkan sampai mana file terbaca
+        report['file_error'] = f'{e} Import berhenti setelah baris {line}.'
+    if chunk:
+        importer.save(chunk)
+    return report
+
+
+class _ChunkImporter:
+    def __init__(self, tenant, user, columns, report):
+        self.tenant = tenant
+        self.user = user
+        self.columns = columns
+        self.report = report
+        self.seen = {}
+        self.categories = {}
+        self.update_fields = ['name', 'category', 'price', 'updated_at'] + [
+            name for name in ('description', 'is_active', 'reorder_level') if name in columns
+        ]
+
+    def error(self, line, sku, message):
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': line, 'sku': sku, 'error': message})
+
+    def save(self, chunk):
+        entries = {}
+        for line, row in chunk:
+            try:
+                data = _parse_row(row, self.columns)
+            except ValueError as e:
+                index = self.columns['sku']
+                self.error(line, _text(row[index]) if index < len(row) else '', str(e))
+                continue
+            if data['sku'] in self.seen:
+                self.error(line, data['sku'], f"SKU sudah ada di baris {self.seen[data['sku']]}")
+                continue
+            self.seen[data['sku']] = line
+            entries[data['sku']] = data
+
+        if not entries:
+            return
+
+        with transaction.atomic():
+            self._resolve_categories({data['category'] for data in entries.values()})
+
+            existing, was_active = {}, {}
+            for sku, qty, is_active in (
+                Product.objects
+                .filter(tenant=self.tenant, sku__in=list(entries))
+                .values_list('sku', 'qty', 'is_active')
+            ):
+                existing[sku] = qty
+                was_active[sku] = is_active
+            now = timezone.now()
+            products = [
+                Product(
+                    tenant=self.tenant,
+                    category=self.categories[data['category']],
+                    sku=sku,
+                    name=data['name'],
+                    description=data.get('description', ''),
+                    qty=data.get('qty', 0),
+                    price=data['price'],
+                    is_active=data.get('is_active', True),
+                    reorder_level=data.get('reorder_level', Product._meta.get_field('reorder_level').default),
+                    created_by=self.user,
+                    created_at=now,
+                    updated_at=now,
+                )
+                for sku, data in entries.items()
+            ]
+            # Stok produk lama tidak ikut di-upsert; selisihnya diterapkan lewat ledger
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['tenant', 'sku'],
+                update_fields=self.update_fields,
+            )
+
+            ids = dict(
+                Product.objects
+                .filter(tenant=self.tenant, sku__in=list(entries))
+                .values_list('sku', 'id')
+            )
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    product_id=ids[sku], delta=data['qty'], reason='initial',
+                    created_by=self.user, note='import'
+                )
+                for sku, data in entries.items()
+                if sku not in existing and data.get('qty')
+            ])
+            if 'qty' in self.columns:
+                self._set_stock(entries, existing, ids)
+            sync_low_stock(ids.values())
+            self._count_products(entries, was_active)
+            bump(catalog_scope(self.tenant.id), stock_scope(self.tenant.id))
+
+        self.report['created'] += len(entries) - len(existing)
+        self.report['updated'] += len(existing)
+
+    def _count_products(self, entries, was_active):
+        """Selisih penghitung produk tenant: produk baru, dan produk lama yang status aktifnya diubah"""
+        total = active = 0
+        for sku, data in entries.items():
+            is_active = data.get('is_active', True)
+            if sku not in was_active:
+                total += 1
+                active += 1 if is_active else 0
+            elif 'is_active' in self.update_fields and is_active != was_active[sku]:
+                active += 1 if is_active else -1
+        add_products(self.tenant.id, total, active)
+
+    def _set_stock(self, entries, existing, ids):
+        skus = {ids[sku]: sku for sku in entries if sku in existing}
+        deltas = {
+            product_id: entries[sku]['qty'] - existing[sku]
+            for product_id, sku in skus.items()
+        }
+        while deltas:
+            failed = apply_stock_deltas(deltas, reason='set', created_by=self.user, note='import')
+            if not failed:
+                break
+            # Stok terjual di tengah import sehingga akan menjadi negatif
+            for product_id in failed:
+                sku = skus[product_id]
+                self.error(self.seen[sku], sku, 'Stok berubah saat import, stok tidak diubah')
+                deltas.pop(product_id, None)
+
+    def _resolve_categories(self, names):
+        missing = names - set(self.categories)
+        if not missing:
+            return
+        found = {
+            category.name: category
+            for category in ProductCategory.objects.filter(tenant=self.tenant, name__in=list(missing))
+        }
+        new_names = missing - set(found)
+        if new_names:
+            ProductCategory.objects.bulk_create(
+                [ProductCategory(tenant=self.tenant, name=name, created_by=self.user) for name in new_names],
+                ignore_conflicts=True,
+            )
+            found.update({
+                category.name: category
+                for category in ProductCategory.objects.filter(tenant=self.tenant, name__in=list(new_names))
+            })
+            self.report['categories'] += len(new_names)
+        self.categories.update(found)
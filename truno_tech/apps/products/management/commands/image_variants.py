@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.images import cleanup_images, image_digest, render_variants, variants_ready
+from apps.products.models import Product
+from apps.tenants.models import Tenant
+
+# (model, field, direktori upload relatif ke MEDIA_ROOT)
+IMAGE_FIELDS = [
+    (Product, 'photo', 'products/photos'),
+    (Tenant, 'logo', 'tenants/logos'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Render varian thumbnail yang belum ada untuk semua logo tenant dan foto produk, '
+        'dan dengan --cleanup hapus file yang tidak dipakai lagi. Jalankan berkala lewat '
+        'cron (mis. tiap menit); sebelum varian ada, halaman memakai gambar asli.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Default: settings.IMAGE_WORKERS')
+        parser.add_argument('--cleanup', action='store_true', help='Hapus gambar asli dan varian yang tidak dipakai')
+        parser.add_argument('--dry-run', action='store_true', help='Dengan --cleanup: tampilkan saja')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field, _ in IMAGE_FIELDS:
+            names.update(
+                model.objects.exclude(**{field: ''}).values_list(field, flat=True).iterator()
+            )
+
+        pending = {}
+        for name in names:
+            digest = image_digest(name)
+            if digest and digest not in pending and not variants_ready(digest):
+                pending[digest] = str(Path(settings.MEDIA_ROOT) / name)
+
+        failed = 0
+        if pending:
+            media_root = str(settings.MEDIA_ROOT)
+            with ProcessPoolExecutor(max_workers=options['workers'] or settings.IMAGE_WORKERS) as pool:
+                futures = {
+                    pool.submit(render_variants, source, digest, media_root): source
+                    for digest, source in pending.items()
+                }
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Satu file rusak tidak menghentikan render file lain; dicoba lagi di run berikutnya
+                        failed += 1
+                        self.stderr.write(f'Gagal merender {futures[future]}: {e}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(pending) - failed} gambar dirender dari {len(names)} gambar, {failed} gagal.'
+        ))
+
+        if options['cleanup']:
+            stale = cleanup_images(names, [directory for _, _, directory in IMAGE_FIELDS], dry_run=options['dry_run'])
+            for path in stale:
+                self.stdout.write(str(path))
+            action = 'akan dihapus' if options['dry_run'] else 'dihapus'
+            self.stdout.write(self.style.SUCCESS(f'{len(stale)} file tidak dipakai {action}.'))
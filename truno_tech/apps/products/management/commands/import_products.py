@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tenants.models import Tenant
+from apps.products.imports import read_rows, import_products, ImportFileError, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Import / upsert katalog produk satu tenant dari file CSV atau XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--tenant', type=int, required=True)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.select_related('owner').get(id=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant']} tidak ditemukan.")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_products(
+                    tenant, tenant.owner, read_rows(file, options['path']), chunk_size=options['chunk_size']
+                )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"Baris {error['row']} ({error['sku'] or '-'}): {error['error']}")
+        if report['file_error']:
+            self.stderr.write(self.style.ERROR(report['file_error']))
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} produk baru, {report['updated']} diperbarui, "
+            f"{report['categories']} kategori baru, {report['error_count']} baris gagal "
+            f"dalam {time.perf_counter() - started:.1f} detik."
+        ))
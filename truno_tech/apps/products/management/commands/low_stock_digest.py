@@ -0,0 +1,72 @@
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.products.models import Product, LowStockItem
+from apps.products.stock import sync_low_stock
+from apps.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Kirim ringkasan produk yang baru masuk daftar stok menipis ke pemilik tenant '
+        '(email jika ada, selalu ditulis ke stdout). Jalankan berkala lewat cron; '
+        'produk yang sudah dilaporkan tidak dikirim lagi sampai stoknya pulih.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--dry-run', action='store_true', help='Tampilkan saja, jangan kirim atau tandai')
+        parser.add_argument(
+            '--resync', action='store_true',
+            help='Cocokkan ulang daftar dengan stok semua produk sebelum mengirim'
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True).select_related('owner')
+        if options['tenant']:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        if options['resync'] and not options['dry_run']:
+            product_ids = Product.objects.filter(tenant__in=tenants).values_list('pk', flat=True)
+            sync_low_stock(product_ids.iterator())
+
+        pending = (
+            LowStockItem.objects
+            .filter(tenant__in=tenants, notified_at__isnull=True)
+            .select_related('product')
+            .order_by('tenant_id', 'product__qty', 'product__name')
+        )
+        by_tenant = {}
+        for item in pending:
+            by_tenant.setdefault(item.tenant_id, []).append(item)
+
+        sent = 0
+        for tenant in tenants:
+            items = by_tenant.get(tenant.pk)
+            if not items:
+                continue
+
+            lines = [
+                f'- {item.product.name} ({item.product.sku}): stok {item.product.qty}, '
+                f'minimum {item.product.reorder_level}'
+                for item in items
+            ]
+            subject = f'[{tenant.name}] {len(items)} produk stok menipis'
+            body = '\n'.join(['Produk berikut perlu segera diisi ulang:', ''] + lines)
+            self.stdout.write(f'{subject}\n{body}\n')
+            if options['dry_run']:
+                continue
+
+            if tenant.owner.email:
+                try:
+                    send_mail(subject, body, None, [tenant.owner.email])
+                except Exception as e:
+                    # Belum ditandai, sehingga dicoba lagi pada run berikutnya
+                    self.stderr.write(f'Gagal mengirim email ke {tenant.owner.email}: {str(e)}')
+                    continue
+
+            LowStockItem.objects.filter(pk__in=[item.pk for item in items]).update(notified_at=timezone.now())
+            sent += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Ringkasan stok menipis untuk {sent} tenant.'))
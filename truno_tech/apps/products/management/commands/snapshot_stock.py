@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.models import Product
+from apps.products.stock import take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Simpan snapshot stok semua produk. Jalankan berkala (mis. harian lewat cron) '
+        'agar stok historis cukup dihitung dari snapshot terdekat.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['tenant']:
+            products = products.filter(tenant_id=options['tenant'])
+
+        taken_at, count = take_snapshots(products, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} snapshot stok pada {taken_at:%Y-%m-%d %H:%M:%S}.'))
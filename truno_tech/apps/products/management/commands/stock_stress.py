@@ -0,0 +1,124 @@
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, OperationalError
+
+from apps.tenants.models import Tenant
+from apps.products.models import Product, ProductCategory
+from apps.products.stock import reduce_stock
+
+
+def _legacy_reduce(product_id, quantity):
+    """Pola lama: baca, cek di Python, simpan seluruh baris"""
+    product = Product.objects.get(pk=product_id)
+    if product.qty >= quantity:
+        product.qty -= quantity
+        product.save()
+        return True
+    return False
+
+
+def _hammer(args):
+    product_id, attempts, quantity, legacy = args
+    sold = short = errors = 0
+    try:
+        for _ in range(attempts):
+            try:
+                if legacy:
+                    ok = _legacy_reduce(product_id, quantity)
+                else:
+                    ok = reduce_stock(product_id, quantity)
+            except OperationalError:
+                # SQLite: "database is locked" setelah timeout
+                errors += 1
+                continue
+            if ok:
+                sold += 1
+            else:
+                short += 1
+    finally:
+        connection.close()
+    return sold, short, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress test pengurangan stok: N worker menjual satu SKU secara bersamaan, '
+        'lalu memverifikasi throughput dan tidak ada oversell.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=200, help='Jumlah penjualan per worker')
+        parser.add_argument('--stock', type=int, default=1000, help='Stok awal produk uji')
+        parser.add_argument('--qty', type=int, default=1, help='Jumlah per penjualan')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Gunakan pola lama baca-cek-simpan sebagai pembanding'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('Stress test membutuhkan database file, bukan in-memory.')
+
+        suffix = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(f'stock-stress-{suffix}')
+        try:
+            tenant = Tenant.objects.create(owner=owner, name=f'Stock Stress {suffix}', address='-', phone='-')
+            category = ProductCategory.objects.create(tenant=tenant, name='Stress', created_by=owner)
+            product = Product.objects.create(
+                tenant=tenant,
+                category=category,
+                sku=f'STRESS-{suffix}',
+                name='Stress SKU',
+                qty=options['stock'],
+                price=1000,
+                created_by=owner
+            )
+            self._run(product, options)
+        finally:
+            owner.delete()
+
+    def _run(self, product, options):
+        workers = options['workers']
+        job = (product.pk, options['attempts'], options['qty'], options['legacy'])
+
+        started = time.perf_counter()
+        if options['mode'] == 'process':
+            # Koneksi tidak boleh diwariskan ke proses anak
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                results = pool.map(_hammer, [job] * workers)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_hammer, [job] * workers))
+        elapsed = time.perf_counter() - started
+
+        sold = sum(r[0] for r in results)
+        short = sum(r[1] for r in results)
+        errors = sum(r[2] for r in results)
+        attempts = sold + short + errors
+
+        product.refresh_from_db(fields=['qty'])
+        expected = options['stock'] - sold * options['qty']
+        oversold = max(sold * options['qty'] - options['stock'], 0)
+
+        self.stdout.write(f"Mode            : {options['mode']} x {workers}{' (legacy)' if options['legacy'] else ''}")
+        self.stdout.write(f'Percobaan       : {attempts} dalam {elapsed:.3f} detik ({attempts / elapsed:,.0f} op/detik)')
+        self.stdout.write(f'Terjual         : {sold}')
+        self.stdout.write(f'Stok habis      : {short}')
+        self.stdout.write(f'Error database  : {errors}')
+        self.stdout.write(f'Stok akhir      : {product.qty} (seharusnya {expected})')
+
+        if product.qty == expected and product.qty >= 0 and oversold == 0:
+            self.stdout.write(self.style.SUCCESS('OK: tidak ada oversell maupun lost update.'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'GAGAL: oversell {oversold} unit, selisih stok {product.qty - expected}.'
+            ))
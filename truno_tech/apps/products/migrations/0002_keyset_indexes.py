@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'name', 'id'], name='products_tenant_name_idx'),
+        ),
+    ]
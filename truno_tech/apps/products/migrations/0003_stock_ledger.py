@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def initial_snapshots(apps, schema_editor):
+    # Stok saat ledger mulai dipakai menjadi titik awal riwayat
+    Product = apps.get_model('products', 'Product')
+    StockSnapshot = apps.get_model('products', 'StockSnapshot')
+    now = django.utils.timezone.now()
+    StockSnapshot.objects.bulk_create(
+        (StockSnapshot(product_id=pk, qty=qty, taken_at=now)
+         for pk, qty in Product.objects.values_list('pk', 'qty').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_customer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qty', models.IntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product')),
+            ],
+            options={
+                'db_table': 'stock_snapshots',
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('initial', 'Stok Awal'), ('sale', 'Penjualan'), ('add', 'Tambah Stok'), ('reduce', 'Kurangi Stok'), ('set', 'Atur Stok'), ('edit', 'Edit Produk')], max_length=20)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='orders.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product')),
+            ],
+            options={
+                'db_table': 'stock_movements',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'taken_at'), name='stock_snapshot_product_time_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'created_at'], name='stock_mov_product_time_idx'),
+        ),
+        migrations.RunPython(initial_snapshots, migrations.RunPython.noop),
+    ]
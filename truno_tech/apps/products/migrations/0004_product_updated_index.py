@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'updated_at'], name='products_tenant_updated_idx'),
+        ),
+    ]
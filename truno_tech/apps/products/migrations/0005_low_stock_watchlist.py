@@ -0,0 +1,90 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:41
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# Trigger FTS order (orders.0005) membaca tabel products; SQLite menolak
+# membangun ulang tabel products untuk AddField selama trigger itu ada
+ORDER_ITEM_TRIGGERS = [
+    """
+    CREATE TRIGGER order_items_fts_ai AFTER INSERT ON order_items BEGIN
+        UPDATE orders_fts
+        SET product_names = product_names || ' ' || (SELECT name FROM products WHERE id = new.product_id)
+        WHERE rowid = new.order_id;
+    END
+    """,
+    """
+    CREATE TRIGGER order_items_fts_ad AFTER DELETE ON order_items BEGIN
+        UPDATE orders_fts
+        SET product_names = coalesce((
+            SELECT group_concat(p.name, ' ')
+            FROM order_items i JOIN products p ON p.id = i.product_id
+            WHERE i.order_id = old.order_id
+        ), '')
+        WHERE rowid = old.order_id;
+    END
+    """,
+]
+
+
+def drop_order_item_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TRIGGER IF EXISTS order_items_fts_ad')
+    schema_editor.execute('DROP TRIGGER IF EXISTS order_items_fts_ai')
+
+
+def create_order_item_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in ORDER_ITEM_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def initial_watchlist(apps, schema_editor):
+    # Produk aktif yang saat ini sudah di bawah batas langsung masuk daftar
+    Product = apps.get_model('products', 'Product')
+    LowStockItem = apps.get_model('products', 'LowStockItem')
+    now = django.utils.timezone.now()
+    LowStockItem.objects.bulk_create(
+        (LowStockItem(product_id=pk, tenant_id=tenant_id, since=now)
+         for pk, tenant_id in Product.objects.filter(
+             is_active=True, qty__lte=models.F('reorder_level')
+         ).values_list('pk', 'tenant_id').iterator()),
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('products', '0004_product_updated_index'),
+        ('orders', '0005_order_search_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_order_item_triggers, create_order_item_triggers),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.IntegerField(default=5, help_text='Produk masuk daftar stok menipis jika stok <= nilai ini', validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(create_order_item_triggers, drop_order_item_triggers),
+        migrations.CreateModel(
+            name='LowStockItem',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock', serialize=False, to='products.product')),
+                ('since', models.DateTimeField(default=django.utils.timezone.now)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_items', to='tenants.tenant')),
+            ],
+            options={
+                'db_table': 'low_stock_items',
+                'indexes': [models.Index(fields=['tenant', 'notified_at'], name='low_stock_tenant_notified_idx')],
+            },
+        ),
+        migrations.RunPython(initial_watchlist, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tenants', '0001_initial'),
+        ('products', '0005_low_stock_watchlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBulkUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skus', models.TextField(blank=True, help_text='Daftar SKU yang difilter, satu per baris')),
+                ('price_mode', models.CharField(blank=True, choices=[('', 'Harga Tetap'), ('percent', 'Persentase (%)'), ('amount', 'Nominal (Rp)')], max_length=10)),
+                ('price_value', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('rounding', models.IntegerField(default=0, help_text='Harga baru dibulatkan ke kelipatan nilai ini (0 = tidak)')),
+                ('is_active', models.BooleanField(blank=True, help_text='Status baru, kosong = tidak diubah', null=True)),
+                ('affected', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productcategory')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_bulk_updates', to='tenants.tenant')),
+            ],
+            options={
+                'db_table': 'product_bulk_updates',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
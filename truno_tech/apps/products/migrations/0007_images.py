@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:47
+
+import apps.core.images
+from django.db import migrations, models
+
+
+# Trigger FTS order (orders.0005) membaca tabel products; SQLite menolak
+# membangun ulang tabel products untuk AddField selama trigger itu ada
+ORDER_ITEM_TRIGGERS = [
+    """
+    CREATE TRIGGER order_items_fts_ai AFTER INSERT ON order_items BEGIN
+        UPDATE orders_fts
+        SET product_names = product_names || ' ' || (SELECT name FROM products WHERE id = new.product_id)
+        WHERE rowid = new.order_id;
+    END
+    """,
+    """
+    CREATE TRIGGER order_items_fts_ad AFTER DELETE ON order_items BEGIN
+        UPDATE orders_fts
+        SET product_names = coalesce((
+            SELECT group_concat(p.name, ' ')
+            FROM order_items i JOIN products p ON p.id = i.product_id
+            WHERE i.order_id = old.order_id
+        ), '')
+        WHERE rowid = old.order_id;
+    END
+    """,
+]
+
+
+def drop_order_item_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TRIGGER IF EXISTS order_items_fts_ad')
+    schema_editor.execute('DROP TRIGGER IF EXISTS order_items_fts_ai')
+
+
+def create_order_item_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in ORDER_ITEM_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_bulk_update'),
+        ('orders', '0005_order_search_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_order_item_triggers, create_order_item_triggers),
+        migrations.AddField(
+            model_name='product',
+            name='photo',
+            field=models.ImageField(blank=True, upload_to=apps.core.images.HashedUploadTo('products/photos', 'photo'), validators=[apps.core.images.validate_image_size]),
+        ),
+        migrations.RunPython(create_order_item_triggers, drop_order_item_triggers),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator
+from django.utils import timezone
+from apps.core.images import HashedUploadTo, validate_image_size, thumbnail
 from apps.tenants.models import Tenant
 
 class ProductCategory(models.Model):
@@ -25,7 +28,11 @@ class Product(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     qty = models.IntegerField(default=0)
+    reorder_level = models.IntegerField(default=5, validators=[MinValueValidator(0)], help_text="Produk masuk daftar stok menipis jika stok <= nilai ini")
     price = models.BigIntegerField()  # Price in cents/rupiah
+    photo = models.ImageField(
+        upload_to=HashedUploadTo('products/photos', 'photo'), blank=True, validators=[validate_image_size]
+    )
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -34,25 +41,136 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.name} ({self.sku})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status aktif saat dimuat: penghitung tenant hanya berubah jika status ini berubah
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
+    
     @property
     def price_display(self):
         """Display price in rupiah format"""
         return f"Rp {self.price:,}"
+
+    @property
+    def photo_thumbnail(self):
+        return thumbnail(self.photo)
     
-    def reduce_stock(self, quantity):
-        """Reduce stock when order is made"""
-        if self.qty >= quantity:
-            self.qty -= quantity
-            self.save()
-            return True
-        return False
-    
-    def add_stock(self, quantity):
+    def reduce_stock(self, quantity, **movement):
+        """Reduce stock when order is made (atomic, never oversells)"""
+        from .stock import reduce_stock
+
+        reduced = reduce_stock(self.pk, quantity, **movement)
+        self.refresh_from_db(fields=['qty', 'updated_at'])
+        return reduced
+
+    def add_stock(self, quantity, **movement):
         """Add stock"""
-        self.qty += quantity
-        self.save()
+        from .stock import add_stock
+
+        add_stock(self.pk, quantity, **movement)
+        self.refresh_from_db(fields=['qty', 'updated_at'])
+
+    def set_stock(self, quantity, **movement):
+        """Set stock to an absolute value"""
+        from .stock import set_stock
+
+        set_stock(self.pk, quantity, **movement)
+        self.refresh_from_db(fields=['qty', 'updated_at'])
     
     class Meta:
         db_table = 'products'
         unique_together = ['tenant', 'sku']
-        ordering = ['name']
\ No newline at end of file
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name', 'id'], name='products_tenant_name_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='products_tenant_updated_idx'),
+        ]
+
+class StockMovement(models.Model):
+    """Buku besar stok: satu baris per perubahan qty produk (append-only)"""
+    REASON_CHOICES = (
+        ('initial', 'Stok Awal'),
+        ('sale', 'Penjualan'),
+        ('add', 'Tambah Stok'),
+        ('reduce', 'Kurangi Stok'),
+        ('set', 'Atur Stok'),
+        ('edit', 'Edit Produk'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    note = models.CharField(max_length=200, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.product_id} {self.delta:+d} ({self.get_reason_display()})"
+
+    class Meta:
+        db_table = 'stock_movements'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stock_mov_product_time_idx'),
+        ]
+
+class StockSnapshot(models.Model):
+    """Stok produk pada satu titik waktu, titik awal untuk membaca stok historis"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    qty = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product_id} = {self.qty} @ {self.taken_at}"
+
+    class Meta:
+        db_table = 'stock_snapshots'
+        ordering = ['-taken_at']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='stock_snapshot_product_time_uniq'),
+        ]
+
+class LowStockItem(models.Model):
+    """Produk aktif yang stoknya <= reorder_level; diperbarui saat stok melewati batas"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='low_stock')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='low_stock_items')
+    since = models.DateTimeField(default=timezone.now)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.product_id} menipis sejak {self.since}"
+
+    class Meta:
+        db_table = 'low_stock_items'
+        indexes = [
+            models.Index(fields=['tenant', 'notified_at'], name='low_stock_tenant_notified_idx'),
+        ]
+
+class ProductBulkUpdate(models.Model):
+    """Catatan audit satu perubahan massal harga/status produk"""
+    PRICE_MODE_CHOICES = (
+        ('', 'Harga Tetap'),
+        ('percent', 'Persentase (%)'),
+        ('amount', 'Nominal (Rp)'),
+    )
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='product_bulk_updates')
+    category = models.ForeignKey(ProductCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    skus = models.TextField(blank=True, help_text="Daftar SKU yang difilter, satu per baris")
+    price_mode = models.CharField(max_length=10, choices=PRICE_MODE_CHOICES, blank=True)
+    price_value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    rounding = models.IntegerField(default=0, help_text="Harga baru dibulatkan ke kelipatan nilai ini (0 = tidak)")
+    is_active = models.BooleanField(null=True, blank=True, help_text="Status baru, kosong = tidak diubah")
+    affected = models.IntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.tenant_id} {self.affected} produk @ {self.created_at}"
+
+    class Meta:
+        db_table = 'product_bulk_updates'
+        ordering = ['-created_at']
@@ -0,0 +1,284 @@
+"""
+Index pencarian produk in-process untuk kasir (ketik nama / scan SKU).
+
+Per tenant disimpan map SKU -> produk, daftar SKU dan nama terurut untuk
+pencarian prefix, posting list per kata nama (terurut menurut nama), dan
+index trigram atas kosakata untuk salah ketik. Karena semua daftar sudah
+terurut, pencarian berhenti begitu `limit` hasil terkumpul.
+
+Index dibangun saat pertama dipakai dan diperbarui bertahap: jika versi
+katalog atau stok tenant (apps.core.refcache) berubah, hanya produk dengan
+updated_at terbaru yang dibaca ulang.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from datetime import timedelta
+
+from django.utils import timezone
+from apps.core.refcache import get_versions, catalog_scope, stock_scope
+from .models import Product
+
+MAX_TENANTS = 64
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MIN_TERM_LENGTH = 2
+MAX_PREFIX_TOKENS = 100
+MIN_TRIGRAM_SCORE = 0.5
+# Refresh berikutnya membaca ulang perubahan sejak sedikit sebelum refresh
+# terakhir, agar transaksi yang commit terlambat tetap terbaca
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+FIELDS = ('id', 'name', 'sku', 'price', 'qty', 'is_active', 'updated_at')
+RESULT_FIELDS = ('id', 'name', 'sku', 'price', 'qty')
+
+
+def _tokens(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _trigrams(token):
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _discard(sorted_list, item):
+    position = bisect_left(sorted_list, item)
+    if position < len(sorted_list) and sorted_list[position] == item:
+        del sorted_list[position]
+
+
+def _prefix_range(sorted_list, prefix, key=None):
+    """Elemen `sorted_list` berawalan `prefix`, sesuai urutan (tanpa menyalin list)"""
+    position = bisect_left(sorted_list, key or prefix)
+    while position < len(sorted_list):
+        item = sorted_list[position]
+        if not (item[0] if key else item).startswith(prefix):
+            break
+        yield item
+        position += 1
+
+
+class ProductIndex:
+    """Index pencarian produk satu tenant"""
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+        self.lock = threading.Lock()
+        self.version = None
+        self.watermark = None
+        self._reset()
+
+    def _reset(self):
+        self.products = {}
+        self.by_sku = {}
+        self.skus = []
+        self.names = []
+        self.postings = {}
+        self.vocabulary = []
+        self.vocabulary_dirty = False
+        self.token_trigrams = {}
+
+    def ensure_fresh(self):
+        versions = get_versions(catalog_scope(self.tenant_id), stock_scope(self.tenant_id))
+        version = tuple(versions.values())
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            if self.watermark is None or not self._refresh():
+                self._rebuild()
+            self.version = version
+
+    def _rows(self, queryset):
+        return queryset.filter(tenant_id=self.tenant_id).values_list(*FIELDS)
+
+    def _rebuild(self):
+        started = timezone.now()
+        self._reset()
+        for row in self._rows(Product.objects.all()).iterator(chunk_size=5000):
+            self._add(row, bulk=True)
+        self.skus.sort()
+        self.names.sort()
+        for posting in self.postings.values():
+            posting.sort()
+        self.vocabulary = sorted(self.postings)
+        self.vocabulary_dirty = False
+        self.watermark = started - REFRESH_OVERLAP
+
+    def _refresh(self):
+        """Baca ulang produk yang berubah; False jika perlu rebuild (ada yang dihapus)"""
+        started = timezone.now()
+        for row in self._rows(Product.objects.filter(updated_at__gte=self.watermark)):
+            current = self.products.get(row[0])
+            if current is not None:
+                if current['updated_at'] == row[-1]:
+                    continue
+                self._remove(row[0])
+            self._add(row)
+        if Product.objects.filter(tenant_id=self.tenant_id).count() != len(self.products):
+            return False
+        if self.vocabulary_dirty:
+            self.vocabulary = sorted(self.postings)
+            self.vocabulary_dirty = False
+        self.watermark = started - REFRESH_OVERLAP
+        return True
+
+    def _add(self, row, bulk=False):
+        product_id, name, sku, price, qty, is_active, updated_at = row
+        name_key = (name.lower(), product_id)
+        sku_key = (sku.lower(), product_id)
+        words = tuple(dict.fromkeys(_tokens(name) + _tokens(sku)))
+        self.products[product_id] = {
+            'id': product_id, 'name': name, 'sku': sku, 'price': price, 'qty': qty,
+            'is_active': is_active, 'updated_at': updated_at,
+            'name_key': name_key, 'sku_key': sku_key, 'words': words,
+        }
+        self.by_sku[sku_key[0]] = product_id
+        add = list.append if bulk else insort
+        add(self.skus, sku_key)
+        add(self.names, name_key)
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = []
+                self.vocabulary_dirty = True
+                for trigram in _trigrams(word):
+                    self.token_trigrams.setdefault(trigram, set()).add(word)
+            add(posting, name_key)
+
+    def _remove(self, product_id):
+        # Kata yang posting-nya kosong dibiarkan di kosakata; tidak mengubah hasil
+        product = self.products.pop(product_id)
+        if self.by_sku.get(product['sku_key'][0]) == product_id:
+            del self.by_sku[product['sku_key'][0]]
+        _discard(self.skus, product['sku_key'])
+        _discard(self.names, product['name_key'])
+        for word in product['words']:
+            _discard(self.postings[word], product['name_key'])
+
+    def _similar_tokens(self, term):
+        """Kata di kosakata yang mirip `term` (salah ketik), berdasarkan trigram"""
+        term_trigrams = _trigrams(term)
+        hits = Counter()
+        for trigram in term_trigrams:
+            hits.update(self.token_trigrams.get(trigram, ()))
+        # Koefisien Dice atas himpunan trigram
+        return {
+            token for token, count in hits.items()
+            if 2 * count / (len(term_trigrams) + len(token) + 1) >= MIN_TRIGRAM_SCORE
+        }
+
+    def _term_tokens(self, term):
+        """(kata yang cocok untuk `term`, terpotong di MAX_PREFIX_TOKENS, hasil koreksi salah ketik)"""
+        tokens = []
+        for token in _prefix_range(self.vocabulary, term):
+            if len(tokens) == MAX_PREFIX_TOKENS:
+                return tokens, True, False
+            tokens.append(token)
+        if tokens:
+            return tokens, False, False
+        if len(term) >= 3:
+            return sorted(self._similar_tokens(term)), False, True
+        return [], False, False
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Produk aktif yang cocok dengan `query`, terurut menurut tingkat:
+        SKU persis, prefix SKU, prefix nama, lalu semua kata cocok (prefix
+        kata atau koreksi salah ketik); di dalam tingkat yang sama produk
+        yang masih ada stoknya didahulukan. Mengembalikan (list produk,
+        id produk dengan SKU persis atau None).
+        """
+        query = query.strip().lower()
+        if not query:
+            return [], None
+
+        with self.lock:
+            return self._search(query, limit)
+
+    def _search(self, query, limit):
+        tiers = [[], [], [], []]
+        seen = set()
+
+        def collect(tier, product_id):
+            product = self.products[product_id]
+            if product_id not in seen and product['is_active']:
+                seen.add(product_id)
+                tiers[tier].append(product)
+            return sum(len(found) for found in tiers) >= limit
+
+        exact = self.by_sku.get(query)
+        if exact is not None and not self.products[exact]['is_active']:
+            exact = None
+        if exact is not None:
+            collect(0, exact)
+
+        done = any(collect(1, product_id) for _, product_id in _prefix_range(self.skus, query, (query,)))
+        if not done:
+            done = any(collect(2, product_id) for _, product_id in _prefix_range(self.names, query, (query,)))
+
+        terms = [term for term in dict.fromkeys(_tokens(query)) if len(term) >= MIN_TERM_LENGTH]
+        if not done and terms:
+            matches = []
+            for term in terms:
+                tokens, truncated, corrected = self._term_tokens(term)
+                if tokens:
+                    cost = float('inf') if truncated else sum(len(self.postings[token]) for token in tokens)
+                    matches.append((cost, tokens, corrected, term))
+
+            if matches:
+                # Posting list terpendek menjadi penggerak; term lain dicek pada kata produk
+                matches.sort(key=lambda match: match[0])
+                _, tokens, _, _ = matches[0]
+                others = [
+                    (set(tokens), None) if corrected else (None, term)
+                    for _, tokens, corrected, term in matches[1:]
+                ]
+                candidates = heapq.merge(*[self.postings[token] for token in tokens])
+                previous = None
+                for name_key in candidates:
+                    product_id = name_key[1]
+                    if product_id == previous:
+                        continue
+                    previous = product_id
+                    words = self.products[product_id]['words']
+                    if all(
+                        any(word in alternatives for word in words) if alternatives is not None
+                        else any(word.startswith(term) for word in words)
+                        for alternatives, term in others
+                    ):
+                        if collect(3, product_id):
+                            break
+
+        results = []
+        for found in tiers:
+            found.sort(key=lambda product: product['qty'] <= 0)
+            results.extend(found)
+        return [{key: product[key] for key in RESULT_FIELDS} for product in results[:limit]], exact
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(tenant_id):
+    """Index tenant (dibuat jika belum ada), paling banyak MAX_TENANTS per proses"""
+    with _indexes_lock:
+        index = _indexes.get(tenant_id)
+        if index is None:
+            index = _indexes[tenant_id] = ProductIndex(tenant_id)
+            if len(_indexes) > MAX_TENANTS:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(tenant_id)
+    index.ensure_fresh()
+    return index
+
+
+def search_products(tenant_id, query, limit=DEFAULT_LIMIT):
+    return get_index(tenant_id).search(query, min(max(limit, 1), MAX_LIMIT))
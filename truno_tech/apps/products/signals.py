@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.refcache import bump, catalog_scope, stock_scope
+from apps.tenants.counters import add_products
+from .models import ProductCategory, Product
+from .stock import sync_low_stock
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+def bump_catalog_version(sender, instance, **kwargs):
+    """Data produk/kategori tenant berubah: cache endpoint AJAX tidak berlaku lagi"""
+    bump(catalog_scope(instance.tenant_id))
+
+
+@receiver([post_save, post_delete], sender=Product)
+def bump_stock_version(sender, instance, **kwargs):
+    """Stok dan status aktif bisa berubah lewat form/admin"""
+    bump(stock_scope(instance.tenant_id))
+
+
+@receiver(post_save, sender=Product)
+def sync_product_low_stock(sender, instance, **kwargs):
+    """Stok, batas minimum, atau status aktif bisa berubah lewat form/admin"""
+    sync_low_stock([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, update_fields=None, **kwargs):
+    """Produk baru, atau status aktifnya berubah"""
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    loaded = getattr(instance, '_loaded_is_active', None)
+    if created:
+        add_products(instance.tenant_id, 1, 1 if instance.is_active else 0)
+    elif loaded is not None and loaded != instance.is_active:
+        add_products(instance.tenant_id, active=1 if instance.is_active else -1)
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product(sender, instance, **kwargs):
+    add_products(instance.tenant_id, -1, -1 if instance.is_active else 0)
@@ -0,0 +1,238 @@
+"""
+Mutasi stok produk.
+
+Semua perubahan stok dijalankan sebagai satu UPDATE bersyarat di database
+(`qty = qty - n WHERE qty >= n`), sehingga dua terminal yang menjual stok
+terakhir secara bersamaan tidak bisa sama-sama lolos atau saling menimpa.
+
+Setiap perubahan juga dicatat ke `StockMovement` dalam transaksi yang sama.
+Stok pada waktu lampau dibaca dari `StockSnapshot` terdekat ditambah
+mutasi sesudahnya, sehingga riwayat tidak perlu diputar ulang dari awal.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, When, Value, F, IntegerField, OuterRef, Subquery, Sum, Exists
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.core.refcache import bump, stock_scope
+from .models import Product, StockMovement, StockSnapshot, LowStockItem
+
+# Snapshot diambil sedikit ke belakang agar transaksi yang masih berjalan
+# (created_at mutasinya sudah terisi tapi belum commit) tidak terlewat
+SNAPSHOT_LAG = timedelta(minutes=1)
+
+
+def sync_low_stock(product_ids):
+    """
+    Samakan LowStockItem untuk `product_ids` dengan stok saat ini: produk yang
+    baru turun ke <= reorder_level ditambahkan, yang sudah pulih dihapus.
+    Tidak ada penulisan jika tidak ada yang melewati batas.
+    Mengembalikan set tenant_id produk-produk tersebut.
+    """
+    rows = (
+        Product.objects
+        .filter(pk__in=list(product_ids))
+        .annotate(listed=Exists(LowStockItem.objects.filter(product=OuterRef('pk'))))
+        .values_list('pk', 'tenant_id', 'qty', 'reorder_level', 'is_active', 'listed')
+    )
+    tenant_ids = set()
+    added = []
+    recovered = []
+    for product_id, tenant_id, qty, reorder_level, is_active, listed in rows:
+        tenant_ids.add(tenant_id)
+        low = is_active and qty <= reorder_level
+        if low and not listed:
+            added.append(LowStockItem(product_id=product_id, tenant_id=tenant_id))
+        elif listed and not low:
+            recovered.append(product_id)
+
+    if added:
+        LowStockItem.objects.bulk_create(added, ignore_conflicts=True)
+    if recovered:
+        LowStockItem.objects.filter(product_id__in=recovered).delete()
+    return tenant_ids
+
+
+def _after_stock_change(product_ids):
+    """Perbarui daftar stok menipis dan naikkan versi stok tenant (katalog tidak berubah)"""
+    bump(*[stock_scope(tenant_id) for tenant_id in sync_low_stock(product_ids)])
+
+
+def reduce_stock(product_id, quantity, reason='reduce', **movement):
+    """Kurangi stok satu produk. Mengembalikan False jika stok tidak mencukupi"""
+    with transaction.atomic():
+        reduced = Product.objects.filter(pk=product_id, qty__gte=quantity).update(
+            qty=F('qty') - quantity,
+            updated_at=timezone.now()
+        ) == 1
+        if reduced and quantity:
+            StockMovement.objects.create(product_id=product_id, delta=-quantity, reason=reason, **movement)
+            _after_stock_change([product_id])
+    return reduced
+
+
+def add_stock(product_id, quantity, reason='add', **movement):
+    """Tambah stok satu produk"""
+    with transaction.atomic():
+        added = Product.objects.filter(pk=product_id).update(
+            qty=F('qty') + quantity,
+            updated_at=timezone.now()
+        ) == 1
+        if added and quantity:
+            StockMovement.objects.create(product_id=product_id, delta=quantity, reason=reason, **movement)
+            _after_stock_change([product_id])
+    return added
+
+
+def set_stock(product_id, quantity, reason='set', **movement):
+    """Atur stok satu produk menjadi nilai tertentu"""
+    with transaction.atomic():
+        current = (
+            Product.objects.select_for_update()
+            .filter(pk=product_id)
+            .values_list('qty', flat=True)
+            .first()
+        )
+        if current is None:
+            return False
+        Product.objects.filter(pk=product_id).update(
+            qty=quantity,
+            updated_at=timezone.now()
+        )
+        if quantity != current:
+            StockMovement.objects.create(
+                product_id=product_id, delta=quantity - current, reason=reason, **movement
+            )
+            _after_stock_change([product_id])
+    return True
+
+
+def apply_stock_deltas(deltas, movements=None, reason=None, **movement):
+    """
+    Terapkan perubahan stok banyak produk dalam satu UPDATE.
+
+    `deltas` adalah dict {product_id: delta}; delta negatif mengurangi stok.
+    Perubahan bersifat semua-atau-tidak-sama-sekali: jika ada produk yang
+    stoknya akan menjadi negatif (atau tidak ada), tidak ada yang diubah dan
+    daftar product_id yang gagal dikembalikan. List kosong berarti sukses.
+
+    Mutasi dicatat dengan satu bulk insert: `movements` (StockMovement belum
+    disimpan, mis. satu per order) bila diberikan, jika tidak satu baris per
+    produk dengan `reason` (default: add/reduce sesuai tanda delta) dan field
+    lain dari `movement`.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+
+    delta_expr = Case(
+        *[When(pk=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+        output_field=IntegerField(),
+    )
+    required_expr = Case(
+        *[When(pk=product_id, then=Value(-delta)) for product_id, delta in deltas.items()],
+        output_field=IntegerField(),
+    )
+
+    with transaction.atomic():
+        updated = (
+            Product.objects
+            .filter(pk__in=list(deltas), qty__gte=required_expr)
+            .update(qty=F('qty') + delta_expr, updated_at=timezone.now())
+        )
+        if updated == len(deltas):
+            if movements is None:
+                movements = [
+                    StockMovement(
+                        product_id=product_id,
+                        delta=delta,
+                        reason=reason or ('add' if delta > 0 else 'reduce'),
+                        **movement
+                    )
+                    for product_id, delta in deltas.items()
+                ]
+            StockMovement.objects.bulk_create(movements)
+            _after_stock_change(deltas)
+            return []
+        transaction.set_rollback(True)
+
+    # Savepoint sudah dibatalkan; baca stok terkini untuk melaporkan yang gagal
+    current = dict(Product.objects.filter(pk__in=list(deltas)).values_list('pk', 'qty'))
+    failed = [
+        product_id for product_id, delta in deltas.items()
+        if product_id not in current or current[product_id] + delta < 0
+    ]
+    return failed or list(deltas)
+
+
+def _movement_sum(**filters):
+    movements = (
+        StockMovement.objects
+        .filter(product=OuterRef('pk'), **filters)
+        .order_by()
+        .values('product')
+        .annotate(total=Sum('delta'))
+        .values('total')
+    )
+    return Coalesce(Subquery(movements), 0)
+
+
+def annotate_stock_at(products, when):
+    """
+    Tambahkan `stock_at` (stok pada waktu `when`) ke queryset produk.
+
+    Dihitung dari snapshot terakhir sebelum `when` ditambah mutasi di antaranya.
+    Produk tanpa snapshot sebelum `when` dihitung mundur dari stok sekarang.
+    """
+    snapshots = StockSnapshot.objects.filter(product=OuterRef('pk'), taken_at__lte=when).order_by('-taken_at')
+    return (
+        products
+        .annotate(
+            snapshot_qty=Subquery(snapshots.values('qty')[:1]),
+            snapshot_at=Subquery(snapshots.values('taken_at')[:1]),
+        )
+        .annotate(
+            stock_at=Case(
+                When(
+                    snapshot_at__isnull=True,
+                    then=F('qty') - _movement_sum(created_at__gt=when),
+                ),
+                default=F('snapshot_qty') + _movement_sum(
+                    created_at__gt=OuterRef('snapshot_at'), created_at__lte=when
+                ),
+                output_field=IntegerField(),
+            )
+        )
+    )
+
+
+def stock_at(product_id, when):
+    """Stok satu produk pada waktu `when`, atau None jika produk tidak ada"""
+    return (
+        annotate_stock_at(Product.objects.filter(pk=product_id), when)
+        .values_list('stock_at', flat=True)
+        .first()
+    )
+
+
+def take_snapshots(products=None, lag=SNAPSHOT_LAG, batch_size=1000):
+    """
+    Simpan snapshot stok `products` (default: semua) pada waktu sekarang
+    dikurangi `lag`, dihitung dari stok sekarang dikurangi mutasi sesudahnya.
+    Mengembalikan (taken_at, jumlah produk).
+    """
+    taken_at = timezone.now() - lag
+    products = (products if products is not None else Product.objects.all()).order_by('pk')
+    levels = products.annotate(level=F('qty') - _movement_sum(created_at__gt=taken_at))
+
+    created = 0
+    batch = []
+    for product_id, level in levels.values_list('pk', 'level').iterator(chunk_size=batch_size):
+        batch.append(StockSnapshot(product_id=product_id, qty=level, taken_at=taken_at))
+        if len(batch) >= batch_size:
+            created += len(StockSnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+    if batch:
+        created += len(StockSnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+    return taken_at, created
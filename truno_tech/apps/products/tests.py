@@ -1,3 +1,320 @@
-from django.test import TestCase
+import io
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from apps.accounts.models import UserProfile
+from apps.tenants.models import Tenant
+from .bulk import apply_bulk_update, preview_bulk_update
+from .imports import ImportFileError, import_products, read_rows
+from .models import Product, ProductBulkUpdate, ProductCategory, StockMovement, StockSnapshot
+from .search import ProductIndex
+from .stock import add_stock, apply_stock_deltas, reduce_stock, stock_at, take_snapshots
+
+
+def make_product(tenant, category, sku, qty, price=1000):
+    return Product.objects.create(
+        tenant=tenant, category=category, sku=sku, name=f'Produk {sku}',
+        qty=qty, price=price, created_by=tenant.owner,
+    )
+
+
+class StockFixtureMixin:
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='rahasia-123')
+        UserProfile.objects.create(user=self.owner, role='client', max_tenants=5)
+        self.tenant = Tenant.objects.create(owner=self.owner, name='Toko', address='Jl. A', phone='0811')
+        self.category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+
+
+class ConcurrentStockTest(StockFixtureMixin, TransactionTestCase):
+    """Penjualan bersamaan tidak boleh membuat stok negatif atau hilang"""
+
+    def test_concurrent_reduce_never_oversells(self):
+        product = make_product(self.tenant, self.category, 'A', qty=5)
+        sold = []
+        barrier = threading.Barrier(10)
+
+        def sell():
+            try:
+                barrier.wait()
+                try:
+                    if reduce_stock(product.pk, 1, reason='sale'):
+                        sold.append(1)
+                except OperationalError:
+                    # SQLite dapat menolak penulis yang bersamaan; itu bukan penjualan
+                    pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sell) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        # Penjualan yang berhasil dihitung dari ledger: pada SQLite, COMMIT yang
+        # sudah tersimpan masih bisa melaporkan OperationalError ke thread-nya
+        recorded = StockMovement.objects.filter(product=product).count()
+        self.assertGreaterEqual(recorded, len(sold))
+        self.assertLessEqual(recorded, 5)
+        self.assertEqual(product.qty, 5 - recorded)
+
+
+class ApplyStockDeltasTest(StockFixtureMixin, TestCase):
+    def test_insufficient_stock_changes_nothing(self):
+        a = make_product(self.tenant, self.category, 'A', qty=5)
+        b = make_product(self.tenant, self.category, 'B', qty=1)
+
+        failed = apply_stock_deltas({a.pk: -3, b.pk: -2})
+
+        self.assertEqual(failed, [b.pk])
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.qty, b.qty), (5, 1))
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_all_deltas_applied_together(self):
+        a = make_product(self.tenant, self.category, 'A', qty=5)
+        b = make_product(self.tenant, self.category, 'B', qty=1)
+
+        self.assertEqual(apply_stock_deltas({a.pk: -5, b.pk: 4}), [])
+
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.qty, b.qty), (0, 5))
+        self.assertEqual(StockMovement.objects.filter(product__in=[a, b]).count(), 2)
+
+    def test_reduce_stock_refuses_below_zero(self):
+        product = make_product(self.tenant, self.category, 'A', qty=2)
+
+        self.assertTrue(reduce_stock(product.pk, 2))
+        self.assertFalse(reduce_stock(product.pk, 1))
+
+        product.refresh_from_db()
+        self.assertEqual(product.qty, 0)
+
+
+class StockLedgerTest(StockFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.product = make_product(self.tenant, self.category, 'A', qty=10)
+        add_stock(self.product.pk, 5)
+        reduce_stock(self.product.pk, 3, reason='sale')
+        # Mundurkan waktu mutasi: +5 dua jam lalu, -3 satu jam lalu
+        for movement, hours in zip(StockMovement.objects.order_by('id'), (2, 1)):
+            StockMovement.objects.filter(pk=movement.pk).update(created_at=self.now - timedelta(hours=hours))
+
+    def ago(self, minutes):
+        return self.now - timedelta(minutes=minutes)
+
+    def test_stock_at_without_snapshot(self):
+        self.assertEqual(stock_at(self.product.pk, self.ago(150)), 10)
+        self.assertEqual(stock_at(self.product.pk, self.ago(90)), 15)
+        self.assertEqual(stock_at(self.product.pk, self.now), 12)
+
+    def test_stock_at_from_snapshot(self):
+        taken_at, created = take_snapshots(Product.objects.filter(pk=self.product.pk), lag=timedelta(minutes=100))
+
+        self.assertEqual(created, 1)
+        self.assertEqual(StockSnapshot.objects.get().qty, 15)
+        self.assertEqual(stock_at(self.product.pk, self.ago(90)), 15)
+        self.assertEqual(stock_at(self.product.pk, self.ago(30)), 12)
+        self.assertEqual(stock_at(self.product.pk, self.ago(150)), 10)
+
+
+class ProductEditStockTest(StockFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(self.tenant, self.category, 'A', qty=10)
+        self.client.force_login(self.owner)
+
+    def post(self, qty, original_qty):
+        return self.client.post(f'/products/{self.product.pk}/edit/', {
+            'category': self.category.pk, 'sku': 'A', 'name': 'Produk A', 'description': '',
+            'qty': qty, 'original_qty': original_qty, 'reorder_level': 0, 'price': 1000,
+        })
+
+    def test_sale_during_edit_is_kept(self):
+        form = self.client.get(f'/products/{self.product.pk}/edit/')
+        self.assertContains(form, 'name="original_qty" value="10"')
+        reduce_stock(self.product.pk, 3, reason='sale')
+
+        response = self.post(qty=15, original_qty=10)
+
+        self.assertEqual(response.status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.qty, 12)
+        self.assertEqual(StockMovement.objects.filter(reason='edit').get().delta, 5)
+
+    def test_reduction_below_sold_stock_rejected(self):
+        reduce_stock(self.product.pk, 8, reason='sale')
+
+        response = self.post(qty=0, original_qty=10)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Stok tidak mencukupi')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.qty, 2)
+
+
+class ProductImportTest(StockFixtureMixin, TestCase):
+    def run_import(self, content, chunk_size=1000):
+        rows = read_rows(io.BytesIO(content.encode('utf-8') if isinstance(content, str) else content), 'produk.csv')
+        return import_products(self.tenant, self.owner, rows, chunk_size=chunk_size)
+
+    def test_upsert_creates_then_updates_by_sku(self):
+        report = self.run_import(
+            'sku;nama;kategori;harga;stok\n'
+            'A1;Kopi;Minuman;"15.000";10\n'
+            'A2;Teh;Minuman;8000;0\n'
+            'A3;Roti;Makanan;abc;5\n'
+        )
+        self.assertEqual((report['created'], report['updated'], report['categories']), (2, 0, 1))
+        self.assertEqual([error['row'] for error in report['errors']], [4])
+
+        report = self.run_import('sku,nama,kategori,harga,stok\nA1,Kopi Susu,Minuman,16000,7\nA4,Roti,Makanan,5000,3\n')
+
+        self.assertEqual((report['created'], report['updated'], report['categories']), (1, 1, 1))
+        kopi = Product.objects.get(tenant=self.tenant, sku='A1')
+        self.assertEqual((kopi.name, kopi.price, kopi.qty), ('Kopi Susu', 16000, 7))
+        self.assertEqual(list(kopi.stock_movements.order_by('id').values_list('reason', 'delta')), [('initial', 10), ('set', -3)])
+        self.assertEqual(Product.objects.filter(tenant=self.tenant).count(), 3)
+
+    def test_duplicate_sku_in_file_reported(self):
+        report = self.run_import('sku,nama,kategori,harga\nA1,Kopi,Minuman,1000\nA1,Kopi 2,Minuman,2000\n')
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'][0]['row'], 3)
+        self.assertEqual(Product.objects.get(sku='A1').name, 'Kopi')
+
+    def test_non_utf8_file_rejected(self):
+        with self.assertRaises(ImportFileError):
+            self.run_import('sku,nama,kategori,harga\nA1,Kôpi,Minuman,1000\n'.encode('latin-1'))
+
+    def test_decode_error_mid_file_keeps_earlier_chunks(self):
+        good = ''.join(f'B{i},Produk {i},Umum,1000\n' for i in range(3000))
+        content = ('sku,nama,kategori,harga\n' + good).encode('utf-8') + 'Z1,Kôpi,Umum,1000\n'.encode('latin-1')
+
+        report = self.run_import(content, chunk_size=500)
+
+        self.assertIsNotNone(report['file_error'])
+        self.assertGreater(report['created'], 0)
+        self.assertEqual(Product.objects.filter(tenant=self.tenant).count(), report['created'])
+
+    def test_import_view(self):
+        self.client.force_login(self.owner)
+        upload = SimpleUploadedFile('produk.csv', b'sku,nama,kategori,harga\nA1,Kopi,Minuman,1000\n')
+
+        response = self.client.post('/products/import/', {'tenant': self.tenant.pk, 'file': upload}, follow=True)
+        invalid = self.client.post('/products/import/', {'tenant': 'abc'})
+
+        self.assertContains(response, '1 produk baru')
+        self.assertContains(invalid, 'Pilih tenant yang valid.')
+
+
+class ProductSearchTest(StockFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kopi = make_product(self.tenant, self.category, '8991001', qty=5)
+            Product.objects.filter(pk=self.kopi.pk).update(name='Kopi Susu Gula Aren')
+            self.kopi_hitam = make_product(self.tenant, self.category, '8991002', qty=0)
+            Product.objects.filter(pk=self.kopi_hitam.pk).update(name='Kopi Hitam')
+            self.teh = make_product(self.tenant, self.category, 'TEH-01', qty=9)
+            Product.objects.filter(pk=self.teh.pk).update(name='Es Teh Manis')
+            self.nonaktif = make_product(self.tenant, self.category, '8991003', qty=9)
+            Product.objects.filter(pk=self.nonaktif.pk).update(name='Kopi Lama', is_active=False)
+        self.index = ProductIndex(self.tenant.pk)
+
+    def search(self, query, limit=20):
+        self.index.ensure_fresh()
+        products, exact = self.index.search(query, limit)
+        return [product['id'] for product in products], exact
+
+    def test_exact_sku_then_prefixes(self):
+        self.assertEqual(self.search('8991001'), ([self.kopi.pk], self.kopi.pk))
+        self.assertEqual(self.search('899'), ([self.kopi.pk, self.kopi_hitam.pk], None))
+        self.assertEqual(self.search('8991003'), ([], None))
+
+    def test_words_typos_and_stock_order(self):
+        # Produk yang stoknya habis ada di akhir tingkatnya
+        self.assertEqual(self.search('kopi')[0], [self.kopi.pk, self.kopi_hitam.pk])
+        self.assertEqual(self.search('gula kop')[0], [self.kopi.pk])
+        self.assertEqual(self.search('manis teh')[0], [self.teh.pk])
+        self.assertEqual(self.search('kopu aren')[0], [self.kopi.pk])
+        self.assertEqual(len(self.search('kopi', limit=1)[0]), 1)
+
+    def test_index_follows_catalog_changes(self):
+        self.search('kopi')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teh.name = 'Kopi Teh'
+            self.teh.save()
+        self.assertIn(self.teh.pk, self.search('kopi')[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kopi_hitam.delete()
+        self.assertEqual(self.search('hitam')[0], [])
+
+    def test_search_api(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get('/products/api/search/', {'tenant_id': self.tenant.pk, 'q': '8991001'})
+
+        self.assertEqual(response.json()['exact'], self.kopi.pk)
+        self.assertEqual(self.client.get('/products/api/search/', {'tenant_id': 'x', 'q': 'kopi'}).json()['products'], [])
+
+
+class BulkUpdateTest(StockFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        other_category = ProductCategory.objects.create(tenant=self.tenant, name='Lain', created_by=self.owner)
+        make_product(self.tenant, self.category, 'A', qty=5, price=10250)
+        make_product(self.tenant, self.category, 'B', qty=5, price=1000)
+        make_product(self.tenant, other_category, 'C', qty=5, price=3000)
+
+    def update(self, **fields):
+        return ProductBulkUpdate(tenant=self.tenant, created_by=self.owner, **fields)
+
+    def prices(self):
+        return dict(Product.objects.values_list('sku', 'price'))
+
+    def test_percent_with_rounding_scoped_to_category(self):
+        update = self.update(category=self.category, price_mode='percent', price_value=Decimal('10'), rounding=500)
+
+        preview = preview_bulk_update(update)
+        self.assertEqual(self.prices(), {'A': 10250, 'B': 1000, 'C': 3000})
+        self.assertEqual((preview['count'], preview['price_changed'], preview['price_after']), (2, 1, 12500))
+
+        self.assertEqual(apply_bulk_update(update), 2)
+        self.assertEqual(self.prices(), {'A': 11500, 'B': 1000, 'C': 3000})
+        self.assertEqual(ProductBulkUpdate.objects.get().affected, 2)
+
+    def test_amount_never_below_zero(self):
+        apply_bulk_update(self.update(price_mode='amount', price_value=Decimal('-2000')))
+
+        self.assertEqual(self.prices(), {'A': 8250, 'B': 0, 'C': 1000})
+
+    def test_status_by_sku_only_touches_changed(self):
+        self.assertEqual(apply_bulk_update(self.update(skus='A\nC', is_active=False)), 2)
+        self.assertEqual(apply_bulk_update(self.update(skus='A, C', is_active=False)), 0)
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'is_active')),
+            {'A': False, 'B': True, 'C': False},
+        )
+
+    def test_view_rejects_invalid_tenant(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.post('/products/bulk-update/', {'tenant': 'abc'})
+
+        self.assertContains(response, 'Pilih tenant yang valid.')
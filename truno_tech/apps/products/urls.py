@@ -13,10 +13,13 @@ urlpatterns = [
     # Product URLs
     path('', views.product_list_view, name='list'),
     path('create/', views.product_create_view, name='create'),
+    path('import/', views.product_import_view, name='import'),
+    path('bulk-update/', views.product_bulk_update_view, name='bulk_update'),
     path('<int:product_id>/edit/', views.product_edit_view, name='edit'),
     path('<int:product_id>/delete/', views.product_delete_view, name='delete'),
     path('<int:product_id>/stock/', views.product_stock_adjustment_view, name='stock_adjustment'),
     
     # AJAX URLs
     path('api/categories/', views.get_categories_by_tenant, name='get_categories_by_tenant'),
+    path('api/search/', views.product_search_api, name='search_api'),
 ]
\ No newline at end of file
@@ -2,10 +2,17 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import Count
 from django.http import JsonResponse
+from apps.core.pagination import paginate_request, render_keyset
+from apps.core.refcache import cached_json, catalog_scope
 from apps.tenants.models import Tenant, TenantAccess
-from .models import ProductCategory, Product
-from .forms import ProductCategoryForm, ProductForm, StockAdjustmentForm
+from .models import ProductCategory, Product, StockMovement
+from .forms import ProductCategoryForm, ProductForm, StockAdjustmentForm, ProductBulkUpdateForm
+from .bulk import preview_bulk_update, apply_bulk_update
+from .imports import read_rows, import_products, ImportFileError
+from .search import search_products, DEFAULT_LIMIT
+from .stock import apply_stock_deltas
 
 def get_accessible_tenants(user):
     """Get tenants that user can access"""
@@ -56,16 +63,15 @@ def product_stock_adjustment_view(request, product_id):
         if form.is_valid():
             adjustment_type = form.cleaned_data['adjustment_type']
             quantity = form.cleaned_data['quantity']
+            movement = {'created_by': request.user, 'note': form.cleaned_data['notes']}
             
             old_qty = product.qty
             
             if adjustment_type == 'add':
-                product.add_stock(quantity)
+                product.add_stock(quantity, **movement)
                 action = f'Menambah {quantity} stok'
             elif adjustment_type == 'reduce':
-                if product.qty >= quantity:
-                    product.qty -= quantity
-                    product.save()
+                if product.reduce_stock(quantity, **movement):
                     action = f'Mengurangi {quantity} stok'
                 else:
                     messages.error(request, 'Stok tidak mencukupi untuk dikurangi.')
@@ -75,8 +81,7 @@ def product_stock_adjustment_view(request, product_id):
                         'product': product
                     })
             else:  # set
-                product.qty = quantity
-                product.save()
+                product.set_stock(quantity, **movement)
                 action = f'Mengatur stok menjadi {quantity}'
             
             messages.success(request, f'{action}. Stok berubah dari {old_qty} menjadi {product.qty}.')
@@ -93,21 +98,37 @@ def product_stock_adjustment_view(request, product_id):
 def get_categories_by_tenant(request):
     """AJAX endpoint to get categories by tenant"""
     tenant_id = request.GET.get('tenant_id')
-    if tenant_id:
+    if tenant_id and tenant_id.isdigit():
         tenant = get_object_or_404(Tenant, id=tenant_id)
         if check_tenant_access(request.user, tenant):
-            categories = ProductCategory.objects.filter(tenant=tenant).values('id', 'name')
-            return JsonResponse({'categories': list(categories)})
+            def build():
+                categories = ProductCategory.objects.filter(tenant_id=tenant_id).values('id', 'name')
+                
+                # Paginated only when the client asks for it (?limit= / ?cursor=)
+                if 'limit' in request.GET or 'cursor' in request.GET:
+                    page = paginate_request(request, categories, ('name', 'id'))
+                    return {'categories': page.object_list, 'next_cursor': page.next_cursor}
+                
+                return {'categories': list(categories)}
+            
+            return cached_json(request, catalog_scope(tenant_id), build)
     
     return JsonResponse({'categories': []})
 def category_list_view(request):
     tenants = get_accessible_tenants(request.user)
-    categories = ProductCategory.objects.filter(tenant__in=tenants).select_related('tenant')
+    categories = (
+        ProductCategory.objects
+        .filter(tenant__in=tenants)
+        .select_related('tenant')
+        .annotate(product_count=Count('products'))
+    )
+    
+    page = paginate_request(request, categories, ('name', 'id'))
     
-    return render(request, 'products/category_list.html', {
-        'categories': categories,
+    return render_keyset(request, 'products/category_list.html', 'products/_category_rows.html', {
+        'categories': page,
         'tenants': tenants
-    })
+    }, page)
 
 @login_required
 def category_create_view(request):
@@ -187,11 +208,13 @@ def product_list_view(request):
     if tenant_filter:
         products = products.filter(tenant_id=tenant_filter)
     
-    return render(request, 'products/product_list.html', {
-        'products': products,
+    page = paginate_request(request, products, ('name', 'id'))
+    
+    return render_keyset(request, 'products/product_list.html', 'products/_product_rows.html', {
+        'products': page,
         'tenants': tenants,
         'selected_tenant': int(tenant_filter) if tenant_filter else None
-    })
+    }, page)
 
 @login_required
 def product_create_view(request):
@@ -201,14 +224,19 @@ def product_create_view(request):
         tenant_id = request.POST.get('tenant')
         tenant = get_object_or_404(Tenant, id=tenant_id) if tenant_id else None
         
-        form = ProductForm(request.POST, tenant=tenant)
+        form = ProductForm(request.POST, request.FILES, tenant=tenant)
         
         if form.is_valid() and tenant and check_tenant_access(request.user, tenant):
             try:
                 product = form.save(commit=False)
                 product.tenant = tenant
                 product.created_by = request.user
-                product.save()
+                with transaction.atomic():
+                    product.save()
+                    if product.qty:
+                        StockMovement.objects.create(
+                            product=product, delta=product.qty, reason='initial', created_by=request.user
+                        )
                 messages.success(request, f'Produk {product.name} berhasil dibuat.')
                 return redirect('products:list')
             except Exception as e:
@@ -222,6 +250,70 @@ def product_create_view(request):
         'title': 'Tambah Produk Baru'
     })
 
+@login_required
+def product_import_view(request):
+    tenants = get_accessible_tenants(request.user)
+    report = None
+    
+    if request.method == 'POST':
+        tenant_id = request.POST.get('tenant')
+        tenant = get_object_or_404(Tenant, id=tenant_id) if tenant_id and tenant_id.isdigit() else None
+        upload = request.FILES.get('file')
+        
+        if not tenant or not check_tenant_access(request.user, tenant):
+            messages.error(request, 'Pilih tenant yang valid.')
+        elif not upload:
+            messages.error(request, 'Pilih file CSV atau XLSX.')
+        else:
+            try:
+                report = import_products(tenant, request.user, read_rows(upload, upload.name))
+            except ImportFileError as e:
+                messages.error(request, str(e))
+            else:
+                summary = (
+                    f"{report['created']} produk baru, {report['updated']} diperbarui, "
+                    f"{report['error_count']} baris gagal."
+                )
+                if report['file_error']:
+                    messages.error(request, f"{report['file_error']} Sebelumnya: {summary}")
+                else:
+                    messages.success(request, f"Import selesai: {summary}")
+    
+    return render(request, 'products/product_import.html', {
+        'tenants': tenants,
+        'report': report,
+    })
+
+@login_required
+def product_bulk_update_view(request):
+    tenants = get_accessible_tenants(request.user)
+    tenant = None
+    preview = None
+    
+    if request.method == 'POST':
+        tenant_id = request.POST.get('tenant')
+        tenant = get_object_or_404(Tenant, id=tenant_id) if tenant_id and tenant_id.isdigit() else None
+        form = ProductBulkUpdateForm(request.POST, tenant=tenant)
+        
+        if not tenant or not check_tenant_access(request.user, tenant):
+            messages.error(request, 'Pilih tenant yang valid.')
+        elif form.is_valid():
+            update = form.build(tenant, request.user)
+            if 'apply' in request.POST:
+                affected = apply_bulk_update(update)
+                messages.success(request, f'{affected} produk berhasil diperbarui.')
+                return redirect('products:list')
+            preview = preview_bulk_update(update)
+    else:
+        form = ProductBulkUpdateForm()
+    
+    return render(request, 'products/product_bulk_update.html', {
+        'form': form,
+        'tenants': tenants,
+        'selected_tenant': tenant.id if tenant else None,
+        'preview': preview,
+    })
+
 @login_required
 def product_edit_view(request, product_id):
     product = get_object_or_404(Product, id=product_id)
@@ -231,11 +323,22 @@ def product_edit_view(request, product_id):
         return redirect('products:list')
     
     if request.method == 'POST':
-        form = ProductForm(request.POST, instance=product, tenant=product.tenant)
+        form = ProductForm(request.POST, request.FILES, instance=product, tenant=product.tenant)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Produk {product.name} berhasil diupdate.')
-            return redirect('products:list')
+            # Stok diubah sebesar selisih dari nilai saat form dibuka (tercatat di ledger),
+            # jadi penjualan yang terjadi selama form terbuka tidak tertimpa
+            delta = form.stock_delta()
+            product = form.save(commit=False)
+            fields = [name for name in form.changed_data if name not in ('qty', 'original_qty')]
+            with transaction.atomic():
+                failed = apply_stock_deltas({product.pk: delta}, reason='edit', created_by=request.user)
+                if not failed and fields:
+                    product.save(update_fields=fields + ['updated_at'])
+            if failed:
+                form.add_error('qty', 'Stok tidak mencukupi: stok sudah berkurang sejak form dibuka. Muat ulang halaman.')
+            else:
+                messages.success(request, f'Produk {product.name} berhasil diupdate.')
+                return redirect('products:list')
     else:
         form = ProductForm(instance=product, tenant=product.tenant)
     
@@ -244,3 +347,20 @@ def product_edit_view(request, product_id):
         'product': product,
         'title': f'Edit Produk - {product.name}'
     })
+
+@login_required
+def product_search_api(request):
+    """AJAX endpoint: cari produk tenant berdasarkan nama atau SKU (scan barcode)"""
+    tenant_id = request.GET.get('tenant_id')
+    query = request.GET.get('q', '')
+    if tenant_id and tenant_id.isdigit():
+        tenant = get_object_or_404(Tenant, id=tenant_id)
+        if check_tenant_access(request.user, tenant):
+            try:
+                limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+            except ValueError:
+                limit = DEFAULT_LIMIT
+            products, exact = search_products(int(tenant_id), query, limit)
+            return JsonResponse({'products': products, 'exact': exact})
+    
+    return JsonResponse({'products': [], 'exact': None})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Tenant, TenantAccess
+from .models import Tenant, TenantAccess, TenantStats
 
 @admin.register(Tenant)
 class TenantAdmin(admin.ModelAdmin):
@@ -12,4 +12,11 @@ class TenantAdmin(admin.ModelAdmin):
 class TenantAccessAdmin(admin.ModelAdmin):
     list_display = ['tenant', 'crew', 'granted_by', 'granted_at']
     list_filter = ['granted_at', 'tenant__owner']
-    search_fields = ['tenant__name', 'crew__username']
\ No newline at end of file
+    search_fields = ['tenant__name', 'crew__username']
+
+@admin.register(TenantStats)
+class TenantStatsAdmin(admin.ModelAdmin):
+    list_display = ['tenant', 'product_count', 'active_product_count', 'order_count', 'revenue', 'updated_at']
+    search_fields = ['tenant__name']
+    readonly_fields = ['tenant', 'product_count', 'active_product_count', 'order_count', 'revenue', 'updated_at']
+    list_select_related = ['tenant']
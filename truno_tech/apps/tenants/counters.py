@@ -0,0 +1,115 @@
+"""
+Penghitung per tenant (TenantStats) untuk header dashboard.
+
+Jumlah order dan pendapatan ditambah secara inkremental di transaksi
+pembuatan order. Jumlah produk (total dan aktif) ditambah/dikurangi dengan
+F-expression saat produk dibuat, dihapus, atau status aktifnya berubah,
+tanpa menghitung ulang produk tenant. Baris TenantStats dibuat saat tenant
+dibuat; `verify_tenant_stats` mencocokkan semua penghitung dengan data
+sebenarnya dan memperbaiki selisihnya.
+"""
+from django.db.models import Case, When, Value, F, Count, Sum, OuterRef, Subquery, IntegerField, BigIntegerField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import TenantStats
+
+COUNTER_FIELDS = ['product_count', 'active_product_count', 'order_count', 'revenue']
+
+
+def add_orders(orders):
+    """
+    Tambahkan `orders` (sudah disimpan) ke penghitung tenantnya. Dipanggil di
+    transaksi yang sama dengan penyimpanan order; satu insert dan satu update.
+    """
+    totals = {}
+    for order in orders:
+        total = totals.setdefault(order.tenant_id, {'count': 0, 'revenue': 0})
+        total['count'] += 1
+        total['revenue'] += order.total_amount
+    if not totals:
+        return
+
+    TenantStats.objects.bulk_create(
+        [TenantStats(tenant_id=tenant_id) for tenant_id in totals],
+        ignore_conflicts=True,
+    )
+    TenantStats.objects.filter(pk__in=list(totals)).update(
+        order_count=F('order_count') + _per_tenant(totals, 'count', IntegerField()),
+        revenue=F('revenue') + _per_tenant(totals, 'revenue', BigIntegerField()),
+        updated_at=timezone.now(),
+    )
+
+
+def _per_tenant(totals, key, output_field):
+    return Case(
+        *[When(pk=tenant_id, then=Value(total[key])) for tenant_id, total in totals.items()],
+        output_field=output_field,
+    )
+
+
+def _product_counts():
+    from apps.products.models import Product
+
+    products = Product.objects.filter(tenant=OuterRef('pk')).order_by().values('tenant')
+    return (
+        Coalesce(Subquery(products.annotate(c=Count('pk')).values('c')), 0),
+        Coalesce(Subquery(products.filter(is_active=True).annotate(c=Count('pk')).values('c')), 0),
+    )
+
+
+def add_products(tenant_id, total=0, active=0):
+    """
+    Tambahkan selisih jumlah produk `total` dan produk aktif `active` (boleh
+    negatif) ke penghitung tenant dengan satu UPDATE. Baris yang belum ada
+    tidak dibuat (aman dipanggil saat tenant sedang dihapus).
+    """
+    if not total and not active:
+        return 0
+    return TenantStats.objects.filter(pk=tenant_id).update(
+        product_count=F('product_count') + total,
+        active_product_count=F('active_product_count') + active,
+        updated_at=timezone.now(),
+    )
+
+
+def actual_counters(tenants):
+    """Tenant `tenants` dianotasi nilai penghitung sebenarnya (actual_<field>)"""
+    from apps.orders.models import Order
+
+    total, active = _product_counts()
+    orders = Order.objects.filter(tenant=OuterRef('pk')).order_by().values('tenant')
+    return tenants.annotate(
+        actual_product_count=total,
+        actual_active_product_count=active,
+        actual_order_count=Coalesce(Subquery(orders.annotate(c=Count('pk')).values('c')), 0),
+        actual_revenue=Coalesce(Subquery(orders.annotate(s=Sum('total_amount')).values('s')), 0),
+    )
+
+
+def verify_counters(tenants, repair=False):
+    """
+    Bandingkan TenantStats `tenants` dengan data sebenarnya. Mengembalikan
+    list (tenant, {field: (tersimpan, sebenarnya)}) untuk yang melenceng
+    (baris yang belum ada dianggap nol); dengan `repair` langsung diperbaiki.
+    """
+    stored = {stats.pk: stats for stats in TenantStats.objects.filter(tenant__in=tenants)}
+    drifted, missing, changed = [], [], []
+    for tenant in actual_counters(tenants).order_by('pk'):
+        stats = stored.get(tenant.pk) or TenantStats(tenant=tenant)
+        diff = {}
+        for field in COUNTER_FIELDS:
+            actual = getattr(tenant, f'actual_{field}')
+            if getattr(stats, field) != actual:
+                diff[field] = (getattr(stats, field), actual)
+                setattr(stats, field, actual)
+        if tenant.pk not in stored:
+            missing.append(stats)
+        elif diff:
+            changed.append(stats)
+        if diff or tenant.pk not in stored:
+            drifted.append((tenant, diff))
+
+    if repair:
+        TenantStats.objects.bulk_create(missing, ignore_conflicts=True)
+        TenantStats.objects.bulk_update(changed, COUNTER_FIELDS, batch_size=500)
+    return drifted
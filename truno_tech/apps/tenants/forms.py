@@ -7,16 +7,18 @@ from .models import Tenant, TenantAccess
 class TenantForm(forms.ModelForm):
     class Meta:
         model = Tenant
-        fields = ['name', 'address', 'phone']
+        fields = ['name', 'address', 'phone', 'logo']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'address': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'phone': forms.TextInput(attrs={'class': 'form-control'}),
+            'logo': forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
         }
         labels = {
             'name': 'Nama Tenant',
             'address': 'Alamat',
             'phone': 'No. Telepon',
+            'logo': 'Logo',
         }
 
 
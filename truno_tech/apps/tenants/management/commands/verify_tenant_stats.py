@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.tenants.counters import verify_counters
+from apps.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Cocokkan penghitung per tenant (jumlah produk, produk aktif, order, pendapatan) '
+        'dengan data sebenarnya; --repair untuk memperbaiki selisihnya.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Batasi ke satu tenant')
+        parser.add_argument('--repair', action='store_true', help='Perbaiki penghitung yang melenceng')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['tenant']:
+            tenants = tenants.filter(id=options['tenant'])
+
+        with transaction.atomic():
+            drifted = verify_counters(tenants, repair=options['repair'])
+
+        for tenant, diff in drifted:
+            detail = ', '.join(f'{field} {stored} -> {actual}' for field, (stored, actual) in diff.items())
+            self.stdout.write(f'{tenant.name}: {detail or "baris penghitung belum ada"}')
+
+        status = 'diperbaiki' if options['repair'] else 'melenceng'
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} tenant {status}.'))
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:47
+
+import apps.core.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='logo',
+            field=models.ImageField(blank=True, upload_to=apps.core.images.HashedUploadTo('tenants/logos', 'logo'), validators=[apps.core.images.validate_image_size]),
+        ),
+    ]
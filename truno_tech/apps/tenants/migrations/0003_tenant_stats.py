@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def initial_stats(apps, schema_editor):
+    # Isi penghitung dari data yang sudah ada (sama dengan verify_tenant_stats --repair)
+    Tenant = apps.get_model('tenants', 'Tenant')
+    TenantStats = apps.get_model('tenants', 'TenantStats')
+    Product = apps.get_model('products', 'Product')
+    Order = apps.get_model('orders', 'Order')
+    products = Product.objects.filter(tenant=OuterRef('pk')).order_by().values('tenant')
+    orders = Order.objects.filter(tenant=OuterRef('pk')).order_by().values('tenant')
+    tenants = Tenant.objects.annotate(
+        product_count=Coalesce(Subquery(products.annotate(c=Count('pk')).values('c')), 0),
+        active_product_count=Coalesce(Subquery(products.filter(is_active=True).annotate(c=Count('pk')).values('c')), 0),
+        order_count=Coalesce(Subquery(orders.annotate(c=Count('pk')).values('c')), 0),
+        revenue=Coalesce(Subquery(orders.annotate(s=Sum('total_amount')).values('s')), 0),
+    ).values_list('pk', 'product_count', 'active_product_count', 'order_count', 'revenue')
+    TenantStats.objects.bulk_create(
+        (TenantStats(
+            tenant_id=pk,
+            product_count=product_count,
+            active_product_count=active_product_count,
+            order_count=order_count,
+            revenue=revenue,
+        ) for pk, product_count, active_product_count, order_count, revenue in tenants.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_images'),
+        ('products', '0007_images'),
+        ('orders', '0007_daily_tenant_sales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantStats',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='tenants.tenant')),
+                ('product_count', models.IntegerField(default=0)),
+                ('active_product_count', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Tenant stats',
+                'db_table': 'tenant_stats',
+            },
+        ),
+        migrations.RunPython(initial_stats, migrations.RunPython.noop),
+    ]
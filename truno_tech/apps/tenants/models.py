@@ -2,12 +2,17 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
+from apps.core.images import HashedUploadTo, validate_image_size, thumbnail
+
 
 class Tenant(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tenants')
     name = models.CharField(max_length=200)
     address = models.TextField()
     phone = models.CharField(max_length=15)
+    logo = models.ImageField(
+        upload_to=HashedUploadTo('tenants/logos', 'logo'), blank=True, validators=[validate_image_size]
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -18,6 +23,10 @@ class Tenant(models.Model):
             return f"{self.name} - {self.owner.username}"
         return self.name
 
+    @property
+    def logo_thumbnail(self):
+        return thumbnail(self.logo)
+
     def clean(self):
         """
         Validasi limit tenant untuk owner (berdasar UserProfile.max_tenants).
@@ -66,3 +75,20 @@ class TenantAccess(models.Model):
         tenant_name = self.tenant.name if getattr(self, 'tenant_id', None) else '-'
         crew_name = self.crew.username if getattr(self, 'crew_id', None) else '-'
         return f"{crew_name} -> {tenant_name}"
+
+
+class TenantStats(models.Model):
+    """Penghitung seumur hidup per tenant, dijaga oleh jalur tulis produk dan order"""
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    product_count = models.IntegerField(default=0)
+    active_product_count = models.IntegerField(default=0)
+    order_count = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)  # Sum of order total_amount in rupiah
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tenant_stats'
+        verbose_name_plural = 'Tenant stats'
+
+    def __str__(self):
+        return f"Stats {self.tenant_id}"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Tenant, TenantStats
+
+
+@receiver(post_save, sender=Tenant)
+def create_tenant_stats(sender, instance, created, **kwargs):
+    """Penghitung tenant dibuat bersama tenant; jalur tulis lain hanya meng-UPDATE"""
+    if created:
+        TenantStats.objects.bulk_create([TenantStats(tenant=instance)], ignore_conflicts=True)
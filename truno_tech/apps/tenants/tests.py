@@ -1,3 +1,87 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import UserProfile
+from apps.orders.models import Order
+from apps.orders.services import create_order
+from apps.products.bulk import apply_bulk_update
+from apps.products.imports import import_products
+from apps.products.models import Product, ProductBulkUpdate, ProductCategory
+from .counters import verify_counters
+from .models import Tenant, TenantStats
+
+
+class TenantCountersTest(TestCase):
+    """Penghitung TenantStats yang dijaga inkremental sama dengan data sebenarnya"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='rahasia-123')
+        UserProfile.objects.create(user=self.owner, role='client', max_tenants=5)
+        self.tenant = Tenant.objects.create(owner=self.owner, name='Toko', address='Jl. A', phone='0811')
+        self.category = ProductCategory.objects.create(tenant=self.tenant, name='Umum', created_by=self.owner)
+        self.products = [
+            Product.objects.create(
+                tenant=self.tenant, category=self.category, sku=f'S{i}', name=f'Produk {i}',
+                qty=50, price=2500, created_by=self.owner,
+            )
+            for i in range(3)
+        ]
+
+    def tenants(self):
+        return Tenant.objects.filter(pk=self.tenant.pk)
+
+    def test_counters_follow_products_and_orders(self):
+        for qty in (1, 3):
+            order = Order(tenant=self.tenant, created_by=self.owner, customer_name='Budi')
+            create_order(order, [str(self.products[0].pk)], [str(qty)])
+        self.products[1].is_active = False
+        self.products[1].save()
+        self.products[2].delete()
+
+        self.assertEqual(verify_counters(self.tenants()), [])
+        stats = TenantStats.objects.get(tenant=self.tenant)
+        self.assertEqual(
+            (stats.product_count, stats.active_product_count, stats.order_count, stats.revenue),
+            (2, 1, 2, 10000),
+        )
+
+    def test_product_save_does_not_recount(self):
+        product = Product.objects.get(pk=self.products[0].pk)
+        product.is_active = False
+
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+            product.name = 'Produk Baru'
+            product.save()
+
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+        self.assertEqual(verify_counters(self.tenants()), [])
+
+    def test_bulk_update_and_import_keep_product_counts(self):
+        apply_bulk_update(ProductBulkUpdate(
+            tenant=self.tenant, created_by=self.owner, skus='S0\nS1',
+            price_mode='percent', price_value=Decimal('10'), is_active=False,
+        ))
+        self.assertEqual(verify_counters(self.tenants()), [])
+
+        import_products(self.tenant, self.owner, [
+            ['sku', 'nama', 'kategori', 'harga', 'aktif'],
+            ['S0', 'Produk 0', 'Umum', '2500', 'ya'],
+            ['S9', 'Produk 9', 'Umum', '2500', 'tidak'],
+        ])
+
+        self.assertEqual(verify_counters(self.tenants()), [])
+        stats = TenantStats.objects.get(tenant=self.tenant)
+        self.assertEqual((stats.product_count, stats.active_product_count), (4, 2))
+
+    def test_verify_repairs_drift(self):
+        TenantStats.objects.filter(tenant=self.tenant).update(order_count=7, product_count=0)
+
+        drifted = verify_counters(self.tenants(), repair=True)
 
-# Create your tests here.
+        self.assertEqual(drifted[0][1], {'product_count': (0, 3), 'order_count': (7, 0)})
+        self.assertEqual(verify_counters(self.tenants()), [])
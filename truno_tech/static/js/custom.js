@@ -80,4 +80,46 @@ function showToast(message, type = 'info') {
     document.getElementById(toastId).addEventListener('hidden.bs.toast', function() {
         this.remove();
     });
-}
\ No newline at end of file
+}
+// "Muat lebih banyak" untuk list dengan keyset pagination
+document.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-load-more]');
+    if (!button) return;
+    e.preventDefault();
+    if (button.classList.contains('disabled')) return;
+
+    const url = new URL(button.href, window.location.origin);
+    url.searchParams.set('fragment', '1');
+    button.classList.add('disabled');
+
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => {
+            const nextPage = response.headers.get('X-Next-Page');
+            return response.text().then(html => ({ html, nextPage }));
+        })
+        .then(({ html, nextPage }) => {
+            document.getElementById(button.dataset.target).insertAdjacentHTML('beforeend', html);
+            if (nextPage) {
+                button.href = nextPage;
+                button.classList.remove('disabled');
+            } else {
+                button.closest('div').remove();
+            }
+        })
+        .catch(() => button.classList.remove('disabled'));
+});
+
+// Panel dashboard: kerangka halaman tampil dulu, isi setiap panel diambil paralel
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-panel]').forEach(function(panel) {
+        fetch(panel.dataset.panel, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => {
+                if (!response.ok) throw new Error(response.status);
+                return response.text();
+            })
+            .then(html => { panel.innerHTML = html; })
+            .catch(() => {
+                panel.innerHTML = '<div class="text-center py-4 text-muted">Gagal memuat data. <a href="">Muat ulang</a></div>';
+            });
+    });
+});
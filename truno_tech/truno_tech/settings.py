@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     
     # Custom apps
+    'apps.core',
     'apps.accounts',
     'apps.tenants',
     'apps.products',
@@ -93,6 +94,23 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache bersama antar worker (versi & data referensi di apps.core.refcache)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'django',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Cache PDF struk/invoice (tidak dilayani publik, karena berisi data pelanggan)
+RECEIPT_CACHE_DIR = BASE_DIR / 'cache' / 'receipts'
+
+# Thumbnail gambar (apps.core.images): jumlah proses render command image_variants, dan umur cache
+# varian di MEDIA_URL + 'thumbs/' (web server produksi sebaiknya memakai header yang sama)
+IMAGE_WORKERS = 2
+IMAGE_VARIANT_MAX_AGE = 60 * 60 * 24 * 365
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Login URLs
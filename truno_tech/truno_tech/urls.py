@@ -1,9 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
 from django.http import HttpResponse
+from django.views.static import serve
+from apps.core.images import VARIANT_DIR
 
 def home_view(request):
     if request.user.is_authenticated:
@@ -11,6 +13,12 @@ def home_view(request):
     else:
         return redirect('accounts:login')
 
+def image_variant_view(request, path):
+    # Nama varian memuat hash isi, jadi aman di-cache selamanya
+    response = serve(request, path, document_root=settings.MEDIA_ROOT / VARIANT_DIR)
+    response['Cache-Control'] = f'public, max-age={settings.IMAGE_VARIANT_MAX_AGE}, immutable'
+    return response
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home_view, name='home'),
@@ -23,4 +31,7 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{VARIANT_DIR}/(?P<path>.*)$', image_variant_view),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file